@@ -1,14 +1,18 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from collections import deque
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from functools import partial
+from itertools import islice
 import argparse
 import codecs
 import os.path
 import platform
 import sys
 
+import numpy as np
+
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
@@ -24,16 +28,72 @@ from libs.canvas import Canvas
 from libs.zoomWidget import ZoomWidget
 from libs.labelDialog import LabelDialog
 from libs.colorDialog import ColorDialog
-from libs.labelFile import LabelFile, LabelFileError, LabelFileFormat
+from libs.labelFile import LabelFile, LabelFileError, LabelFileFormat, read_img_meta
 from libs.toolBar import ToolBar
 from libs.hashableQListWidgetItem import HashableQListWidgetItem
+from libs.dirScanner import scan_images, ANNOTATION_DIRS
+from libs.dirWatcher import DirWatcher
+from libs.frameStore import frame_exists
+from libs.naturalSort import natural_insort, path_sort_key
+from libs.imageLoader import (
+    read_image,
+    read_preview,
+    ndarray_to_qimage,
+    qimage_to_ndarray,
+)
+from libs.scanConversion import ScanConverter
+from libs.rawFrame import RawFrame, DisplayWindow, is_raw_frame
+from libs.pixmapCache import PixmapCache
+from libs.frameCache import CompressedFrameCache
+from libs.predictions import (
+    PredictionFile,
+    PredictionSet,
+    PREDICTION_EXTENSIONS,
+    TRACKED_PREDICTIONS_NAME,
+    append_predictions,
+)
+from libs.preannotation import Preannotator, MODEL_EXTENSIONS
+from libs.boxStore import BoxStore, interpolate_boxes
+from libs.roiWriter import RoiWriter
+from libs.boxTracking import BoxTracker
+from libs.roiIndex import RoiIndexer, RoiStats, roi_entry
+from libs.imageSetIndex import ImageSetIndex
+from libs.uiScheduler import UiUpdateScheduler
+from libs.cine import CinePlayer, read_cine_frame
+from libs.enFace import EnFaceBuilder, PROJECTIONS, box_spans
+from libs.enFaceView import EnFaceView
+from libs.imageGeometry import image_size, save_geometry
 
 from arpamutils import roi as arpam_roi
-from arpamutils import metadata as arpam_meta
 from arpamutils.roi import CoImageType
 
 __appname__ = "labelARPAM"
 
+# Modalities shown side by side by the split view, when their files exist
+SPLIT_VIEW_TYPES = (
+    CoImageType.PA,
+    CoImageType.US,
+    CoImageType.SUM,
+    CoImageType.DEBUG,
+)
+
+# Frames with more boxes are drawn straight from the box store, and a Shape
+# is only created for a box when it is picked for editing
+BOX_SHAPE_LIMIT = 256
+
+# Number of frames after the current one that the pre-annotation model
+# is run on in advance
+PREANNOTATION_LOOKAHEAD = 16
+
+# Number of recently visited image sets whose boxes are kept in memory,
+# so copying them to another frame does not read their ROI file again
+RECENT_BOXES = 8
+
+# Moving to another image set while `d` or `a` is held, or within this
+# many milliseconds of the last move, only shows a preview of the frame;
+# it is fully loaded once navigation stops for as long
+NAV_SETTLE_MS = 150
+
 
 class WindowMixin(object):
     def menu(self, title, actions=None):
@@ -68,6 +128,7 @@ class MainWindow(QMainWindow, WindowMixin):
         default_filename=None,
         default_prefdef_class_file=None,
         default_save_dir=None,
+        recursive_scan=False,
     ):
         super(MainWindow, self).__init__()
         self.setWindowTitle(__appname__)
@@ -88,15 +149,46 @@ class MainWindow(QMainWindow, WindowMixin):
         self.label_file: Optional[LabelFile] = None
 
         self.arpam_img_type: CoImageType = CoImageType.UNKNOWN
-
-        # For loading all image under a directory
+        # Set while the SUM frame is shown scan-converted to polar coordinates
+        self._polar_view: Optional[Struct] = None
+        # Decoded frames of the split view panes
+        self.pixmap_cache = PixmapCache()
+        # Frames read before, kept compressed so reading them again skips decoding
+        self.frame_cache = CompressedFrameCache()
+        # Downsampled frames shown while scrubbing through the image sets
+        self.preview_cache = PixmapCache(max_items=256)
+        self._preview_path: Optional[str] = None
+        self._nav_timer = QTimer(self)
+        self._nav_timer.setSingleShot(True)
+        self._nav_timer.setInterval(NAV_SETTLE_MS)
+        self._nav_timer.timeout.connect(self.finish_navigation)
+        # Set by auto-repeated key presses, which trigger the navigation
+        # shortcuts without passing through keyPressEvent
+        self._key_repeat = False
+        QApplication.instance().installEventFilter(self)
+
+        # For loading all image under a directory. The lists hold one file
+        # per image set, the set's other modalities are found in image_sets.
+        self.image_sets = ImageSetIndex()
         self.m_img_list: List[str] = []  # active list
-        self.m_img_list_all: List[str] = []  # all images
-        self.m_img_list_filtered: List[str] = []  # filtered images
+        self.m_img_list_all: List[str] = []  # all image sets
+        self.m_img_list_filtered: List[str] = []  # filtered image sets
+        self.m_img_groups: Dict[str, str] = {}  # image dir -> group name
+        self._study_root: Optional[str] = None  # set when scanned recursively
+        self._file_items: Dict[str, QListWidgetItem] = {}  # path -> file dock item
         self.dir_name = None
+        self.recursive_scan = recursive_scan
         self.label_hist = []
         self.last_open_dir = None
         self.cur_img_idx: int = 0
+        # Sorted directory listings, reused when a directory is re-opened
+        self._sort_cache = NaturalSortCache()
+        # Picks up frames written into the opened directories while labelling
+        self.dir_watcher = DirWatcher(self)
+        self.dir_watcher.imagesAdded.connect(self._on_images_added)
+        self.dir_watcher.imagesRemoved.connect(self._on_images_removed)
+        self.dir_watcher.annotationsChanged.connect(self._on_annotations_changed)
+        self._roi_mtime_ns: Optional[int] = None
 
         # Whether we need to save or not.
         self.dirty = False
@@ -145,9 +237,52 @@ class MainWindow(QMainWindow, WindowMixin):
         self.edit_button = QToolButton()
         self.edit_button.setToolButtonStyle(Qt.ToolButtonTextBesideIcon)
 
+        # Score threshold of the imported predictions
+        self.predictions: Optional[PredictionFile] = None
+        self.prediction_set: Optional[PredictionSet] = None
+        self.preannotator: Optional[Preannotator] = None
+        self._proposals_shown = False
+
+        # Boxes of recently visited image sets, (ROI path, BoxStore), and
+        # of the ROI files still being written in the background
+        self._recent_boxes = deque(maxlen=RECENT_BOXES)
+        self._pending_rois: Dict[str, BoxStore] = {}
+        # Records saves in the ROI indexes and counts their statistics
+        self.roi_indexer = RoiIndexer(self)
+        self.roi_indexer.rebuilt.connect(self.show_roi_stats)
+        self.roi_indexer.counted.connect(self.show_roi_stats)
+        self.roi_indexer.failed.connect(self.status)
+        self.roi_writer = RoiWriter(self.roi_indexer.record, self)
+        self.roi_writer.written.connect(self.rois_written)
+        self.roi_writer.failed.connect(self.rois_write_failed)
+        # (ROI path, boxes) of the frame marked as the interpolation keyframe
+        self._keyframe = None
+
+        # Boxes tracked into following frames, by ROI path, shown with the
+        # predictions until they are accepted
+        # image dir -> its saved tracked boxes, read when a frame is opened
+        self._tracked: Dict[str, Optional[PredictionFile]] = {}
+        self.box_tracker = BoxTracker(parent=self)
+        self.box_tracker.tracked.connect(self.box_tracked)
+        self.box_tracker.failed.connect(self.status)
+
+        self.score_label = QLabel()
+        self.score_slider = QSlider(Qt.Horizontal)
+        self.score_slider.setRange(0, 100)
+        self.score_slider.setValue(50)
+        self.score_slider.valueChanged.connect(self.score_threshold_changed)
+        score_qhbox_layout = QHBoxLayout()
+        score_qhbox_layout.addWidget(self.score_label)
+        score_qhbox_layout.addWidget(self.score_slider)
+        self.score_container = QWidget()
+        self.score_container.setLayout(score_qhbox_layout)
+        self.score_container.setEnabled(False)
+        self.score_threshold_changed()
+
         # Add some of widgets to list_layout
         list_layout.addWidget(self.edit_button)
         list_layout.addWidget(use_default_label_container)
+        list_layout.addWidget(self.score_container)
 
         # Create and add combobox for showing unique labels in group
         self.combo_box = ComboBox(self)
@@ -186,9 +321,11 @@ class MainWindow(QMainWindow, WindowMixin):
                 return
 
             self._update_filtered_img_list()
+            self.stop_scrubbing()
             self.file_path = None
             self.open_next_image()
             self._update_QList_files()
+            self.update_en_face()
 
         self.filter_checkbox = QCheckBox("Filter mean_ratio: ")
         self.filter_checkbox.setChecked(self._last_filter_checked)
@@ -204,6 +341,25 @@ class MainWindow(QMainWindow, WindowMixin):
         filter_container = QWidget()
         filter_container.setLayout(filter_qhbox_layout)
 
+        # Cine playback of the image sets in the modality being viewed
+        self.cine_player = CinePlayer(self)
+        self.cine_player.frame.connect(self.show_cine_frame)
+        self.cine_player.finished.connect(self.pause_cine)
+        self.cine_player.failed.connect(self.status)
+        self._cine_frames: List[Tuple[str, int]] = []  # (path, file list index)
+        self._cine_index: Optional[int] = None
+        self.cine_fps_input = QSpinBox()
+        self.cine_fps_input.setRange(1, 120)
+        self.cine_fps_input.setSuffix(" fps")
+        self.cine_fps_input.setValue(settings.get(SETTING_CINE_FPS, 30))
+        self.cine_fps_input.valueChanged.connect(self.cine_fps_changed)
+
+        cine_qhbox_layout = QHBoxLayout()
+        cine_qhbox_layout.addWidget(QLabel("Cine playback:"))
+        cine_qhbox_layout.addWidget(self.cine_fps_input)
+        cine_container = QWidget()
+        cine_container.setLayout(cine_qhbox_layout)
+
         ### Image quality dock
         self.img_meta_dock = QDockWidget("Image Metadata", self)
 
@@ -211,7 +367,39 @@ class MainWindow(QMainWindow, WindowMixin):
         self.img_meta_label.setText("N/A")
         self.img_meta_dock.setObjectName("Image quality")
 
-        self.img_meta_dock.setWidget(self.img_meta_label)
+        # Display window (dB range) of raw beamformed frames
+        self.raw_frame: Optional[RawFrame] = None
+        self.display_window = DisplayWindow(
+            *settings.get(SETTING_DISPLAY_WINDOW, DisplayWindow())
+        )
+        self.window_low_input = QDoubleSpinBox()
+        self.window_high_input = QDoubleSpinBox()
+        for spin_box, value in (
+            (self.window_low_input, self.display_window.low_db),
+            (self.window_high_input, self.display_window.high_db),
+        ):
+            spin_box.setRange(-200.0, 60.0)
+            spin_box.setSuffix(" dB")
+            spin_box.setValue(value)
+            spin_box.setKeyboardTracking(False)
+            spin_box.valueChanged.connect(self.display_window_changed)
+
+        window_qhbox_layout = QHBoxLayout()
+        window_qhbox_layout.addWidget(QLabel("Raw display range:"))
+        window_qhbox_layout.addWidget(self.window_low_input)
+        window_qhbox_layout.addWidget(self.window_high_input)
+        self.window_container = QWidget()
+        self.window_container.setLayout(window_qhbox_layout)
+        self.window_container.setEnabled(False)
+
+        img_meta_layout = QVBoxLayout()
+        img_meta_layout.setContentsMargins(0, 0, 0, 0)
+        img_meta_layout.addWidget(self.img_meta_label)
+        img_meta_layout.addWidget(self.window_container)
+        img_meta_container = QWidget()
+        img_meta_container.setLayout(img_meta_layout)
+
+        self.img_meta_dock.setWidget(img_meta_container)
 
         ### File list widget
         self.file_list_widget = QListWidget()
@@ -220,6 +408,7 @@ class MainWindow(QMainWindow, WindowMixin):
         file_list_layout = QVBoxLayout()
         file_list_layout.setContentsMargins(0, 0, 0, 0)
         file_list_layout.addWidget(filter_container)
+        file_list_layout.addWidget(cine_container)
         file_list_layout.addWidget(self.file_list_widget)
 
         file_list_container = QWidget()
@@ -228,10 +417,67 @@ class MainWindow(QMainWindow, WindowMixin):
         self.file_dock.setObjectName(get_str("files"))
         self.file_dock.setWidget(file_list_container)
 
+        ### ROI statistics dock, read from the per-patient ROI indexes
+        self.stats_label = QLabel()
+        self.stats_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.label_count_list = QTreeWidget()
+        self.label_count_list.setHeaderLabels(["Label", "Boxes"])
+        self.label_count_list.setRootIsDecorated(False)
+        rebuild_index_button = QPushButton("Rebuild Index")
+        rebuild_index_button.clicked.connect(self.rebuild_roi_index)
+        stats_layout = QVBoxLayout()
+        stats_layout.setContentsMargins(0, 0, 0, 0)
+        stats_layout.addWidget(self.stats_label)
+        stats_layout.addWidget(self.label_count_list)
+        stats_layout.addWidget(rebuild_index_button)
+        stats_container = QWidget()
+        stats_container.setLayout(stats_layout)
+        self.stats_dock = QDockWidget("ROI Statistics", self)
+        self.stats_dock.setObjectName("ROI statistics")
+        self.stats_dock.setWidget(stats_container)
+        self.stats_dock.visibilityChanged.connect(self.update_roi_stats)
+
+        ### En face map of the pullback, one column per image set
+        self.en_face_view = EnFaceView()
+        self.en_face_view.frameClicked.connect(self.en_face_clicked)
+        self.en_face_builder = EnFaceBuilder(parent=self)
+        self.en_face_builder.built.connect(self.show_en_face)
+        self.en_face_builder.failed.connect(self.status)
+        self._en_face_columns: Dict[str, int] = {}  # file list path -> column
+        self.en_face_type = QComboBox()
+        for coreg_type in (CoImageType.PA, CoImageType.US, CoImageType.SUM):
+            self.en_face_type.addItem(coreg_type.name, coreg_type)
+        self.en_face_projection = QComboBox()
+        self.en_face_projection.addItems(PROJECTIONS)
+        refresh_en_face_button = QPushButton("Refresh")
+        refresh_en_face_button.clicked.connect(self.update_en_face)
+        for combo_box in (self.en_face_type, self.en_face_projection):
+            combo_box.currentIndexChanged.connect(self.update_en_face)
+
+        en_face_controls = QHBoxLayout()
+        en_face_controls.addWidget(QLabel("Image:"))
+        en_face_controls.addWidget(self.en_face_type)
+        en_face_controls.addWidget(QLabel("Projection:"))
+        en_face_controls.addWidget(self.en_face_projection)
+        en_face_controls.addStretch()
+        en_face_controls.addWidget(refresh_en_face_button)
+        en_face_layout = QVBoxLayout()
+        en_face_layout.setContentsMargins(0, 0, 0, 0)
+        en_face_layout.addLayout(en_face_controls)
+        en_face_layout.addWidget(self.en_face_view)
+        en_face_container = QWidget()
+        en_face_container.setLayout(en_face_layout)
+        self.en_face_dock = QDockWidget("En Face Map", self)
+        self.en_face_dock.setObjectName("En face map")
+        self.en_face_dock.setWidget(en_face_container)
+        self.en_face_dock.visibilityChanged.connect(self.update_en_face)
+
         self.zoom_widget = ZoomWidget()
         self.color_dialog = ColorDialog(parent=self)
 
-        self.canvas = Canvas(parent=self)
+        # Coalesces the status bar, tooltip and cursor updates of mouse moves
+        self.ui_updates = UiUpdateScheduler(self)
+        self.canvas = Canvas(parent=self, ui_updates=self.ui_updates)
         self.canvas.zoomRequest.connect(self.zoom_request)
         self.canvas.set_drawing_shape_to_square(False)
 
@@ -246,6 +492,8 @@ class MainWindow(QMainWindow, WindowMixin):
         self.canvas.scrollRequest.connect(self.scroll_request)
 
         self.canvas.newShape.connect(self.new_shape)
+        self.canvas.boxPicked.connect(self.box_picked)
+        self.canvas.predictionPicked.connect(self.accept_prediction)
         self.canvas.shapeMoved.connect(self.set_dirty)
         self.canvas.selectionChanged.connect(self.shape_selection_changed)
         self.canvas.drawingPolygon.connect(self.toggle_drawing_sensitive)
@@ -260,6 +508,12 @@ class MainWindow(QMainWindow, WindowMixin):
         self.addDockWidget(Qt.RightDockWidgetArea, self.file_dock)
         self.file_dock.setFeatures(QDockWidget.DockWidgetFloatable)
 
+        self.addDockWidget(Qt.RightDockWidgetArea, self.stats_dock)
+        self.stats_dock.hide()
+
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.en_face_dock)
+        self.en_face_dock.hide()
+
         self.dock_features = (
             QDockWidget.DockWidgetClosable | QDockWidget.DockWidgetFloatable
         )
@@ -285,6 +539,14 @@ class MainWindow(QMainWindow, WindowMixin):
             get_str("openDir"),
         )
 
+        open_study_dir = action(
+            "Open Study Dir (Ctrl+Shift+u)",
+            self.open_study_dir_dialog,
+            "Ctrl+Shift+u",
+            "open",
+            "Open all patient directories under a study directory",
+        )
+
         # change_save_dir = action(get_str('changeSaveDir'), self.change_save_dir_dialog,
         # 'Ctrl+r', 'open', get_str('changeSavedAnnotationDir'))
 
@@ -296,6 +558,30 @@ class MainWindow(QMainWindow, WindowMixin):
         # get_str("openAnnotationDetail"),
         # )
 
+        import_predictions = action(
+            "Import Predictions",
+            self.import_predictions_dialog,
+            None,
+            "open",
+            "Overlay model predictions from a CSV, JSONL or Parquet file",
+        )
+
+        load_model = action(
+            "Load Pre-annotation Model",
+            self.load_model_dialog,
+            None,
+            "open",
+            "Run an ONNX, TorchScript or Python model on upcoming frames",
+        )
+
+        accept_predictions = action(
+            "Accept Predictions",
+            self.accept_predictions,
+            None,
+            "done",
+            "Copy the predictions above the score threshold into the ROI",
+        )
+
         copy_prev_bounding = action(
             get_str("copyPrevBounding"),
             self.copy_previous_bounding_boxes,
@@ -304,6 +590,47 @@ class MainWindow(QMainWindow, WindowMixin):
             get_str("copyPrevBounding"),
         )
 
+        mark_keyframe = action(
+            "Mark Keyframe",
+            self.mark_keyframe,
+            "k",
+            "verify",
+            "Mark the boxes of this frame as the start of an interpolation",
+        )
+
+        interpolate_keyframes = action(
+            "Interpolate from Keyframe",
+            self.interpolate_from_keyframe,
+            "Ctrl+k",
+            "copy",
+            "Interpolate the boxes of the frames between the keyframe and this one",
+        )
+
+        track_box = action(
+            "Track Selected Box",
+            self.track_box_dialog,
+            "Ctrl+t",
+            "next",
+            "Track the selected box into the next frames as suggestions",
+        )
+
+        play_cine = action(
+            "Play Cine",
+            self.toggle_cine,
+            "Ctrl+Space",
+            "next",
+            "Play the image sets from this one in the modality being viewed",
+            checkable=True,
+        )
+
+        copy_to_next_frames = action(
+            "Copy Boxes to Next Frames",
+            self.copy_to_next_frames_dialog,
+            None,
+            "copy",
+            "Replace the boxes of the next frames with the boxes of this frame",
+        )
+
         open_US_img = action(
             "Show US (u)",
             partial(self.action_open_coreg_img, CoImageType.US),
@@ -498,6 +825,14 @@ class MainWindow(QMainWindow, WindowMixin):
             get_str("showAllBoxDetail"),
             enabled=False,
         )
+        toggle_class = action(
+            "Show/Hide Class",
+            self.toggle_selected_class,
+            "h",
+            "hide",
+            "Show or hide all boxes with the label of the selected box",
+            enabled=False,
+        )
 
         zoom = QWidgetAction(self)
         zoom.setDefaultWidget(self.zoom_widget)
@@ -596,6 +931,10 @@ class MainWindow(QMainWindow, WindowMixin):
         labels.setText(get_str("showHide"))
         labels.setShortcut("Ctrl+Shift+L")
 
+        roi_stats = self.stats_dock.toggleViewAction()
+        en_face = self.en_face_dock.toggleViewAction()
+        roi_stats.setText("ROI Statistics")
+
         # Label list context menu.
         label_menu = QMenu()
         add_actions(label_menu, (edit, delete))
@@ -617,6 +956,7 @@ class MainWindow(QMainWindow, WindowMixin):
             open=open,
             close=close,
             resetAll=reset_all,
+            playCine=play_cine,
             # deleteImg=delete_image,
             lineColor=color1,
             create=create,
@@ -635,7 +975,16 @@ class MainWindow(QMainWindow, WindowMixin):
             fitWindow=fit_window,
             fitWidth=fit_width,
             zoomActions=zoom_actions,
-            fileMenuActions=(open, open_dir, save, save_as, close, reset_all, quit),
+            fileMenuActions=(
+                open,
+                open_dir,
+                open_study_dir,
+                save,
+                save_as,
+                close,
+                reset_all,
+                quit,
+            ),
             beginner=(),
             advanced=(),
             editMenu=(edit, copy, delete, None, color1, self.draw_squares_option),
@@ -650,7 +999,7 @@ class MainWindow(QMainWindow, WindowMixin):
                 shape_fill_color,
             ),
             onLoadActive=(close, create, create_mode, edit_mode),
-            onShapesPresent=(save_as, hide_all, show_all),
+            onShapesPresent=(save_as, hide_all, show_all, toggle_class),
         )
 
         self.menus = Struct(
@@ -678,19 +1027,33 @@ class MainWindow(QMainWindow, WindowMixin):
         self.display_label_option.setCheckable(True)
         self.display_label_option.setChecked(settings.get(SETTING_PAINT_LABEL, False))
         self.display_label_option.triggered.connect(self.toggle_paint_labels_option)
+        # Show the co-registered modalities side by side
+        self.split_view_option = QAction("Split View", self)
+        self.split_view_option.setShortcut("Ctrl+Shift+V")
+        self.split_view_option.setCheckable(True)
+        self.split_view_option.setChecked(settings.get(SETTING_SPLIT_VIEW, False))
+        self.split_view_option.triggered.connect(self.toggle_split_view)
 
         add_actions(
             self.menus.file,
             (
                 # open,
                 open_dir,
+                open_study_dir,
                 open_PA_img,
                 open_US_img,
                 open_Sum_img,
                 open_SumPolar_img,
                 # open_DEBUG_img,
                 # open_annotation,
+                import_predictions,
+                load_model,
+                accept_predictions,
                 copy_prev_bounding,
+                copy_to_next_frames,
+                mark_keyframe,
+                interpolate_keyframes,
+                track_box,
                 self.menus.recentFiles,
                 save,
                 save_format,
@@ -707,11 +1070,16 @@ class MainWindow(QMainWindow, WindowMixin):
                 self.auto_saving,
                 self.single_class_mode,
                 self.display_label_option,
+                self.split_view_option,
+                play_cine,
                 labels,
+                roi_stats,
+                en_face,
                 advanced_mode,
                 None,
                 hide_all,
                 show_all,
+                toggle_class,
                 None,
                 zoom_in,
                 zoom_out,
@@ -740,6 +1108,7 @@ class MainWindow(QMainWindow, WindowMixin):
             open_dir,
             open_next_image,
             open_prev_image,
+            play_cine,
             verify,
             save,
             save_format,
@@ -764,6 +1133,7 @@ class MainWindow(QMainWindow, WindowMixin):
             open_DEBUG_img,
             open_next_image,
             open_prev_image,
+            play_cine,
             save,
             save_format,
             None,
@@ -846,7 +1216,11 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # Since loading the file may take some time, make sure it runs in the background.
         if self.file_path and os.path.isdir(self.file_path):
-            self.queue_event(partial(self.import_dir_images, self.file_path or ""))
+            self.queue_event(
+                partial(
+                    self.import_dir_images, self.file_path or "", self.recursive_scan
+                )
+            )
         elif self.file_path:
             self.queue_event(partial(self.load_file, self.file_path or ""))
 
@@ -861,7 +1235,16 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # Open Dir if default file
         if self.file_path and os.path.isdir(self.file_path):
-            self.open_dir_dialog(dir_path=self.file_path, silent=True)
+            self.open_dir_dialog(
+                dir_path=self.file_path, silent=True, recursive=self.recursive_scan
+            )
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.ShortcutOverride, QEvent.KeyPress):
+            self._key_repeat = event.isAutoRepeat()
+        elif event.type() == QEvent.KeyRelease and not event.isAutoRepeat():
+            self._key_repeat = False
+        return False
 
     def keyReleaseEvent(self, event):
         # if event.key() == Qt.Key_Control:
@@ -941,7 +1324,7 @@ class MainWindow(QMainWindow, WindowMixin):
         QTimer.singleShot(0, function)
 
     def status(self, message, delay=5000):
-        self.statusBar().showMessage(message, delay)
+        self.ui_updates.show_message(self.statusBar(), message, delay)
 
     def reset_state(self):
         self.items_to_shapes.clear()
@@ -950,8 +1333,9 @@ class MainWindow(QMainWindow, WindowMixin):
         self.file_path = None
         self.image_data = None
         self.label_file = None
+        self._polar_view = None
         self.canvas.reset_state()
-        self.label_coordinates.clear()
+        self.ui_updates.set_text(self.label_coordinates, "")
         self.combo_box.cb.clear()
 
     def current_item(self):
@@ -1014,7 +1398,7 @@ class MainWindow(QMainWindow, WindowMixin):
         curr_file_path = self.file_path
 
         def exists(filename):
-            return os.path.exists(filename)
+            return frame_exists(filename)
 
         menu = self.menus.recentFiles
         menu.clear()
@@ -1043,8 +1427,11 @@ class MainWindow(QMainWindow, WindowMixin):
 
     # Tzutalin 20160906 : Add file list and dock to move faster
     def file_item_double_clicked(self, item=None):
-        self.cur_img_idx = self.m_img_list.index(item.text())
-        filename = self.m_img_list[self.cur_img_idx]
+        img_path = item.data(Qt.UserRole)
+        if img_path is None:  # group header
+            return
+        self.cur_img_idx = self.m_img_list.index(img_path)
+        filename = self._path_in_current_modality(self.m_img_list[self.cur_img_idx])
         if filename:
             self.load_file(filename)
 
@@ -1087,49 +1474,103 @@ class MainWindow(QMainWindow, WindowMixin):
         del self.items_to_shapes[item]
         self.update_combo_box()
 
+    def shape_from_points(self, label, points, line_color=None, fill_color=None):
+        shape = Shape(label=label)
+        for x, y in points:
+            shape.add_point(QPointF(x, y))
+        shape.close()
+
+        if line_color:
+            shape.line_color = QColor(*line_color)
+        else:
+            shape.line_color = generate_color_by_text(label)
+
+        if fill_color:
+            shape.fill_color = QColor(*fill_color)
+        else:
+            shape.fill_color = generate_color_by_text(label)
+        return shape
+
     def load_labels(self, shapes):
         s = []
         for label, points, line_color, fill_color in shapes:
-            shape = Shape(label=label)
+            snapped_points = []
             for x, y in points:
                 # Ensure the labels are within the bounds of the image. If not, fix them.
                 x, y, snapped = self.canvas.snap_point_to_canvas(x, y)
                 if snapped:
                     self.set_dirty()
+                snapped_points.append((x, y))
 
-                shape.add_point(QPointF(x, y))
-            shape.close()
+            shape = self.shape_from_points(
+                label, snapped_points, line_color, fill_color
+            )
             s.append(shape)
-
-            if line_color:
-                shape.line_color = QColor(*line_color)
-            else:
-                shape.line_color = generate_color_by_text(label)
-
-            if fill_color:
-                shape.fill_color = QColor(*fill_color)
-            else:
-                shape.fill_color = generate_color_by_text(label)
-
             self.add_label(shape)
         self.update_combo_box()
-        self._s = s
         self.canvas.load_shapes(s)
 
+    def box_picked(self, index: int):
+        """Turn a box of the canvas box layer into an editable shape."""
+        layer = self.canvas.box_layer
+        label, points, _, _ = layer.shape_tuple(index)
+        layer.remove(index)
+        shape = self.shape_from_points(label, points)
+        self.canvas.shapes.append(shape)
+        self.add_label(shape)
+
     def update_combo_box(self):
         # Get the unique labels and add them to the Combobox.
-        items_text_list = [
-            str(self.label_list.item(i).text()) for i in range(self.label_list.count())
-        ]
-
-        unique_text_list = list(set(items_text_list))
+        unique_text_list = list(self.frame_labels())
         # Add a null row for showing all the labels
         unique_text_list.append("")
         unique_text_list.sort()
 
+        # Keep the selected class, without reapplying it for every new box
+        current = self.combo_box.cb.currentText()
+        self.combo_box.cb.blockSignals(True)
         self.combo_box.update_items(unique_text_list)
+        if current in unique_text_list:
+            self.combo_box.cb.setCurrentText(current)
+        self.combo_box.cb.blockSignals(False)
+        if current not in unique_text_list:
+            self.combo_selection_changed(self.combo_box.cb.currentIndex())
+
+    def frame_labels(self) -> set:
+        """Labels of the boxes of the frame, including the box layer's."""
+        labels = {
+            self.label_list.item(i).text() for i in range(self.label_list.count())
+        }
+        layer = self.canvas.box_layer
+        if layer is not None and len(layer):
+            labels.update(layer.labels[i] for i in np.unique(layer.boxes["label"]))
+        return labels
+
+    def set_hidden_labels(self, labels):
+        """Hide all boxes of `labels` and show the others, with one repaint."""
+        self.canvas.set_hidden_labels(labels)
+        self.label_list.blockSignals(True)
+        for item, shape in self.items_to_shapes.items():
+            visible = self.canvas.isVisible(shape)
+            item.setCheckState(Qt.Checked if visible else Qt.Unchecked)
+        self.label_list.blockSignals(False)
+
+    def toggle_selected_class(self, _value=False):
+        shape = self.canvas.selected_shape
+        item = self.current_item()
+        label = shape.label if shape else item.text() if item else None
+        if label is None:
+            return
+        hidden = set(self.canvas.hidden_labels)
+        hidden.symmetric_difference_update({label})
+        self.set_hidden_labels(hidden)
+
+    def labels_to_save(self):
+        """
+        Shape dicts, image and box layer of the frame, in the coordinates
+        of the Cartesian frame the boxes are stored in.
+        """
 
-    def save_labels(self):
         def format_shape(s):
             return dict(
                 label=s.label,
@@ -1139,13 +1580,31 @@ class MainWindow(QMainWindow, WindowMixin):
             )
 
         shapes = [format_shape(shape) for shape in self.canvas.shapes]
+        image_data = self.image_data
+        box_layer = self.canvas.box_layer
+        if self._polar_view is not None:
+            for shape, s in zip(shapes, self.canvas.shapes):
+                shape["points"] = [(p.x(), p.y()) for p in self._polar_shape_to_cart(s)]
+            image_data = self._polar_view.cart_image
+            box_layer = self._polar_view.box_layer
+        return shapes, image_data, box_layer
+
+    def save_labels(self):
+        if self.label_file is None:
+            # A preview or cine frame is shown, there is nothing to save
+            return False
+        shapes, image_data, box_layer = self.labels_to_save()
         good_PA = self.good_PA.isChecked()
         good_US = self.good_US.isChecked()
+        roi_path = str(self.label_file.arpam_img_set.roi)
+        if roi_path in self._pending_rois:
+            # Do not let a queued copy overwrite these boxes later
+            self.roi_writer.flush()
         # Can add different annotation formats here
         try:
             assert self.label_file_format == LabelFileFormat.ARPAM
             self.label_file.save_arpam_format(
-                shapes, self.file_path, self.image_data, good_PA, good_US
+                shapes, self.file_path, image_data, good_PA, good_US, box_layer
             )
             print(
                 "Image:{0} -> Annotation:{1}".format(
@@ -1156,6 +1615,16 @@ class MainWindow(QMainWindow, WindowMixin):
                 "Saved to  %s" % self.label_file.arpam_img_set.roi
             )
             self.statusBar().show()
+            for error in save_geometry():
+                self.status(error)
+            self._roi_mtime_ns = self._current_roi_mtime()
+            self.dir_watcher.set_current_files([self.label_file.arpam_img_set.roi])
+            self._remember_boxes(roi_path, self.label_file.boxes)
+            self.roi_indexer.record(
+                {roi_path: roi_entry(self.label_file.boxes, good_PA, good_US)}
+            )
+            self.update_roi_stats()
+            self.update_en_face_boxes([(self.file_path, self.label_file.boxes)])
             return True
         except LabelFileError as e:
             self.error_message("Error saving label data", "<b>%s</b>" % e)
@@ -1168,13 +1637,10 @@ class MainWindow(QMainWindow, WindowMixin):
 
     def combo_selection_changed(self, index):
         text = self.combo_box.cb.itemText(index)
-        for i in range(self.label_list.count()):
-            if text == "":
-                self.label_list.item(i).setCheckState(2)
-            elif text != self.label_list.item(i).text():
-                self.label_list.item(i).setCheckState(0)
-            else:
-                self.label_list.item(i).setCheckState(2)
+        if text == "":
+            self.set_hidden_labels(())
+        else:
+            self.set_hidden_labels(self.frame_labels() - {text})
 
     def label_selection_changed(self):
         item = self.current_item()
@@ -1312,11 +1778,12 @@ class MainWindow(QMainWindow, WindowMixin):
         self.adjust_scale()
 
     def toggle_polygons(self, value):
-        for item, shape in self.items_to_shapes.items():
-            item.setCheckState(Qt.Checked if value else Qt.Unchecked)
+        self.set_hidden_labels(() if value else self.frame_labels())
 
     def load_file(self, file_path: Optional[str] = None):
         """Load the specified file, or the last opened file if None."""
+        self.stop_scrubbing()
+        self.stop_cine()
         self.reset_state()
         self.canvas.setEnabled(False)
         fpath = Path(file_path)
@@ -1331,17 +1798,15 @@ class MainWindow(QMainWindow, WindowMixin):
         # Tzutalin 20160906 : Add file list and dock to move faster
         # Highlight the file item
         if file_path and self.file_list_widget.count() > 0:
-            if file_path in self.m_img_list:
-                index = self.m_img_list.index(file_path)
-                file_widget_item = self.file_list_widget.item(index)
-                file_widget_item.setSelected(True)
+            if self._list_path(file_path) in self._file_items:
+                self._select_file_item(self._list_path(file_path))
             else:
                 self.file_list_widget.clear()
                 self.m_img_list.clear()
                 self.m_img_list_all.clear()
                 self.m_img_list_filtered.clear()
 
-        if file_path and os.path.exists(file_path):
+        if file_path and frame_exists(file_path):
             if LabelFile.is_label_file(file_path):
                 try:
                     self.label_file = LabelFile(file_path)
@@ -1363,7 +1828,7 @@ class MainWindow(QMainWindow, WindowMixin):
             else:
                 # Load image:
                 # read data first and store for saving into label file.
-                self.image_data = read(file_path, None)
+                self.image_data = self.read_image_file(file_path)
                 self.label_file = None
                 if self.label_file_format == LabelFileFormat.ARPAM:
                     ### Main read new roi file here
@@ -1417,6 +1882,7 @@ class MainWindow(QMainWindow, WindowMixin):
             self.image = image
             self.file_path = file_path
             self.canvas.load_pixmap(QPixmap.fromImage(image))
+            self.update_split_view()
             # if self.label_file:
             # self.load_labels(self.label_file.shapes)
             self.set_clean()
@@ -1427,9 +1893,17 @@ class MainWindow(QMainWindow, WindowMixin):
             self.toggle_actions(True)
             # self.show_bounding_box_from_annotation_file(file_path)
             self.load_arpam_labels()
+            self.load_predictions()
+            self.request_proposals()
+            self._roi_mtime_ns = self._current_roi_mtime()
+            self.dir_watcher.set_current_files([self.label_file.arpam_img_set.roi])
 
             counter = self.counter_str()
             self.setWindowTitle(__appname__ + " " + file_path + " " + counter)
+            self.en_face_view.set_current(
+                self._en_face_columns.get(self._list_path(file_path))
+            )
+            self._prefetch_neighbours()
 
             # Default : select last item if there is at least one item
             if self.label_list.count():
@@ -1445,10 +1919,8 @@ class MainWindow(QMainWindow, WindowMixin):
     def load_coregistered_file(self, fpath: str):
         # Highlight the file item
         if fpath and self.file_list_widget.count() > 0:
-            if fpath in self.m_img_list:
-                index = self.m_img_list.index(fpath)
-                file_widget_item = self.file_list_widget.item(index)
-                file_widget_item.setSelected(True)
+            if self._list_path(fpath) in self._file_items:
+                self._select_file_item(self._list_path(fpath))
             else:
                 self.file_list_widget.clear()
                 self.m_img_list_all.clear()
@@ -1456,7 +1928,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # Load image:
         # read data first and store for saving into label file.
-        self.image_data = read(fpath, None)
+        self.image_data = self.read_image_file(fpath)
 
         if isinstance(self.image_data, QImage):
             image = self.image_data
@@ -1474,14 +1946,18 @@ class MainWindow(QMainWindow, WindowMixin):
         self.status(f"Loaded {os.path.basename(fpath)} ({self.arpam_img_type})")
         self.image = image
         self.file_path = fpath
+        shapes, box_layer = self.canvas.shapes, self.canvas.box_layer
         self.canvas.load_pixmap(QPixmap.fromImage(image))
+        self.canvas.set_box_layer(box_layer)
+        self.show_predictions()
+        self.update_split_view()
 
         # self.canvas.setEnabled(True)
         # self.adjust_scale(initial=True)
         # self.paint_canvas()
         self.add_recent_file(self.file_path)
         # self.toggle_actions(True)
-        self.canvas.load_shapes(self._s)
+        self.canvas.load_shapes(shapes)
 
         counter = self.counter_str()
         self.setWindowTitle(__appname__ + " " + fpath + " " + counter)
@@ -1494,16 +1970,85 @@ class MainWindow(QMainWindow, WindowMixin):
         # self.canvas.setFocus(True)
         return True
 
+    def read_image_file(self, file_path: str) -> Optional[QImage]:
+        """
+        Read an image for display. Raw beamformed frames are kept in
+        `self.raw_frame` so the display window can be changed without
+        reading the file again.
+        """
+        self.raw_frame = None
+        if is_raw_frame(file_path):
+            try:
+                self.raw_frame = RawFrame.from_path(file_path)
+                image = self.raw_frame.render(self.display_window)
+            except (OSError, ValueError, KeyError) as e:
+                print(e)
+                self.raw_frame = None
+                image = None
+        else:
+            image = self.frame_cache.read(file_path, read)
+        self.window_container.setEnabled(self.raw_frame is not None)
+        return image
+
+    def toggle_split_view(self, _value=None):
+        self.update_split_view()
+        if not self.image.isNull():
+            self.adjust_scale()
+            self.paint_canvas()
+
+    def update_split_view(self):
+        """
+        Show the co-registered modalities of the current frame side by side.
+        Panes other than the current image come from the pixmap cache, the
+        missing ones decoded in parallel.
+        """
+        if (
+            not self.split_view_option.isChecked()
+            or self.arpam_img_type not in SPLIT_VIEW_TYPES
+            or not (self.label_file and self.label_file.arpam_roi_file)
+        ):
+            self.canvas.set_split_panes([])
+            return
+
+        img_set = self.label_file.arpam_img_set
+        paths = {}
+        for coreg_type in SPLIT_VIEW_TYPES:
+            path = str(img_set.to_type(coreg_type))
+            if coreg_type == self.arpam_img_type or frame_exists(path):
+                paths[coreg_type] = path
+        pixmaps = self.pixmap_cache.load_many(
+            [p for t, p in paths.items() if t != self.arpam_img_type],
+            partial(self.frame_cache.read, read=read),
+        )
+        panes = []
+        for coreg_type, path in paths.items():
+            if coreg_type == self.arpam_img_type:
+                panes.append((coreg_type.name, self.canvas.pixmap))
+                if self.raw_frame is None:
+                    self.pixmap_cache.put(path, self.canvas.pixmap)
+            elif path in pixmaps:
+                panes.append((coreg_type.name, pixmaps[path]))
+        self.canvas.set_split_panes(panes if len(panes) > 1 else [])
+
+    def display_window_changed(self, _value=None):
+        window = DisplayWindow(
+            self.window_low_input.value(), self.window_high_input.value()
+        )
+        if window.high_db <= window.low_db:
+            self.status("The display range must be increasing")
+            return
+        self.display_window = window
+        if self.raw_frame is not None:
+            self.image_data = self.image = self.raw_frame.render(window)
+            self.canvas.update_pixmap(QPixmap.fromImage(self.image))
+            self.update_split_view()
+
     def counter_str(self):
         """
         Converts image counter to string representation.
         """
         return "[{} / {}]".format(self.cur_img_idx + 1, len(self.m_img_list))
 
-    def show_bounding_box_from_annotation_file(self, file_path):
-        if self.label_file_format == LabelFileFormat.ARPAM:
-            self.load_arpam_labels(file_path)
-
     def resizeEvent(self, event):
         if (
             self.canvas
@@ -1533,19 +2078,30 @@ class MainWindow(QMainWindow, WindowMixin):
         h1 = self.centralWidget().height() - e
         a1 = w1 / h1
         # Calculate a new scale value based on the pixmap's aspect ratio.
-        w2 = self.canvas.pixmap.width() - 0.0
-        h2 = self.canvas.pixmap.height() - 0.0
+        size = self.canvas.content_size()
+        w2 = size.width() - 0.0
+        h2 = size.height() - 0.0
         a2 = w2 / h2
         return w1 / w2 if a2 >= a1 else h1 / h2
 
     def scale_fit_width(self):
         # The epsilon does not seem to work too well here.
         w = self.centralWidget().width() - 2.0
-        return w / self.canvas.pixmap.width()
+        return w / self.canvas.content_size().width()
 
     def closeEvent(self, event):
         if not self.may_continue():
             event.ignore()
+            return
+        if self.preannotator is not None:
+            self.preannotator.shutdown()
+        self.box_tracker.shutdown()
+        self.en_face_builder.shutdown()
+        self.cine_player.stop()
+        self.frame_cache.shutdown()
+        # The writer records its ROI files through the indexer
+        self.roi_writer.shutdown()
+        self.roi_indexer.shutdown()
         settings = self.settings
         # If it loads images from dir, don't load it at the beginning
         if self.dir_name is None:
@@ -1575,29 +2131,38 @@ class MainWindow(QMainWindow, WindowMixin):
         settings[SETTING_PAINT_LABEL] = self.display_label_option.isChecked()
         settings[SETTING_DRAW_SQUARE] = self.draw_squares_option.isChecked()
         settings[SETTING_LABEL_FILE_FORMAT] = self.label_file_format
+        settings[SETTING_DISPLAY_WINDOW] = tuple(self.display_window)
+        settings[SETTING_SPLIT_VIEW] = self.split_view_option.isChecked()
+        settings[SETTING_CINE_FPS] = self.cine_fps_input.value()
         settings.save()
 
     def load_recent(self, filename):
         if self.may_continue():
             self.load_file(filename)
 
-    def scan_all_images(self, folder_path: str) -> List[str]:
-        extensions = tuple(
-            ".%s" % fmt.data().decode("ascii").lower()
-            for fmt in QImageReader.supportedImageFormats()
+    def scan_all_images(
+        self, folder_path: str, recursive=False, errors: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Find images in `folder_path`. By default only the data root is scanned;
+        with `recursive`, all patient directories below it are included.
+        Directories that cannot be read are added to `errors` if given.
+        """
+        groups = scan_images(
+            [folder_path],
+            recursive=recursive,
+            sort_cache=self._sort_cache,
+            errors=errors,
         )
-        images = []
-
-        # Only grab images in the data root
-        root, dirs, files = next(os.walk(folder_path))
-        # for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(extensions):
-                relative_path = os.path.join(root, file)
-                path = os.path.abspath(relative_path)
-                images.append(path)
-        natural_sort(images, key=lambda x: x.lower())
-        return images
+        root = os.path.abspath(folder_path)
+        self._study_root = root if recursive else None
+        self.m_img_groups = {
+            d: os.path.relpath(d, root) for d in groups if recursive and d != root
+        }
+        self.image_sets = ImageSetIndex.from_paths(
+            p for images in groups.values() for p in images
+        )
+        return [image_set.path for image_set in self.image_sets]
 
     def change_save_dir_dialog(self, _value=False):
         if self.default_save_dir is not None:
@@ -1629,7 +2194,12 @@ class MainWindow(QMainWindow, WindowMixin):
 
         path = os.path.dirname(self.file_path) if self.file_path else "."
 
-    def open_dir_dialog(self, _value=False, dir_path=None, silent=False):
+    def open_study_dir_dialog(self, _value=False):
+        self.open_dir_dialog(recursive=True)
+
+    def open_dir_dialog(
+        self, _value=False, dir_path=None, silent=False, recursive=False
+    ):
         if not self.may_continue():
             return
 
@@ -1651,24 +2221,18 @@ class MainWindow(QMainWindow, WindowMixin):
         else:
             target_dir_path = default_open_dir_path
         self.last_open_dir = target_dir_path
-        self.import_dir_images(target_dir_path)
+        self.import_dir_images(target_dir_path, recursive)
+
+    def _passes_filter(self, img_path: str) -> bool:
+        image_set = self.image_sets.set_of(img_path)
+        if image_set is None or image_set.meta is None:
+            return False
+        img_meta = read_img_meta(image_set.meta)
+        return img_meta is not None and img_meta.mean_ratio > self._filter_thresh
 
     def _update_filtered_img_list(self):
         if self._last_filter_checked:
-            filtered = []
-            for img_path in self.m_img_list_all:
-                try:
-                    img_set = arpam_roi.CoImageSet.from_path(img_path)
-                except ValueError as e:
-                    print(e)
-                    continue
-                img_meta_p = img_set.meta
-                if img_meta_p.exists():
-                    img_meta = arpam_meta.ImgMeta.from_path(img_meta_p)
-
-                    if img_meta.mean_ratio > self._filter_thresh:
-                        filtered.append(img_path)
-
+            filtered = [p for p in self.m_img_list_all if self._passes_filter(p)]
             self.m_img_list_filtered = filtered
             self.m_img_list = filtered
 
@@ -1679,28 +2243,238 @@ class MainWindow(QMainWindow, WindowMixin):
 
     def _update_QList_files(self):
         self.file_list_widget.clear()
+        self._file_items.clear()
         if len(self.m_img_list) == 0:
             self.status("After filtering, no images are left.")
 
+        last_group = None
         for imgPath in self.m_img_list:
+            group = self.m_img_groups.get(os.path.dirname(imgPath))
+            if group is not None and group != last_group:
+                self.file_list_widget.addItem(self._new_group_item(group))
+            last_group = group
             item = QListWidgetItem(imgPath)
+            item.setData(Qt.UserRole, imgPath)
+            self._file_items[imgPath] = item
             self.file_list_widget.addItem(item)
 
-    def import_dir_images(self, dir_path):
+    def _new_group_item(self, group: str) -> QListWidgetItem:
+        """Non-selectable header shown above each patient's images."""
+        item = QListWidgetItem(group)
+        item.setFlags(Qt.NoItemFlags)
+        font = item.font()
+        font.setBold(True)
+        item.setFont(font)
+        return item
+
+    def _select_file_item(self, img_path: str):
+        item = self._file_items[img_path]
+        item.setSelected(True)
+        self.file_list_widget.scrollToItem(item)
+
+    def _insert_file_item(self, img_path: str, index: int):
+        """Add the dock item of `img_path`, now at `self.m_img_list[index]`."""
+        img_dir = os.path.dirname(img_path)
+        prev_dir = os.path.dirname(self.m_img_list[index - 1]) if index > 0 else None
+        next_path = (
+            self.m_img_list[index + 1] if index + 1 < len(self.m_img_list) else None
+        )
+        if next_path is None:
+            row = self.file_list_widget.count()
+        else:
+            row = self.file_list_widget.row(self._file_items[next_path])
+        if img_dir in self.m_img_groups:
+            if prev_dir != img_dir and (
+                next_path is None or os.path.dirname(next_path) != img_dir
+            ):
+                # First image of a group whose header is gone
+                self._update_QList_files()
+                return
+            if next_path is not None and os.path.dirname(next_path) != img_dir:
+                row -= 1  # before the next group's header
+
+        item = QListWidgetItem(img_path)
+        item.setData(Qt.UserRole, img_path)
+        self._file_items[img_path] = item
+        self.file_list_widget.insertItem(row, item)
+
+    def _list_path(self, img_path: str) -> str:
+        """The file that stands for the image set of `img_path` in the lists."""
+        image_set = self.image_sets.set_of(img_path)
+        return image_set.path if image_set is not None else img_path
+
+    def _path_in_current_modality(self, img_path: str) -> str:
+        """The file of the set of `img_path` in the modality being viewed."""
+        image_set = self.image_sets.set_of(img_path)
+        if image_set is None:
+            return img_path
+        return image_set.get(self.arpam_img_type) or img_path
+
+    def _prefetch_neighbours(self):
+        """Decompress the cached frames next to the current one in the background."""
+        n = len(self.m_img_list)
+        if n:
+            self.frame_cache.prefetch(
+                self._path_in_current_modality(
+                    self.m_img_list[(self.cur_img_idx + d) % n]
+                )
+                for d in (1, -1)
+            )
+
+    def _sync_cur_img_idx(self):
+        if self.file_path and self._list_path(self.file_path) in self._file_items:
+            self.cur_img_idx = self.m_img_list.index(self._list_path(self.file_path))
+        elif self.m_img_list:
+            self.cur_img_idx = min(self.cur_img_idx, len(self.m_img_list) - 1)
+        else:
+            self.cur_img_idx = 0
+        if self.file_path:
+            self.setWindowTitle(
+                __appname__ + " " + self.file_path + " " + self.counter_str()
+            )
+
+    def _insert_list_path(self, img_path: str):
+        index = natural_insort(self.m_img_list_all, img_path, path_sort_key)
+        if self._last_filter_checked:
+            if not self._passes_filter(img_path):
+                return
+            index = natural_insort(self.m_img_list_filtered, img_path, path_sort_key)
+        self._insert_file_item(img_path, index)
+
+    def _on_images_added(self, paths: List[str]):
+        for img_path in sorted(paths, key=path_sort_key):
+            if self.image_sets.set_of(img_path) is not None:
+                continue
+            img_dir = os.path.dirname(img_path)
+            if self._study_root is not None and img_dir != self._study_root:
+                # A patient directory created while the study is open
+                self.m_img_groups.setdefault(
+                    img_dir, os.path.relpath(img_dir, self._study_root)
+                )
+            image_set, old_path = self.image_sets.add(img_path)
+            if old_path == image_set.path:
+                continue  # another modality of a listed set
+            if old_path is not None:
+                self._remove_list_paths([old_path])
+            self._insert_list_path(image_set.path)
+        self._sync_cur_img_idx()
+        self.status(f"{len(paths)} new image(s) found")
+
+    def _on_images_removed(self, paths: List[str]):
+        removed, replacements = set(), []
+        for img_path in paths:
+            image_set, old_path = self.image_sets.remove(img_path)
+            if image_set is None or old_path == image_set.path:
+                continue
+            removed.add(old_path)
+            if image_set.path is not None:
+                replacements.append(image_set.path)
+        self._remove_list_paths(removed)
+        for img_path in replacements:
+            self._insert_list_path(img_path)
+        self._sync_cur_img_idx()
+
+    def _remove_list_paths(self, paths):
+        removed = set(paths)
+        # Slice assignment keeps m_img_list aliased to the list it points to
+        self.m_img_list_all[:] = [p for p in self.m_img_list_all if p not in removed]
+        self.m_img_list_filtered[:] = [
+            p for p in self.m_img_list_filtered if p not in removed
+        ]
+        emptied_group = False
+        for img_path in removed:
+            item = self._file_items.pop(img_path, None)
+            if item is not None:
+                self.file_list_widget.takeItem(self.file_list_widget.row(item))
+                emptied_group = (
+                    emptied_group or os.path.dirname(img_path) in self.m_img_groups
+                )
+        if emptied_group:
+            self._update_QList_files()
+        self._sync_cur_img_idx()
+
+    def _on_annotations_changed(self, paths: List[str]):
+        changed = set(paths)
+
+        # Meta files decide which images pass the filter
+        meta_changed = [
+            p for p in changed if os.path.basename(os.path.dirname(p)) == "meta"
+        ]
+        if self._last_filter_checked and meta_changed:
+            patient_dirs = {os.path.dirname(os.path.dirname(p)) for p in meta_changed}
+            filtered = set(self.m_img_list_filtered)
+            for img_path in self.m_img_list_all:
+                if os.path.dirname(img_path) not in patient_dirs:
+                    continue
+                passes = self._passes_filter(img_path)
+                if passes and img_path not in filtered:
+                    index = natural_insort(
+                        self.m_img_list_filtered, img_path, path_sort_key
+                    )
+                    self._insert_file_item(img_path, index)
+                elif not passes and img_path in filtered:
+                    self.m_img_list_filtered.remove(img_path)
+                    item = self._file_items.pop(img_path)
+                    self.file_list_widget.takeItem(self.file_list_widget.row(item))
+            self._sync_cur_img_idx()
+
+        # Reload the current labels if another program rewrote them
+        if self.label_file and self.label_file.arpam_img_set and not self.dirty:
+            roi_path = str(self.label_file.arpam_img_set.roi)
+            if roi_path in changed and self._current_roi_mtime() != self._roi_mtime_ns:
+                self.status(f"{roi_path} changed on disk, reloading")
+                self.load_file(self.file_path)
+
+    def _current_roi_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.label_file.arpam_img_set.roi).st_mtime_ns
+        except (AttributeError, OSError):
+            return None
+
+    def _watch_dirs(self, dir_path: str, recursive: bool):
+        root = os.path.abspath(dir_path)
+        image_dirs = {root: []}
+        if recursive:
+            # Also the directories without images yet, to see patients added
+            for d, dir_names, _ in os.walk(root):
+                dir_names[:] = [
+                    n
+                    for n in dir_names
+                    if n not in ANNOTATION_DIRS and not n.startswith(".")
+                ]
+                image_dirs.setdefault(os.path.abspath(d), [])
+        # The list holds one file per image set, the watcher needs them all
+        for image_set in self.image_sets:
+            for img_path in image_set.paths.values():
+                image_dirs.setdefault(os.path.dirname(img_path), []).append(img_path)
+        annotation_dirs = [
+            os.path.join(d, name) for d in image_dirs for name in ANNOTATION_DIRS
+        ]
+        self.dir_watcher.watch(image_dirs, annotation_dirs, recursive)
+
+    def import_dir_images(self, dir_path, recursive=False):
         if not self.may_continue() or not dir_path:
             return
 
         self.last_open_dir = dir_path
         self.dir_name = dir_path
+        self.stop_scrubbing()
         self.file_path = None
         self.file_list_widget.clear()
-        self.m_img_list_all = self.scan_all_images(dir_path)
+        self._tracked.clear()
+        errors = []
+        self.m_img_list_all = self.scan_all_images(dir_path, recursive, errors)
+        self._watch_dirs(dir_path, recursive)
 
         # Generate Filter list
         self._update_filtered_img_list()
 
         self.open_next_image()
         self._update_QList_files()
+        self.update_roi_stats()
+        self.update_en_face()
+        if errors:
+            self.status(f"Could not read {len(errors)} directories: {errors[0]}")
 
     def verify_image(self, _value=False):
         # Proceeding next image without dialog if having any label
@@ -1721,6 +2495,10 @@ class MainWindow(QMainWindow, WindowMixin):
             self.save_file()
 
     def open_prev_image(self, _value=False):
+        # Navigating during playback continues from the frame shown
+        self.stop_cine()
+        if self.scrub(-1):
+            return
         # Proceeding prev image without dialog if having any label
         if self.auto_saving.isChecked():
             if self.default_save_dir is not None:
@@ -1740,39 +2518,276 @@ class MainWindow(QMainWindow, WindowMixin):
             return
 
         self.cur_img_idx = (self.cur_img_idx - 1) % len(self.m_img_list)
-        filename = self.m_img_list[self.cur_img_idx]
+        filename = self._path_in_current_modality(self.m_img_list[self.cur_img_idx])
         if filename:
             try:
                 self.load_file(filename)
             except Exception as e:
                 print(e)
                 self.status(str(e))
+            self._nav_timer.start()
+
+    def scrub(self, step: int) -> bool:
+        """
+        Move `step` image sets and only show a preview of the frame, when
+        the navigation key is held or navigating again within NAV_SETTLE_MS.
+        Returns False if this is not the case and the frame should be loaded
+        as usual.
+        """
+        repeat, self._key_repeat = self._key_repeat, False
+        if not (repeat or self._nav_timer.isActive()):
+            return False
+        if self.dirty or not self.m_img_list:
+            return False
+        self.cur_img_idx = (self.cur_img_idx + step) % len(self.m_img_list)
+        path = self._path_in_current_modality(self.m_img_list[self.cur_img_idx])
+        if not self.show_preview(path):
+            self.load_file(path)
+        self._nav_timer.start()
+        return True
+
+    def show_preview(self, path: str) -> bool:
+        """
+        Show a downsampled frame of `path` without reading its labels. The
+        canvas is disabled until the frame is loaded.
+        """
+        pixmap = self.pixmap_cache.get(path)
+        if pixmap is None:
+            pixmap = self.preview_cache.get(path)
+        if pixmap is None:
+            try:
+                image = read_preview(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(e)
+                return False
+            if image.isNull():
+                return False
+            pixmap = QPixmap.fromImage(image)
+            self.preview_cache.put(path, pixmap)
+
+        self._show_frame_only(path, pixmap)
+        self._preview_path = path
+        return True
+
+    def _show_frame_only(self, path: str, pixmap: QPixmap):
+        """
+        Show `pixmap` of `path` on a read-only canvas, without its labels.
+        `file_path` is the frame shown, but no label file is loaded for it.
+        """
+        self.reset_state()
+        self.file_path = path
+        self.canvas.setEnabled(False)
+        self.canvas.load_pixmap(pixmap)
+        self.adjust_scale(initial=True)
+        self.paint_canvas()
+        if self._list_path(path) in self._file_items:
+            self._select_file_item(self._list_path(path))
+        self.setWindowTitle(__appname__ + " " + path + " " + self.counter_str())
+        self.en_face_view.set_current(self._en_face_columns.get(self._list_path(path)))
+
+    def stop_scrubbing(self):
+        """Drop the pending load of a previewed frame."""
+        self._nav_timer.stop()
+        self._preview_path = None
+
+    def finish_navigation(self):
+        """Fully load the frame that scrubbing stopped on."""
+        path, self._preview_path = self._preview_path, None
+        if path is not None:
+            self.load_file(path)
+
+    def toggle_cine(self, _value=False):
+        if self.cine_player.is_playing():
+            self.pause_cine()
+        else:
+            self.play_cine()
+
+    def play_cine(self):
+        """
+        Play the image sets from the current one on, in the modality being
+        viewed, with the boxes of their ROI files. The frames are decoded
+        ahead on background threads.
+        """
+        self.actions.playCine.setChecked(False)
+        if self.file_path is None or not self.may_continue():
+            return
+        start = self.cur_img_idx
+        if self._list_path(self.file_path) in self._file_items:
+            start = self.m_img_list.index(self._list_path(self.file_path))
+        coreg_type = self.arpam_img_type
+        frames = []
+        for i in range(start, len(self.m_img_list)):
+            image_set = self.image_sets.set_of(self.m_img_list[i])
+            path = image_set.get(coreg_type) if image_set is not None else None
+            if path is not None:
+                frames.append((path, i))
+        if not frames:
+            self.status(f"There are no {coreg_type.name} images to play")
+            return
+
+        self.stop_scrubbing()
+        self._cine_frames = frames
+        self._cine_index = None
+        self.cine_player.play(
+            [path for path, _ in frames],
+            partial(
+                read_cine_frame,
+                window=self.display_window,
+                read=partial(self.frame_cache.read, read=read_image),
+            ),
+            fps=self.cine_fps_input.value(),
+        )
+        self.actions.playCine.setChecked(True)
+        self.status(f"Playing {coreg_type.name}, press Ctrl+Space to pause and edit")
+
+    def show_cine_frame(self, index: int, frame):
+        path, self.cur_img_idx = self._cine_frames[index]
+        self._cine_index = index
+        self._show_frame_only(path, QPixmap.fromImage(frame.image))
+        boxes = self._pending_rois.get(self._roi_path(path), frame.boxes)
+        self.canvas.set_box_layer(boxes)
+
+    def stop_cine(self):
+        if self.cine_player.is_playing():
+            self.cine_player.stop()
+        self.actions.playCine.setChecked(False)
+
+    def pause_cine(self):
+        """Stop playing and load the frame shown for editing."""
+        self.stop_cine()
+        if self._cine_index is None:
+            return
+        path, self.cur_img_idx = self._cine_frames[self._cine_index]
+        dropped = self.cine_player.dropped
+        self._cine_index = None
+        self.load_file(path)
+        self.status(f"Paused at {os.path.basename(path)}, {dropped} frames dropped")
+
+    def cine_fps_changed(self, fps: int):
+        if self.cine_player.is_playing():
+            self.cine_player.set_fps(fps)
+
+    def _show_virtual_view(self, image: QImage, coreg_type: CoImageType):
+        """Display an image generated in memory for the current image set."""
+        self.arpam_img_type = coreg_type
+        self.image = image
+        shapes, box_layer = list(self.canvas.shapes), self.canvas.box_layer
+        self.canvas.load_pixmap(QPixmap.fromImage(image))
+        self.canvas.load_shapes(shapes)
+        if self._polar_view is None:
+            self.canvas.set_box_layer(box_layer)
+        self.show_predictions()
+        self.update_split_view()
+        self.adjust_scale(initial=True)
+        self.paint_canvas()
+        self.status(f"Showing {coreg_type.name} generated by scan conversion")
+
+    def _open_polar_view(self) -> bool:
+        """
+        Show the SUM frame scan-converted to polar coordinates, so no
+        SUM_POLAR file is needed. Boxes are mapped into the polar view.
+        """
+        if self.arpam_img_type == CoImageType.SUM and self.raw_frame is None:
+            cart = self.image
+        else:
+            sum_path = self.label_file.arpam_img_set.to_type(CoImageType.SUM)
+            if not frame_exists(str(sum_path)):
+                return False
+            cart = read(str(sum_path), None)
+        if cart is None or cart.isNull():
+            return False
+
+        converter = ScanConverter.for_cartesian(cart.width(), cart.height())
+        polar = converter.cart_to_polar(qimage_to_ndarray(cart))
+        origins = {}
+        for shape in self.canvas.shapes:
+            cart_points = list(shape.points)
+            xs = [p.x() for p in cart_points]
+            ys = [p.y() for p in cart_points]
+            amin, smin, amax, smax = converter.cart_box_to_polar(
+                min(xs), min(ys), max(xs), max(ys)
+            )
+            smax = min(smax, converter.n_samples)
+            shape.points = [
+                QPointF(amin, smin),
+                QPointF(amax, smin),
+                QPointF(amax, smax),
+                QPointF(amin, smax),
+            ]
+            origins[shape] = (list(shape.points), cart_points)
+
+        # Boxes of the box layer are hidden in the polar view
+        self._polar_view = Struct(
+            converter=converter,
+            cart_image=cart,
+            origins=origins,
+            box_layer=self.canvas.box_layer,
+        )
+        self._show_virtual_view(ndarray_to_qimage(polar), CoImageType.SUM_POLAR)
+        return True
+
+    def _polar_shape_to_cart(self, shape) -> List[QPointF]:
+        """Cartesian points of a shape in the polar view."""
+        polar_points, cart_points = self._polar_view.origins.get(shape, (None, None))
+        if polar_points == shape.points:  # not edited in the polar view
+            return cart_points
+        xs = [p.x() for p in shape.points]
+        ys = [p.y() for p in shape.points]
+        xmin, ymin, xmax, ymax = self._polar_view.converter.polar_box_to_cart(
+            min(xs), min(ys), max(xs), max(ys)
+        )
+        return [
+            QPointF(xmin, ymin),
+            QPointF(xmax, ymin),
+            QPointF(xmax, ymax),
+            QPointF(xmin, ymax),
+        ]
+
+    def _close_polar_view(self):
+        for shape in self.canvas.shapes:
+            shape.points = self._polar_shape_to_cart(shape)
+        self.image = self._polar_view.cart_image
+        self.canvas.set_box_layer(self._polar_view.box_layer)
+        self._polar_view = None
+
+    def _open_cart_from_polar(self) -> bool:
+        """Show a SUM view scan-converted from the SUM_POLAR file."""
+        img_set = self.label_file.arpam_img_set
+        polar_path = img_set.to_type(CoImageType.SUM_POLAR)
+        if frame_exists(str(img_set.to_type(CoImageType.SUM))) or not frame_exists(
+            str(polar_path)
+        ):
+            return False
+        polar = read(str(polar_path), None)
+        if polar is None or polar.isNull():
+            return False
+        converter = ScanConverter.for_polar(polar.height(), polar.width())
+        cart = converter.polar_to_cart(qimage_to_ndarray(polar))
+        self.image_data = ndarray_to_qimage(cart)
+        self._show_virtual_view(self.image_data, CoImageType.SUM)
+        return True
 
     def action_open_coreg_img(self, coreg_type: CoImageType):
-        # need to save current shapes before opening coreg image
+        # All modalities share one ROI file, so switching keeps the shapes in
+        # memory along with the dirty flag; they are written on the next save.
         if self.image.isNull():
             return
-        self.save_file()
         if (
             self.arpam_img_type != coreg_type
             and self.label_file
             and self.label_file.arpam_roi_file
         ):
-            try:
-                p = self.label_file.arpam_roi_file.img_set.to_type(coreg_type)
-                assert p.exists()
-                img_path = str(p)
-            except Exception as e:
-                self.status(str(e))
-                print(e)
-                self.error_dialog(f"Failed to open path {p}, Exception {e}")
-                img_path = str(self.label_file.arpam_roi_file.img_set.Sum)
+            if self._polar_view is not None:
+                self._close_polar_view()
+            if coreg_type == CoImageType.SUM_POLAR and self._open_polar_view():
+                return
+            if coreg_type == CoImageType.SUM and self._open_cart_from_polar():
+                return
 
-            try:
-                # update index
-                self.cur_img_idx = self.m_img_list.index(img_path)
-            except ValueError as e:  # file not found
-                print(e)
+            image_set = self.image_sets.set_of(self.file_path)
+            img_path = image_set.get(coreg_type) if image_set is not None else None
+            if img_path is None:
+                self.status(f"This image set has no {coreg_type.name} image")
                 return
 
             self.arpam_img_type = coreg_type
@@ -1780,6 +2795,10 @@ class MainWindow(QMainWindow, WindowMixin):
             print(f"opened {coreg_type.name}")
 
     def open_next_image(self, _value=False):
+        # Navigating during playback continues from the frame shown
+        self.stop_cine()
+        if self.scrub(1):
+            return
         # Proceeding prev image without dialog if having any label
         if self.auto_saving.isChecked():
             if self.default_save_dir is not None:
@@ -1802,10 +2821,11 @@ class MainWindow(QMainWindow, WindowMixin):
             self.cur_img_idx = 0
         else:
             self.cur_img_idx = (self.cur_img_idx + 1) % len(self.m_img_list)
-            filename = self.m_img_list[self.cur_img_idx]
+            filename = self._path_in_current_modality(self.m_img_list[self.cur_img_idx])
 
         if filename:
             self.load_file(filename)
+            self._nav_timer.start()
 
     def open_file(self, _value=False):
         if not self.may_continue():
@@ -1984,32 +3004,498 @@ class MainWindow(QMainWindow, WindowMixin):
                     else:
                         self.label_hist.append(line)
 
-    def load_arpam_labels(self):
-        # TODO
-        # self.arpam_roi_file = arpam_roi.ROI_File.from_img_path(img_path)
-        shapes = []
-        roi_file = self.label_file.arpam_roi_file
+    def load_arpam_labels(self, boxes: Optional[BoxStore] = None):
+        """Show `boxes`, or the boxes of the frame's ROI file."""
+        if boxes is None:
+            roi_path = str(self.label_file.arpam_img_set.roi)
+            if roi_path in self._pending_rois:
+                # The ROI file on disk is about to be replaced
+                self.label_file.boxes = self._pending_rois[roi_path]
+            self._remember_boxes(roi_path, self.label_file.boxes)
+            boxes = self.label_file.boxes.copy()
+        if len(boxes) > BOX_SHAPE_LIMIT:
+            if boxes.clip(self.canvas.pixmap.width(), self.canvas.pixmap.height()):
+                self.set_dirty()
+            self.load_labels([])
+            self.canvas.set_box_layer(boxes)
+            self.update_combo_box()
+            for action in self.actions.onShapesPresent:
+                action.setEnabled(True)
+            self.status(f"{len(boxes)} boxes, click a box to edit it")
+        else:
+            self.canvas.set_box_layer(None)
+            self.load_labels(boxes.shape_tuples())
+        self.canvas.verified = True
+
+    def _remember_boxes(self, roi_path: str, boxes: BoxStore):
+        for entry in list(self._recent_boxes):
+            if entry[0] == roi_path:
+                self._recent_boxes.remove(entry)
+        self._recent_boxes.append((roi_path, boxes))
+
+    def _recent_boxes_of(self, roi_path: str) -> Optional[BoxStore]:
+        if roi_path in self._pending_rois:
+            return self._pending_rois[roi_path]
+        for path, boxes in self._recent_boxes:
+            if path == roi_path:
+                return boxes
+        return None
+
+    def _roi_path(self, img_path: str) -> Optional[str]:
+        image_set = self.image_sets.set_of(img_path)
+        if image_set is not None:
+            return image_set.key if image_set.roi is not None else None
+        try:
+            return str(arpam_roi.CoImageSet.from_path(img_path).roi)
+        except Exception:
+            return None
+
+    def neighbour_image_sets(self, step: int, count: int) -> List[str]:
+        """
+        The `count` image sets before (step -1) or after (step 1) the
+        current one in the file list.
+        """
+        i = self.cur_img_idx
+        if self._list_path(self.file_path) in self._file_items:
+            i = self.m_img_list.index(self._list_path(self.file_path))
+        if step > 0:
+            candidates = self.m_img_list[i + 1 :]
+        else:
+            candidates = self.m_img_list[:i][::-1]
+        paths = (p for p in candidates if self._roi_path(p) is not None)
+        return list(islice(paths, count))
+
+    def import_predictions_dialog(self, _value=False):
+        path = self.file_path if self.file_path else "."
+        filters = "Predictions (%s)" % " ".join(
+            "*" + ext for ext in PREDICTION_EXTENSIONS
+        )
+        filename = QFileDialog.getOpenFileName(
+            self, "%s - Import Predictions" % __appname__, path, filters
+        )
+        if filename and filename[0]:
+            self.import_predictions(filename[0])
+
+    def import_predictions(self, path: str):
+        try:
+            predictions = PredictionFile(path)
+        except (OSError, ValueError, KeyError) as e:
+            self.error_message("Error importing predictions", str(e))
+            return
+        self.predictions = predictions
+        self.score_container.setEnabled(True)
+        self.status(
+            f"Imported {predictions.n_records} predictions"
+            f" for {len(predictions)} images"
+        )
+        if self.label_file and self.label_file.arpam_roi_file:
+            self.load_predictions()
+
+    def load_predictions(self):
+        """Read the predictions of the current image set, if any."""
+        self.prediction_set = None
+        self._proposals_shown = False
+        suggestions = None
+        if self.label_file:
+            img_set = self.label_file.arpam_img_set
+            paths = [self.file_path] + [
+                str(img_set.to_type(t)) for t in SPLIT_VIEW_TYPES
+            ]
+            size = (self.image.width(), self.image.height())
+            if self.predictions is not None:
+                self.prediction_set = self.predictions.frame_predictions(paths, size)
+            tracked = self._tracked_predictions(os.path.dirname(self.file_path))
+            if tracked is not None:
+                suggestions = tracked.frame_predictions(paths, size)
+                self.score_container.setEnabled(True)
+        if suggestions is not None and self.prediction_set is None:
+            self.prediction_set = suggestions
+        elif suggestions is not None:
+            self.prediction_set.extend(suggestions)
+        if self.prediction_set is not None:
+            self.prediction_set.suppress(self.label_file.boxes)
+            self.prediction_set.apply_threshold(self.score_threshold())
+        self.show_predictions()
+
+    def load_model_dialog(self, _value=False):
+        path = os.path.dirname(self.file_path) if self.file_path else "."
+        filters = "Models (%s)" % " ".join("*" + ext for ext in MODEL_EXTENSIONS)
+        filename = QFileDialog.getOpenFileName(
+            self, "%s - Load Pre-annotation Model" % __appname__, path, filters
+        )
+        if filename and filename[0]:
+            self.load_preannotation_model(filename[0])
+
+    def load_preannotation_model(self, path: str):
+        if self.preannotator is not None:
+            self.preannotator.shutdown()
+            self.preannotator = None
+        try:
+            preannotator = Preannotator(path, parent=self)
+        except OSError as e:
+            self.error_message("Error loading model", str(e))
+            return
+        preannotator.proposalsReady.connect(self.proposals_ready)
+        preannotator.failed.connect(self.status)
+        self.preannotator = preannotator
+        self.score_container.setEnabled(True)
+        self.status(f"Loaded pre-annotation model {os.path.basename(path)}")
+        if self.label_file and self.label_file.arpam_roi_file:
+            self.request_proposals()
+
+    def _sum_image_path(self, img_path: str) -> str:
+        """The SUM frame of an image set, which models and the tracker run on."""
+        image_set = self.image_sets.set_of(img_path)
+        if image_set is not None:
+            return image_set.get(CoImageType.SUM) or img_path
+        try:
+            sum_path = arpam_roi.CoImageSet.from_path(img_path).Sum
+        except Exception:
+            return img_path
+        return str(sum_path) if frame_exists(str(sum_path)) else img_path
+
+    def request_proposals(self):
+        """Show the current frame's proposals and run the model ahead."""
+        if self.preannotator is None or not self.label_file:
+            return
+        current = self._sum_image_path(self.file_path)
+        paths = [current]
+        start = self.cur_img_idx + 1
+        for img_path in self.m_img_list[start : start + PREANNOTATION_LOOKAHEAD]:
+            path = self._sum_image_path(img_path)
+            if path not in paths:
+                paths.append(path)
+        self.preannotator.request(paths)
+
+        proposals = self.preannotator.proposals(current)
+        if proposals is not None:
+            self.show_proposals(proposals)
+
+    def proposals_ready(self, path: str, proposals):
+        if (
+            not self._proposals_shown
+            and self.label_file
+            and path == self._sum_image_path(self.file_path)
+        ):
+            self.show_proposals(proposals)
+
+    def show_proposals(self, proposals):
+        """Add model proposals to the prediction layer of the frame."""
+        self._proposals_shown = True
+        labels = [self.preannotator.label(int(c)) for c in proposals[:, 5]]
+        size = (self.image.width(), self.image.height())
+        proposal_set = PredictionSet.from_normalized(labels, proposals, size)
+        proposal_set.suppress(self.label_file.boxes)
+        proposal_set.apply_threshold(self.score_threshold())
+        if self.prediction_set is None:
+            self.prediction_set = proposal_set
+        else:
+            self.prediction_set.extend(proposal_set)
+        self.show_predictions()
 
-        for bbox in roi_file.bboxes:
-            x_max = round(bbox.xmax * roi_file.size.w)
-            x_min = round(bbox.xmin * roi_file.size.w)
-            y_max = round(bbox.ymax * roi_file.size.h)
-            y_min = round(bbox.ymin * roi_file.size.h)
+    def show_predictions(self):
+        layer = self.prediction_set.boxes if self.prediction_set else None
+        self.canvas.set_prediction_layer(layer if self._polar_view is None else None)
 
-            points = [(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)]
+    def score_threshold(self) -> float:
+        return self.score_slider.value() / 100.0
 
-            shape = (bbox.name, points, None, None)
-            shapes.append(shape)
+    def score_threshold_changed(self, _value=None):
+        self.score_label.setText(f"Min prediction score: {self.score_threshold():.2f}")
+        if self.prediction_set is not None:
+            self.prediction_set.apply_threshold(self.score_threshold())
+            self.canvas.update()
 
-        self.load_labels(shapes)
-        self.canvas.verified = True
+    def accept_prediction(self, index: int):
+        """Copy a prediction into the editable boxes of the frame."""
+        self._accept_predictions([index])
+
+    def accept_predictions(self, _value=False):
+        if self.prediction_set is not None:
+            visible = self.prediction_set.boxes.visible()
+            self._accept_predictions(np.flatnonzero(visible).tolist())
+
+    def _accept_predictions(self, indices):
+        if not indices or self._polar_view is not None:
+            return
+        for label, points, _, _ in self.prediction_set.take(indices):
+            shape = self.shape_from_points(label, points)
+            self.canvas.shapes.append(shape)
+            self.add_label(shape)
+        self.set_dirty()
+        self.canvas.update()
 
     def copy_previous_bounding_boxes(self):
-        current_index = self.m_img_list.index(self.file_path)
-        if current_index - 1 >= 0:
-            prev_file_path = self.m_img_list[current_index - 1]
-            self.show_bounding_box_from_annotation_file(prev_file_path)
-            self.save_file()
+        """Replace the boxes of the frame with those of the previous image set."""
+        if not self.label_file or not self.label_file.arpam_roi_file:
+            return
+        if self._polar_view is not None:
+            self.status("Switch to a Cartesian view to copy boxes")
+            return
+        previous = self.neighbour_image_sets(-1, 1)
+        if not previous:
+            return
+        boxes = self._recent_boxes_of(self._roi_path(previous[0]))
+        if boxes is None:
+            try:
+                roi_file = arpam_roi.ROI_File.from_img_path(previous[0])
+            except Exception as e:
+                self.status(f"Cannot read the boxes of {previous[0]}: {e}")
+                return
+            boxes = BoxStore.from_roi_file(roi_file)
+        self.label_list.clear()
+        self.items_to_shapes.clear()
+        self.shapes_to_items.clear()
+        self.load_arpam_labels(boxes.copy())
+        self.set_dirty()
+
+    def track_box_dialog(self, _value=False):
+        shape = self.canvas.selected_shape
+        if shape is None or not self.label_file or self._polar_view is not None:
+            self.status("Select a box in a Cartesian view to track it")
+            return
+        count, ok = QInputDialog.getInt(
+            self,
+            "Track Selected Box",
+            "Number of following frames to track the box into:",
+            20,
+            1,
+            len(self.m_img_list),
+        )
+        if ok:
+            self.track_box(shape, count)
+
+    def track_box(self, shape, count: int):
+        """Track a box through the Sum images of the next `count` image sets."""
+        xs = [p.x() for p in shape.points]
+        ys = [p.y() for p in shape.points]
+        box = (min(xs), min(ys), max(xs), max(ys))
+        paths = [self._sum_image_path(self.file_path)] + [
+            self._sum_image_path(p) for p in self.neighbour_image_sets(1, count)
+        ]
+        if len(paths) > 1:
+            self.box_tracker.submit(shape.label, paths, box)
+            self.status(f"Tracking {shape.label} through {len(paths) - 1} frames")
+
+    def _tracked_predictions(self, img_dir: str) -> Optional[PredictionFile]:
+        """The tracked boxes saved in `img_dir`, if any."""
+        if img_dir not in self._tracked:
+            path = os.path.join(img_dir, TRACKED_PREDICTIONS_NAME)
+            tracked = None
+            if os.path.isfile(path):
+                try:
+                    tracked = PredictionFile(path)
+                except (OSError, ValueError, KeyError) as e:
+                    self.status(f"Cannot read the tracked boxes {path}: {e}")
+            self._tracked[img_dir] = tracked
+        return self._tracked[img_dir]
+
+    def box_tracked(self, label: str, paths, results):
+        """Save the tracked boxes as predictions next to their frames."""
+        records: Dict[str, List[dict]] = {}
+        for path, ((x0, y0, x1, y1), score) in zip(paths, results):
+            size = image_size(path)
+            if size is None:
+                continue
+            w, h = size
+            records.setdefault(os.path.dirname(path), []).append(
+                {
+                    "image": os.path.basename(path),
+                    "label": label,
+                    "xmin": x0 / w,
+                    "ymin": y0 / h,
+                    "xmax": x1 / w,
+                    "ymax": y1 / h,
+                    "score": score,
+                }
+            )
+        for img_dir, dir_records in records.items():
+            try:
+                append_predictions(
+                    os.path.join(img_dir, TRACKED_PREDICTIONS_NAME), dir_records
+                )
+            except OSError as e:
+                self.status(f"Cannot save the tracked boxes: {e}")
+                return
+            self._tracked.pop(img_dir, None)
+        self.score_container.setEnabled(True)
+        self.status(f"Tracked {label} through {len(results)} frames")
+
+    def copy_to_next_frames_dialog(self, _value=False):
+        if not self.label_file or not self.label_file.arpam_roi_file:
+            return
+        count, ok = QInputDialog.getInt(
+            self,
+            "Copy Boxes to Next Frames",
+            "Number of following frames to copy the boxes to:",
+            50,
+            1,
+            len(self.m_img_list),
+        )
+        if ok:
+            self.copy_to_next_frames(count)
+
+    def current_boxes(self) -> BoxStore:
+        """Boxes of the frame as they would be saved."""
+        shapes, image_data, box_layer = self.labels_to_save()
+        boxes = BoxStore.from_shapes(shapes)
+        if box_layer is not None:
+            boxes.extend(box_layer)
+        return boxes
+
+    def write_boxes_in_background(self, jobs):
+        """Queue (image path, boxes) ROI writes, showing the boxes meanwhile."""
+        for img_path, boxes in jobs:
+            self._pending_rois[self._roi_path(img_path)] = boxes
+        if jobs:
+            image = self.image
+            if self._polar_view is not None:
+                image = self._polar_view.cart_image
+            self.roi_writer.submit(jobs, (image.width(), image.height()))
+
+    def copy_to_next_frames(self, count: int):
+        """
+        Replace the boxes of the next `count` image sets with the boxes of
+        this frame. The ROI files are written in the background.
+        """
+        boxes = self.current_boxes()
+        jobs = [(p, boxes) for p in self.neighbour_image_sets(1, count)]
+        self.write_boxes_in_background(jobs)
+        if jobs:
+            self.status(f"Copying {len(boxes)} boxes to {len(jobs)} frames")
+
+    def mark_keyframe(self, _value=False):
+        if not self.label_file or not self.label_file.arpam_roi_file:
+            return
+        roi_path = str(self.label_file.arpam_img_set.roi)
+        self._keyframe = (roi_path, self.current_boxes())
+        self.status(f"Marked {os.path.basename(roi_path)} as keyframe")
+
+    def interpolate_from_keyframe(self, _value=False):
+        """
+        Linearly interpolate the boxes of the image sets between the
+        keyframe and this frame, and write them in the background.
+        """
+        if self._keyframe is None or not self.label_file:
+            self.status("Mark a keyframe (k) first")
+            return
+        key_roi, key_boxes = self._keyframe
+        between = None
+        for step in (-1, 1):
+            paths = self.neighbour_image_sets(step, len(self.m_img_list))
+            rois = [self._roi_path(p) for p in paths]
+            if key_roi in rois:
+                between = paths[: rois.index(key_roi)]
+                break
+        if not between:
+            self.status("No frames between the keyframe and this frame")
+            return
+
+        # Frames are ordered from the keyframe towards this frame
+        between.reverse()
+        boxes = self.current_boxes()
+        frames = interpolate_boxes(key_boxes, boxes, len(between))
+        self.write_boxes_in_background(list(zip(between, frames)))
+        self.status(f"Interpolating {len(frames[0])} boxes over {len(between)} frames")
+
+    def rois_written(self, jobs):
+        current = self._roi_path(self.file_path) if self.file_path else None
+        for img_path, boxes in jobs:
+            roi_path = self._roi_path(img_path)
+            if self._pending_rois.get(roi_path) is boxes:
+                del self._pending_rois[roi_path]
+            if roi_path == current:
+                # Already showing these boxes, do not reload them
+                self._roi_mtime_ns = self._current_roi_mtime()
+        self.status(f"Wrote {len(jobs)} ROI files")
+        self.update_roi_stats()
+        self.update_en_face_boxes(jobs)
+
+    def rois_write_failed(self, message: str, jobs):
+        """
+        Forget the boxes of a batch that could not be written, so the ROI
+        files are shown as they are on disk.
+        """
+        self.status(message)
+        current = self._roi_path(self.file_path) if self.file_path else None
+        reload = False
+        for img_path, boxes in jobs:
+            roi_path = self._roi_path(img_path)
+            if self._pending_rois.get(roi_path) is boxes:
+                del self._pending_rois[roi_path]
+            for entry in list(self._recent_boxes):
+                if entry[0] == roi_path and entry[1] is boxes:
+                    self._recent_boxes.remove(entry)
+            reload = reload or roi_path == current
+        if reload and self.label_file is not None and not self.dirty:
+            self.load_file(self.file_path)
+
+    def patient_dirs(self) -> List[str]:
+        return sorted({os.path.dirname(p) for p in self.m_img_list_all})
+
+    def update_roi_stats(self, _visible=None):
+        if self.stats_dock.isVisible():
+            self.roi_indexer.count(self.patient_dirs())
+
+    def show_roi_stats(self, stats: RoiStats):
+        self.stats_label.setText(stats.summary())
+        self.label_count_list.clear()
+        counts = sorted(stats.label_counts.items(), key=lambda c: -c[1])
+        for label, count in counts:
+            self.label_count_list.addTopLevelItem(QTreeWidgetItem([label, str(count)]))
+
+    def rebuild_roi_index(self, _value=False):
+        patient_dirs = self.patient_dirs()
+        if patient_dirs:
+            self.roi_indexer.rebuild(patient_dirs)
+            self.status(f"Rebuilding the ROI index of {len(patient_dirs)} patients")
+
+    def update_en_face(self, _value=None):
+        """Compute the en face map of the listed image sets, if it is shown."""
+        if not self.en_face_dock.isVisible():
+            return
+        coreg_type = self.en_face_type.currentData()
+        paths = []
+        for list_path in self.m_img_list:
+            image_set = self.image_sets.set_of(list_path)
+            path = image_set.get(coreg_type) if image_set is not None else None
+            if path is not None:
+                paths.append(path)
+        if not paths:
+            self.show_en_face(None)
+            return
+        self.en_face_builder.build(paths, self.en_face_projection.currentText())
+        self.status(f"Computing the en face map of {len(paths)} frames")
+
+    def show_en_face(self, en_face):
+        self._en_face_columns = {}
+        if en_face is not None:
+            for column, path in enumerate(en_face.paths):
+                self._en_face_columns[self._list_path(path)] = column
+        self.en_face_view.set_map(en_face)
+        if self.file_path:
+            self.en_face_view.set_current(
+                self._en_face_columns.get(self._list_path(self.file_path))
+            )
+
+    def update_en_face_boxes(self, jobs):
+        """Redraw the boxes of the written (image path, boxes) on the map."""
+        en_face = self.en_face_view.en_face
+        if en_face is None:
+            return
+        for img_path, boxes in jobs:
+            column = self._en_face_columns.get(self._list_path(img_path))
+            size = image_size(img_path) if column is not None else None
+            if size is not None:
+                en_face.spans[column] = box_spans(boxes, *size, en_face.n_alines)
+        self.en_face_view.update()
+
+    def en_face_clicked(self, column: int):
+        """Open the image set of a column of the map, keeping the modality."""
+        path = self.en_face_view.en_face.paths[column]
+        if self.may_continue():
+            self.load_file(self._path_in_current_modality(path))
+            self._sync_cur_img_idx()
 
     def toggle_paint_labels_option(self):
         for shape in self.canvas.shapes:
@@ -2025,9 +3511,7 @@ def inverted(color):
 
 def read(filename, default=None):
     try:
-        reader = QImageReader(filename)
-        reader.setAutoTransform(True)
-        return reader.read()
+        return read_image(filename)
     except:
         return default
 
@@ -2053,6 +3537,12 @@ def get_main_app(argv=None):
         nargs="?",
     )
     argparser.add_argument("save_dir", nargs="?")
+    argparser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="treat image_dir as a study and scan all patient directories in it",
+    )
     args = argparser.parse_args(argv[1:])
 
     args.image_dir = args.image_dir and os.path.normpath(args.image_dir)
@@ -2060,7 +3550,7 @@ def get_main_app(argv=None):
     args.save_dir = args.save_dir and os.path.normpath(args.save_dir)
 
     # Usage : labelImg.py image classFile saveDir
-    win = MainWindow(args.image_dir, args.class_file, args.save_dir)
+    win = MainWindow(args.image_dir, args.class_file, args.save_dir, args.recursive)
     win.show()
     return app, win
 
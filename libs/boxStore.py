@@ -0,0 +1,222 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# One row per box, in image pixel coordinates. Float64, so normalizing on
+# save gives back the coordinates the ROI file was read with
+BOX_DTYPE = np.dtype(
+    [
+        ("label", np.int32),
+        ("xmin", np.float64),
+        ("ymin", np.float64),
+        ("xmax", np.float64),
+        ("ymax", np.float64),
+        ("flags", np.uint8),
+    ]
+)
+
+# Bits of the `flags` column
+FLAG_HIDDEN = 1
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) intersection over union of two BOX_DTYPE arrays."""
+    iw = np.minimum(a["xmax"][:, None], b["xmax"]) - np.maximum(
+        a["xmin"][:, None], b["xmin"]
+    )
+    ih = np.minimum(a["ymax"][:, None], b["ymax"]) - np.maximum(
+        a["ymin"][:, None], b["ymin"]
+    )
+    inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+    area_a = (a["xmax"] - a["xmin"]) * (a["ymax"] - a["ymin"])
+    area_b = (b["xmax"] - b["xmin"]) * (b["ymax"] - b["ymin"])
+    union = area_a[:, None] + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+class BoxStore(object):
+    """
+    Boxes of one frame as a NumPy structured array, with label names
+    interned to integer ids.
+
+    Conversion from and to the normalized coordinates of an ROI file is
+    done for all boxes at once; Shape objects are only created for the
+    boxes that are edited.
+    """
+
+    def __init__(self, boxes: Optional[np.ndarray] = None, labels=()):
+        self.boxes = np.zeros(0, BOX_DTYPE) if boxes is None else boxes
+        self.labels: List[str] = list(labels)
+        self._label_ids: Dict[str, int] = {l: i for i, l in enumerate(self.labels)}
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def copy(self) -> "BoxStore":
+        return BoxStore(self.boxes.copy(), self.labels)
+
+    def label_id(self, label: str) -> int:
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return label_id
+
+    def label_of(self, index: int) -> str:
+        return self.labels[self.boxes["label"][index]]
+
+    @classmethod
+    def from_boxes(cls, boxes: Iterable[Tuple[str, float, float, float, float]]):
+        """Store for (label, xmin, ymin, xmax, ymax) tuples."""
+        store = cls()
+        rows = [(store.label_id(b[0]), b[1], b[2], b[3], b[4], 0) for b in boxes]
+        store.boxes = np.array(rows, dtype=BOX_DTYPE)
+        return store
+
+    @classmethod
+    def from_shapes(cls, shapes: Iterable[dict]) -> "BoxStore":
+        """Store for the shape dicts built by `MainWindow.save_labels`."""
+        boxes = []
+        for shape in shapes:
+            x = [p[0] for p in shape["points"]]
+            y = [p[1] for p in shape["points"]]
+            boxes.append((shape["label"], min(x), min(y), max(x), max(y)))
+        return cls.from_boxes(boxes)
+
+    @classmethod
+    def from_roi_file(cls, roi_file) -> "BoxStore":
+        """Boxes of an `arpamutils` ROI_File, scaled to pixels and rounded."""
+        store = cls.from_boxes(
+            (b.name, b.xmin, b.ymin, b.xmax, b.ymax) for b in roi_file.bboxes
+        )
+        w, h = roi_file.size.w, roi_file.size.h
+        for name, scale in (("xmin", w), ("xmax", w), ("ymin", h), ("ymax", h)):
+            store.boxes[name] = np.round(store.boxes[name] * scale)
+        return store
+
+    def write_roi_file(self, roi_file, w: int, h: int):
+        """Replace the boxes of `roi_file` with this store, normalized by (w, h)."""
+        boxes = self.boxes
+        xmin, xmax = boxes["xmin"] / w, boxes["xmax"] / w
+        ymin, ymax = boxes["ymin"] / h, boxes["ymax"] / h
+        roi_file.clear_bboxes()
+        for i, label_id in enumerate(boxes["label"].tolist()):
+            roi_file.add_bbox(
+                label=self.labels[label_id],
+                xmin=float(xmin[i]),
+                xmax=float(xmax[i]),
+                ymin=float(ymin[i]),
+                ymax=float(ymax[i]),
+            )
+
+    def append(self, label: str, xmin, ymin, xmax, ymax, flags=0) -> int:
+        row = np.array(
+            [(self.label_id(label), xmin, ymin, xmax, ymax, flags)], dtype=BOX_DTYPE
+        )
+        self.boxes = np.concatenate([self.boxes, row])
+        return len(self.boxes) - 1
+
+    def extend(self, other: "BoxStore") -> None:
+        rows = other.boxes.copy()
+        ids = np.array([self.label_id(l) for l in other.labels], dtype=np.int32)
+        if len(rows):
+            rows["label"] = ids[rows["label"]]
+        self.boxes = np.concatenate([self.boxes, rows])
+
+    def remove(self, indices) -> None:
+        self.boxes = np.delete(self.boxes, indices)
+
+    def clip(self, w: int, h: int) -> bool:
+        """Clip all boxes to a (w, h) image. Returns True if any box changed."""
+        boxes = self.boxes
+        before = boxes.copy()
+        for name, limit in (("xmin", w), ("xmax", w), ("ymin", h), ("ymax", h)):
+            np.clip(boxes[name], 0, limit, out=boxes[name])
+        return not np.array_equal(before, boxes)
+
+    def visible(self) -> np.ndarray:
+        return (self.boxes["flags"] & FLAG_HIDDEN) == 0
+
+    def set_hidden(self, hidden: np.ndarray):
+        """Set the hidden flag of the boxes in the `hidden` mask, clear the others."""
+        flags = self.boxes["flags"]
+        flags[hidden] |= FLAG_HIDDEN
+        flags[~hidden] &= ~np.uint8(FLAG_HIDDEN)
+
+    def label_mask(self, labels) -> np.ndarray:
+        """Mask of the boxes whose label is one of `labels`."""
+        ids = [i for i, label in enumerate(self.labels) if label in labels]
+        return np.isin(self.boxes["label"], ids)
+
+    def in_rect(self, x0, y0, x1, y1) -> np.ndarray:
+        """Mask of the boxes that intersect the rectangle."""
+        b = self.boxes
+        return (
+            (b["xmax"] >= x0)
+            & (b["xmin"] <= x1)
+            & (b["ymax"] >= y0)
+            & (b["ymin"] <= y1)
+        )
+
+    def hit(self, x: float, y: float) -> Optional[int]:
+        """Index of the smallest visible box containing (x, y), if any."""
+        b = self.boxes
+        mask = self.visible() & self.in_rect(x, y, x, y)
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return None
+        area = (b["xmax"] - b["xmin"]) * (b["ymax"] - b["ymin"])
+        return int(candidates[np.argmin(area[candidates])])
+
+    def shape_tuple(self, index: int):
+        """(label, points, line_color, fill_color), as taken by `load_labels`."""
+        b = self.boxes[index]
+        x0, y0, x1, y1 = (float(b[k]) for k in ("xmin", "ymin", "xmax", "ymax"))
+        points = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        return self.labels[b["label"]], points, None, None
+
+    def shape_tuples(self):
+        return [self.shape_tuple(i) for i in range(len(self.boxes))]
+
+
+def _pair_boxes(a: BoxStore, b: BoxStore) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices pairing the n-th box of each label in `a` with the n-th in `b`."""
+    a_ids = [a.labels[i] for i in a.boxes["label"].tolist()]
+    b_index: Dict[Tuple[str, int], int] = {}
+    counts: Dict[str, int] = {}
+    for j, label in enumerate(b.labels[i] for i in b.boxes["label"].tolist()):
+        b_index[label, counts.get(label, 0)] = j
+        counts[label] = counts.get(label, 0) + 1
+    counts.clear()
+    pairs = []
+    for i, label in enumerate(a_ids):
+        j = b_index.get((label, counts.get(label, 0)))
+        counts[label] = counts.get(label, 0) + 1
+        if j is not None:
+            pairs.append((i, j))
+    pairs = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def interpolate_boxes(a: BoxStore, b: BoxStore, n: int) -> List[BoxStore]:
+    """
+    Boxes of the `n` frames between keyframes `a` and `b`, linearly
+    interpolated. The n-th box of a label in `a` moves to the n-th box of
+    that label in `b`; boxes without a counterpart are left out.
+    """
+    ia, ib = _pair_boxes(a, b)
+    names = ("xmin", "ymin", "xmax", "ymax")
+    start = np.stack([a.boxes[k][ia] for k in names], axis=1)
+    end = np.stack([b.boxes[k][ib] for k in names], axis=1)
+    t = (np.arange(1, n + 1, dtype=np.float64) / (n + 1))[:, None, None]
+    coords = start + t * (end - start)  # (n, boxes, 4)
+
+    labels = a.boxes["label"][ia]
+    frames = []
+    for frame in coords:
+        rows = np.zeros(len(ia), BOX_DTYPE)
+        rows["label"] = labels
+        for k, name in enumerate(names):
+            rows[name] = frame[:, k]
+        frames.append(BoxStore(rows, a.labels))
+    return frames
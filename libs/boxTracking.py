@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from libs.imageLoader import read_gray_array
+
+Box = Tuple[float, float, float, float]  # xmin, ymin, xmax, ymax in pixels
+
+
+def _downsample(image: np.ndarray, factor: int) -> np.ndarray:
+    """Block mean of `factor` x `factor` pixels."""
+    if factor == 1:
+        return image
+    h, w = image.shape[0] // factor, image.shape[1] // factor
+    blocks = image[: h * factor, : w * factor].reshape(h, factor, w, factor)
+    return blocks.mean(axis=(1, 3))
+
+
+def _window_sums(image: np.ndarray, h: int, w: int) -> np.ndarray:
+    """Sums of all h x w windows of `image`, from its integral image."""
+    s = np.zeros((image.shape[0] + 1, image.shape[1] + 1), np.float64)
+    np.cumsum(np.cumsum(image, axis=0), axis=1, out=s[1:, 1:])
+    return s[h:, w:] - s[:-h, w:] - s[h:, :-w] + s[:-h, :-w]
+
+
+def ncc_map(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """
+    Normalized cross-correlation of `template` at every position where it
+    fits inside `image`, in -1..1. The correlation is computed with FFTs
+    and the local image statistics with integral images.
+    """
+    h, w = template.shape
+    H, W = image.shape
+    if h > H or w > W or h == 0 or w == 0:
+        return np.zeros((0, 0), np.float32)
+    t = template - template.mean()
+    t_norm = np.sqrt(np.sum(t * t))
+    corr = np.fft.irfft2(
+        np.fft.rfft2(image) * np.conj(np.fft.rfft2(t, s=image.shape)), s=image.shape
+    )[: H - h + 1, : W - w + 1]
+
+    n = h * w
+    sums = _window_sums(image, h, w)
+    var = _window_sums(image * image, h, w) - sums * sums / n
+    denom = np.sqrt(np.clip(var, 0, None)) * t_norm
+    ncc = np.zeros_like(corr)
+    np.divide(corr, denom, out=ncc, where=denom > 1e-6 * n)
+    return ncc.astype(np.float32)
+
+
+def track_box(
+    frames: Sequence[np.ndarray], box: Box, margin: float = 0.5, max_side: int = 32
+) -> List[Tuple[Box, float]]:
+    """
+    Follow `box` of frames[0] through the following frames.
+
+    Each step matches the box's content in the previous frame against a
+    search window `margin` box sizes larger on every side, both
+    downsampled so the template's longer side is at most `max_side`
+    pixels, then refines the best match at full resolution. Returns the
+    (box, NCC score) of frames[1:].
+    """
+    x0, y0, x1, y1 = (int(round(v)) for v in box)
+    results: List[Tuple[Box, float]] = []
+    for prev, frame in zip(frames, frames[1:]):
+        bw, bh = x1 - x0, y1 - y0
+        if bw <= 0 or bh <= 0:
+            break
+        factor = max(1, -(-max(bw, bh) // max_side))
+        sx0, sy0 = max(0, x0 - int(margin * bw)), max(0, y0 - int(margin * bh))
+        sx1 = min(frame.shape[1], x1 + int(margin * bw))
+        sy1 = min(frame.shape[0], y1 + int(margin * bh))
+
+        template = _downsample(prev[y0:y1, x0:x1], factor)
+        window = _downsample(frame[sy0:sy1, sx0:sx1], factor)
+        ncc = ncc_map(window, template)
+        if not ncc.size:
+            break
+        iy, ix = np.unravel_index(np.argmax(ncc), ncc.shape)
+        cx0, cy0 = sx0 + ix * factor, sy0 + iy * factor
+        if factor > 1:
+            # Refine the coarse match at full resolution
+            rx0, ry0 = max(0, cx0 - factor), max(0, cy0 - factor)
+            rx1 = min(frame.shape[1], cx0 + bw + factor)
+            ry1 = min(frame.shape[0], cy0 + bh + factor)
+            fine = ncc_map(frame[ry0:ry1, rx0:rx1], prev[y0:y1, x0:x1])
+            if fine.size:
+                ncc = fine
+                iy, ix = np.unravel_index(np.argmax(ncc), ncc.shape)
+                cx0, cy0 = rx0 + ix, ry0 + iy
+        x0, y0 = cx0, cy0
+        x1, y1 = x0 + bw, y0 + bh
+        results.append(
+            ((float(x0), float(y0), float(x1), float(y1)), float(ncc[iy, ix]))
+        )
+    return results
+
+
+class BoxTracker(QObject):
+    """
+    Tracks boxes into following frames on a background thread. The
+    frames are decoded in parallel by a pool of reader threads.
+    `tracked` is emitted with the label, the frame paths and the
+    (box, score) results, delivered to GUI-thread slots queued.
+    """
+
+    tracked = pyqtSignal(str, list, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, max_readers: int = 4, parent=None):
+        super(BoxTracker, self).__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._readers = ThreadPoolExecutor(max_workers=max_readers)
+
+    def submit(self, label: str, paths: List[str], box: Box):
+        """Track `box` of paths[0] through paths[1:]."""
+        future = self._executor.submit(self._track, paths, box)
+        future.add_done_callback(partial(self._done, label, paths[1:]))
+
+    def _track(self, paths: List[str], box: Box):
+        frames = list(self._readers.map(read_gray_array, paths))
+        return track_box(frames, box)
+
+    def _done(self, label: str, paths: List[str], future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failed.emit(f"Tracking failed: {future.exception()}")
+            return
+        results = future.result()
+        self.tracked.emit(label, paths[: len(results)], results)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._readers.shutdown(wait=False, cancel_futures=True)
@@ -2,8 +2,11 @@ from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
 
+import numpy as np
+
 from libs.shape import Shape
-from libs.utils import distance
+from libs.uiScheduler import UiUpdateScheduler
+from libs.utils import distance, generate_color_by_text
 
 CURSOR_DEFAULT = Qt.ArrowCursor
 CURSOR_POINT = Qt.PointingHandCursor
@@ -19,13 +22,20 @@ class Canvas(QWidget):
     selectionChanged = pyqtSignal(bool)
     shapeMoved = pyqtSignal()
     drawingPolygon = pyqtSignal(bool)
+    boxPicked = pyqtSignal(int)
+    predictionPicked = pyqtSignal(int)
 
     CREATE, EDIT = list(range(2))
 
     epsilon = 11.0
 
-    def __init__(self, *args, **kwargs):
+    # Space between the panes of the split view, in image pixels
+    split_gap = 8
+
+    def __init__(self, *args, ui_updates=None, **kwargs):
         super(Canvas, self).__init__(*args, **kwargs)
+        # Status, tooltip and cursor changes, applied once per display frame
+        self.ui_updates = ui_updates or UiUpdateScheduler(self)
         # Initialise local state.
         self.mode = self.EDIT
         self.shapes = []
@@ -40,7 +50,16 @@ class Canvas(QWidget):
         self.scale = 1.0
         self.label_font_size = 8
         self.pixmap = QPixmap()
+        # (title, pixmap) panes of the split view, all showing self.shapes
+        self.split_panes = []
+        # BoxStore of boxes drawn in bulk; a box becomes a Shape when picked
+        self.box_layer = None
+        # Read-only BoxStore of predicted boxes, drawn dashed
+        self.prediction_layer = None
+        self._layer_rect = None
         self.visible = {}
+        # Labels whose shapes and box layer boxes are hidden
+        self.hidden_labels = set()
         self._hide_background = False
         self.hide_background = False
         self.h_shape = None
@@ -72,7 +91,8 @@ class Canvas(QWidget):
         self.restore_cursor()
 
     def isVisible(self, shape):
-        return self.visible.get(shape, True)
+        # A shape shown or hidden on its own overrides its class
+        return self.visible.get(shape, shape.label not in self.hidden_labels)
 
     def drawing(self):
         return self.mode == self.CREATE
@@ -103,9 +123,7 @@ class Canvas(QWidget):
         # Update coordinates in status bar if image is opened
         window = self.parent().window()
         if window.file_path is not None:
-            self.parent().window().label_coordinates.setText(
-                "X: %d; Y: %d" % (pos.x(), pos.y())
-            )
+            self.show_coordinates("X: %d; Y: %d" % (pos.x(), pos.y()))
 
         # Polygon drawing.
         if self.drawing():
@@ -114,7 +132,7 @@ class Canvas(QWidget):
                 # Display annotation width and height while drawing
                 current_width = abs(self.current[0].x() - pos.x())
                 current_height = abs(self.current[0].y() - pos.y())
-                self.parent().window().label_coordinates.setText(
+                self.show_coordinates(
                     "Width: %d, Height: %d / X: %d; Y: %d"
                     % (current_width, current_height, pos.x(), pos.y())
                 )
@@ -180,7 +198,7 @@ class Canvas(QWidget):
                 point3 = self.h_shape[3]
                 current_width = abs(point1.x() - point3.x())
                 current_height = abs(point1.y() - point3.y())
-                self.parent().window().label_coordinates.setText(
+                self.show_coordinates(
                     "Width: %d, Height: %d / X: %d; Y: %d"
                     % (current_width, current_height, pos.x(), pos.y())
                 )
@@ -195,7 +213,7 @@ class Canvas(QWidget):
                 point3 = self.selected_shape[3]
                 current_width = abs(point1.x() - point3.x())
                 current_height = abs(point1.y() - point3.y())
-                self.parent().window().label_coordinates.setText(
+                self.show_coordinates(
                     "Width: %d, Height: %d / X: %d; Y: %d"
                     % (current_width, current_height, pos.x(), pos.y())
                 )
@@ -212,7 +230,7 @@ class Canvas(QWidget):
         # - Highlight shapes
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
-        self.setToolTip("Image")
+        tool_tip = "Image"
         for shape in reversed([s for s in self.shapes if self.isVisible(s)]):
             # Look for a nearby vertex to highlight. If that fails,
             # check if we happen to be inside a shape.
@@ -223,16 +241,14 @@ class Canvas(QWidget):
                 self.h_vertex, self.h_shape = index, shape
                 shape.highlight_vertex(index, shape.MOVE_VERTEX)
                 self.override_cursor(CURSOR_POINT)
-                self.setToolTip("Click & drag to move point")
-                self.setStatusTip(self.toolTip())
+                tool_tip = "Click & drag to move point"
                 self.update()
                 break
             elif shape.contains_point(pos):
                 if self.selected_vertex():
                     self.h_shape.highlight_clear()
                 self.h_vertex, self.h_shape = None, shape
-                self.setToolTip("Click & drag to move shape '%s'" % shape.label)
-                self.setStatusTip(self.toolTip())
+                tool_tip = "Click & drag to move shape '%s'" % shape.label
                 self.override_cursor(CURSOR_GRAB)
                 self.update()
 
@@ -241,7 +257,7 @@ class Canvas(QWidget):
                 point3 = self.h_shape[3]
                 current_width = abs(point1.x() - point3.x())
                 current_height = abs(point1.y() - point3.y())
-                self.parent().window().label_coordinates.setText(
+                self.show_coordinates(
                     "Width: %d, Height: %d / X: %d; Y: %d"
                     % (current_width, current_height, pos.x(), pos.y())
                 )
@@ -252,8 +268,11 @@ class Canvas(QWidget):
                 self.update()
             self.h_vertex, self.h_shape = None, None
             self.override_cursor(CURSOR_DEFAULT)
+        self.ui_updates.set_tool_tip(self, tool_tip)
 
     def mousePressEvent(self, ev):
+        # Apply pending cursor changes before pushing the pan cursor
+        self.ui_updates.flush()
         pos = self.transform_pos(ev.pos())
 
         if ev.button() == Qt.LeftButton:
@@ -348,6 +367,11 @@ class Canvas(QWidget):
         if self.can_close_shape() and len(self.current) > 3:
             self.current.pop_point()
             self.finalise()
+        elif self.editing() and self.prediction_layer is not None:
+            pos = self.transform_pos(ev.pos())
+            index = self.prediction_layer.hit(pos.x(), pos.y())
+            if index is not None:
+                self.predictionPicked.emit(index)
 
     def select_shape(self, shape):
         self.de_select_shape()
@@ -370,6 +394,15 @@ class Canvas(QWidget):
                 self.select_shape(shape)
                 self.calculate_offsets(shape, point)
                 return self.selected_shape
+        if self.box_layer is not None and self.editing():
+            index = self.box_layer.hit(point.x(), point.y())
+            if index is not None:
+                # The listener turns the box into a Shape and removes it
+                # from the layer, so it is found by the loop above
+                n_shapes = len(self.shapes)
+                self.boxPicked.emit(index)
+                if len(self.shapes) > n_shapes:
+                    return self.select_shape_point(point)
         return None
 
     def calculate_offsets(self, shape, point):
@@ -507,9 +540,45 @@ class Canvas(QWidget):
         p.scale(self.scale, self.scale)
         p.translate(self.offset_to_center())
 
-        p.drawPixmap(0, 0, self.pixmap)
         Shape.scale = self.scale
         Shape.label_font_size = self.label_font_size
+        self._layer_rect = None
+        if not self.split_panes:
+            # Only boxes in the exposed area are drawn
+            r = QRectF(event.rect())
+            top_left = r.topLeft() / self.scale - self.offset_to_center()
+            bottom_right = r.bottomRight() / self.scale - self.offset_to_center()
+            self._layer_rect = (
+                top_left.x(),
+                top_left.y(),
+                bottom_right.x(),
+                bottom_right.y(),
+            )
+        panes = self.split_panes or [(None, self.pixmap)]
+        for origin, (title, pixmap) in zip(self.pane_origins(), panes):
+            p.save()
+            p.translate(origin)
+            self.paint_pane(p, pixmap, title)
+            p.restore()
+
+        self.setAutoFillBackground(True)
+        if self.verified:
+            pal = self.palette()
+            pal.setColor(self.backgroundRole(), QColor(184, 239, 38, 128))
+            self.setPalette(pal)
+        else:
+            pal = self.palette()
+            pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
+            self.setPalette(pal)
+
+        p.end()
+
+    def paint_pane(self, p, pixmap, title=None):
+        """Paint one image and the shared shapes in image coordinates."""
+        w, h = self.pixmap.width(), self.pixmap.height()
+        p.drawPixmap(QRectF(0, 0, w, h), pixmap, QRectF(pixmap.rect()))
+        self.paint_box_layer(p, self.box_layer)
+        self.paint_box_layer(p, self.prediction_layer, Qt.DashLine)
         for shape in self.shapes:
             if (shape.selected or not self._hide_background) and self.isVisible(shape):
                 shape.fill = shape.selected or shape == self.h_shape
@@ -542,26 +611,95 @@ class Canvas(QWidget):
             )
             p.drawLine(0, int(self.prev_point.y()), self.pixmap.width(), int(self.prev_point.y()))
 
-        self.setAutoFillBackground(True)
-        if self.verified:
-            pal = self.palette()
-            pal.setColor(self.backgroundRole(), QColor(184, 239, 38, 128))
-            self.setPalette(pal)
-        else:
-            pal = self.palette()
-            pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
-            self.setPalette(pal)
+        if title:
+            p.setPen(QColor(255, 255, 255))
+            p.setFont(QFont("Sans Serif", max(self.label_font_size, 8)))
+            p.drawText(QPointF(4, 4 + max(self.label_font_size, 8)), title)
 
-        p.end()
+    def paint_box_layer(self, p, layer, style=Qt.SolidLine):
+        """Draw the visible boxes of a BoxStore, one drawRects call per label."""
+        if layer is None or not len(layer):
+            return
+        mask = layer.visible()
+        if self._layer_rect is not None:
+            mask &= layer.in_rect(*self._layer_rect)
+        boxes = layer.boxes[mask]
+        p.setBrush(Qt.NoBrush)
+        for label_id in np.unique(boxes["label"]).tolist():
+            rows = boxes[boxes["label"] == label_id]
+            pen = QPen(generate_color_by_text(layer.labels[label_id]).lighter())
+            pen.setWidth(max(1, int(round(2.0 / self.scale))))
+            pen.setStyle(style)
+            p.setPen(pen)
+            p.drawRects(
+                [
+                    QRectF(x0, y0, x1 - x0, y1 - y0)
+                    for x0, y0, x1, y1 in zip(
+                        rows["xmin"].tolist(),
+                        rows["ymin"].tolist(),
+                        rows["xmax"].tolist(),
+                        rows["ymax"].tolist(),
+                    )
+                ]
+            )
+
+    def set_box_layer(self, layer):
+        self.box_layer = layer
+        if layer is not None:
+            layer.set_hidden(layer.label_mask(self.hidden_labels))
+        self.update()
+
+    def set_prediction_layer(self, layer):
+        self.prediction_layer = layer
+        self.update()
+
+    def split_grid(self):
+        """(columns, rows) of the split view; four panes are laid out 2x2."""
+        n = max(len(self.split_panes), 1)
+        return (2, 2) if n == 4 else (n, 1)
+
+    def pane_origins(self):
+        cols, rows = self.split_grid()
+        w = self.pixmap.width() + self.split_gap
+        h = self.pixmap.height() + self.split_gap
+        return [QPointF(c * w, r * h) for r in range(rows) for c in range(cols)]
+
+    def content_size(self):
+        """Size of everything painted, in image pixels."""
+        cols, rows = self.split_grid()
+        gap = self.split_gap
+        return QSize(
+            cols * (self.pixmap.width() + gap) - gap,
+            rows * (self.pixmap.height() + gap) - gap,
+        )
+
+    def set_split_panes(self, panes):
+        """
+        Show (title, pixmap) panes side by side, every pane drawing the same
+        shapes with the same transform. An empty list shows only `pixmap`.
+        """
+        self.split_panes = list(panes)
+        self.adjustSize()
+        self.update()
 
     def transform_pos(self, point):
         """Convert from widget-logical coordinates to painter-logical coordinates."""
-        return point / self.scale - self.offset_to_center()
+        pos = point / self.scale - self.offset_to_center()
+        if self.split_panes:
+            # Positions in any pane map onto the same image coordinates
+            cols, rows = self.split_grid()
+            w = self.pixmap.width() + self.split_gap
+            h = self.pixmap.height() + self.split_gap
+            col = min(max(int(pos.x() // w), 0), cols - 1)
+            row = min(max(int(pos.y() // h), 0), rows - 1)
+            pos -= QPointF(col * w, row * h)
+        return pos
 
     def offset_to_center(self):
         s = self.scale
         area = super(Canvas, self).size()
-        w, h = self.pixmap.width() * s, self.pixmap.height() * s
+        size = self.content_size()
+        w, h = size.width() * s, size.height() * s
         aw, ah = area.width(), area.height()
         x = (aw - w) / (2 * s) if aw > w else 0
         y = (ah - h) / (2 * s) if ah > h else 0
@@ -599,7 +737,7 @@ class Canvas(QWidget):
 
     def minimumSizeHint(self):
         if self.pixmap:
-            return self.scale * self.pixmap.size()
+            return self.scale * self.content_size()
         return super(Canvas, self).minimumSizeHint()
 
     def wheelEvent(self, ev):
@@ -705,9 +843,17 @@ class Canvas(QWidget):
 
     def load_pixmap(self, pixmap):
         self.pixmap = pixmap
+        self.split_panes = []
+        self.box_layer = None
+        self.prediction_layer = None
         self.shapes = []
         self.repaint()
 
+    def update_pixmap(self, pixmap):
+        """Replace the displayed image of the same frame, keeping the shapes."""
+        self.pixmap = pixmap
+        self.update()
+
     def load_shapes(self, shapes):
         self.shapes = list(shapes)
         self.current = None
@@ -717,6 +863,24 @@ class Canvas(QWidget):
         self.visible[shape] = value
         self.repaint()
 
+    def set_hidden_labels(self, labels):
+        """
+        Hide the shapes and layer boxes of `labels` and show all others,
+        with one repaint. Shapes shown or hidden on their own keep that
+        unless this call hides or shows their class.
+        """
+        labels = set(labels)
+        changed = labels ^ self.hidden_labels
+        self.hidden_labels = labels
+        self.visible = {
+            shape: value
+            for shape, value in self.visible.items()
+            if shape.label not in changed
+        }
+        if self.box_layer is not None:
+            self.box_layer.set_hidden(self.box_layer.label_mask(self.hidden_labels))
+        self.repaint()
+
     def current_cursor(self):
         cursor = QApplication.overrideCursor()
         if cursor is not None:
@@ -725,17 +889,22 @@ class Canvas(QWidget):
 
     def override_cursor(self, cursor):
         self._cursor = cursor
-        if self.current_cursor() is None:
-            QApplication.setOverrideCursor(cursor)
-        else:
-            QApplication.changeOverrideCursor(cursor)
+        self.ui_updates.override_cursor(cursor)
 
     def restore_cursor(self):
-        QApplication.restoreOverrideCursor()
+        self.ui_updates.restore_cursor()
+
+    def show_coordinates(self, text):
+        """Show `text` in the coordinates label of the status bar."""
+        self.ui_updates.set_text(self.parent().window().label_coordinates, text)
 
     def reset_state(self):
         self.restore_cursor()
         self.pixmap = None
+        self.split_panes = []
+        self.box_layer = None
+        self.prediction_layer = None
+        self.hidden_labels = set()
         self.update()
 
     def set_drawing_shape_to_square(self, status):
@@ -0,0 +1,206 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import os
+import threading
+import time
+
+from PyQt5.QtCore import QObject, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from libs.boxStore import BoxStore
+from libs.imageLoader import read_image
+from libs.rawFrame import DisplayWindow, RawFrame, is_raw_frame
+
+# Number of frames decoded ahead of the playback position
+CINE_BUFFER = 16
+
+
+class CineFrame(NamedTuple):
+    image: QImage
+    boxes: Optional[BoxStore]  # boxes of the ROI file in pixels, None if none
+
+
+def read_cine_frame(
+    path: str,
+    window: DisplayWindow = DisplayWindow(),
+    read: Callable[[str], QImage] = read_image,
+) -> CineFrame:
+    """Decode a frame with `read` and read the boxes of its ROI file."""
+    # Only playback needs arpamutils here
+    from arpamutils.roi import CoImageSet, ROI_File
+
+    if is_raw_frame(path):
+        image = RawFrame.from_path(path).render(window)
+    else:
+        image = read(path)
+    boxes = None
+    try:
+        if CoImageSet.from_path(path).roi.exists():
+            boxes = BoxStore.from_roi_file(ROI_File.from_img_path(path))
+    except ValueError:
+        pass
+    return CineFrame(image, boxes)
+
+
+class CineBuffer(object):
+    """
+    Ring buffer of the frames decoded ahead of the playback position.
+
+    Frame i lives in slot i % capacity while it is inside the window of
+    `capacity` frames starting at the position. A pool of decoder threads
+    fills the missing slots; frames that fall behind the position before
+    their decoding starts are skipped.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        read: Callable[[str], CineFrame],
+        capacity: int = CINE_BUFFER,
+        max_workers: Optional[int] = None,
+    ):
+        self.paths = paths
+        self.capacity = capacity
+        self._read = read
+        self._slots: List[Optional[Tuple[int, Optional[CineFrame]]]] = [None] * capacity
+        self._queued = set()
+        self._errors: Dict[int, str] = {}  # why frames could not be read
+        self._start = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(4, os.cpu_count() or 1)
+        )
+
+    def fill(self, start: int):
+        """Move the window to `start` and queue the frames missing in it."""
+        with self._lock:
+            self._start = start
+            missing = []
+            for i in range(start, min(start + self.capacity, len(self.paths))):
+                slot = self._slots[i % self.capacity]
+                if (slot is None or slot[0] != i) and i not in self._queued:
+                    self._queued.add(i)
+                    missing.append(i)
+        for i in missing:
+            self._executor.submit(self._decode, i)
+
+    def _decode(self, i: int):
+        with self._lock:
+            skip = i < self._start
+        frame = error = None
+        if not skip:
+            try:
+                frame = self._read(self.paths[i])
+            except Exception as e:
+                error = f"Reading {self.paths[i]} failed: {e}"
+        with self._lock:
+            self._queued.discard(i)
+            slot = self._slots[i % self.capacity]
+            # A frame finished after the window moved past it may still be
+            # newer than the one shown; failed frames are kept as None
+            if not skip and (slot is None or slot[0] < i):
+                self._slots[i % self.capacity] = (i, frame)
+                if error is not None:
+                    self._errors[i] = error
+
+    def latest(
+        self, first: int, last: int
+    ) -> Optional[Tuple[int, Optional[CineFrame]]]:
+        """
+        The decoded frame with the highest index in first..last; its
+        CineFrame is None if it could not be read.
+        """
+        with self._lock:
+            for i in range(last, first - 1, -1):
+                slot = self._slots[i % self.capacity]
+                if slot is not None and slot[0] == i:
+                    return slot
+        return None
+
+    def pop_error(self, i: int) -> Optional[str]:
+        """Why frame i could not be read, None if it was."""
+        with self._lock:
+            return self._errors.pop(i, None)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CinePlayer(QObject):
+    """
+    Plays a list of frames at a fixed rate from a CineBuffer.
+
+    The position follows the wall clock, so when decoding falls behind,
+    frames are dropped rather than playback slowing down. `frame` is
+    emitted with the index and the CineFrame to show, `failed` for a frame
+    that could not be read and `finished` when the last frame was reached.
+    """
+
+    frame = pyqtSignal(int, object)  # index, CineFrame
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super(CinePlayer, self).__init__(parent)
+        self._buffer: Optional[CineBuffer] = None
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        self._fps = 30.0
+        self.position = 0
+        self.dropped = 0
+
+    def is_playing(self) -> bool:
+        return self._buffer is not None
+
+    def play(
+        self,
+        paths: List[str],
+        read: Callable[[str], CineFrame],
+        start: int = 0,
+        fps: float = 30.0,
+    ):
+        self.stop()
+        self._buffer = CineBuffer(paths, read)
+        self._buffer.fill(start)
+        self.position = start - 1
+        self.dropped = 0
+        self.set_fps(fps)
+        self._timer.start()
+
+    def set_fps(self, fps: float):
+        """Change the rate, continuing from the frame shown."""
+        self._fps = max(float(fps), 0.1)
+        self._start_index = self.position + 1
+        self._start_time = time.monotonic()
+        self._timer.setInterval(max(1, int(1000 / self._fps)))
+
+    def stop(self) -> int:
+        """Stop playing. Returns the index of the frame shown last."""
+        self._timer.stop()
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        return self.position
+
+    def _tick(self):
+        buffer = self._buffer
+        elapsed = time.monotonic() - self._start_time
+        target = min(
+            self._start_index + int(elapsed * self._fps), len(buffer.paths) - 1
+        )
+        hit = buffer.latest(self.position + 1, target)
+        if hit is not None:
+            self.dropped += hit[0] - self.position - 1
+            self.position = hit[0]
+            if hit[1] is not None:
+                self.frame.emit(hit[0], hit[1])
+            else:
+                error = buffer.pop_error(hit[0])
+                if error is not None:
+                    self.failed.emit(error)
+        if self.position >= len(buffer.paths) - 1:
+            self.stop()
+            self.finished.emit()
+            return
+        buffer.fill(max(target, self.position + 1))
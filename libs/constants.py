@@ -18,4 +18,7 @@ FORMAT_CREATEML = "CreateML"
 FORMAT_ARPAM = "ARPAM"
 SETTING_DRAW_SQUARE = "draw/square"
 SETTING_LABEL_FILE_FORMAT = "labelFileFormat"
+SETTING_DISPLAY_WINDOW = "display/window"
+SETTING_SPLIT_VIEW = "view/split"
+SETTING_CINE_FPS = "cine/fps"
 DEFAULT_ENCODING = "utf-8"
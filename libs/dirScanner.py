@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+
+from PyQt5.QtGui import QImageReader
+
+from libs.frameStore import PACK_NAME, forget_store, packed_images
+from libs.imageLoader import RAW_IMAGE_EXTENSIONS
+from libs.naturalSort import NaturalSortCache, natural_sort_key_ci
+
+# Annotation side directories of a patient folder, they never contain images
+ANNOTATION_DIRS = ("roi", "meta")
+
+
+@lru_cache(maxsize=1)
+def supported_image_extensions() -> Tuple[str, ...]:
+    """Lower-case suffixes of loadable images, computed once per process."""
+    return (
+        tuple(
+            ".%s" % fmt.data().decode("ascii").lower()
+            for fmt in QImageReader.supportedImageFormats()
+        )
+        + RAW_IMAGE_EXTENSIONS
+    )
+
+
+def scan_dir(
+    dir_path: str, extensions=None, errors: Optional[List[str]] = None
+) -> Tuple[List[str], List[str]]:
+    """
+    List one directory level with os.scandir.
+    Returns (image paths, sub-directory paths), both absolute and unsorted.
+    Images in the directory's pack are listed as if they were files. The
+    directory or pack that cannot be read is added to `errors` if given.
+    """
+    extensions = extensions or supported_image_extensions()
+    images, subdirs = [], []
+    has_pack = False
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in ANNOTATION_DIRS:
+                        subdirs.append(os.path.abspath(entry.path))
+                elif entry.name.lower().endswith(extensions):
+                    images.append(os.path.abspath(entry.path))
+                elif entry.name == PACK_NAME:
+                    has_pack = True
+    except OSError as e:
+        if errors is not None:
+            errors.append(str(e))
+    dir_path = os.path.abspath(dir_path)
+    if has_pack:
+        loose = set(images)
+        try:
+            packed = packed_images(dir_path, extensions)
+        except (OSError, ValueError) as e:
+            if errors is not None:
+                errors.append(str(e))
+            packed = []
+        images.extend(p for p in packed if p not in loose)
+    else:
+        forget_store(dir_path)
+    return images, subdirs
+
+
+def scan_images(
+    roots: Iterable[str],
+    recursive: bool = False,
+    max_workers: Optional[int] = None,
+    sort_cache: Optional[NaturalSortCache] = None,
+    errors: Optional[List[str]] = None,
+) -> "OrderedDict[str, List[str]]":
+    """
+    Find all images under `roots`, grouped by the directory that holds them.
+
+    With `recursive`, every directory below the roots is listed by a pool
+    of workers, one directory per task. Groups and the images within each
+    group are returned in natural order. Directories that cannot be read
+    are added to `errors` if given.
+    """
+    extensions = supported_image_extensions()
+    roots = [os.path.abspath(r) for r in roots]
+    groups: Dict[str, List[str]] = {}
+
+    if not recursive:
+        for root in roots:
+            groups[root] = scan_dir(root, extensions, errors)[0]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = {pool.submit(scan_dir, r, extensions, errors): r for r in roots}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dir_path = pending.pop(future)
+                    images, subdirs = future.result()
+                    if images:
+                        groups[dir_path] = images
+                    for d in subdirs:
+                        pending[pool.submit(scan_dir, d, extensions, errors)] = d
+
+    result = OrderedDict()
+    for dir_path in sorted(groups, key=natural_sort_key_ci):
+        images = groups[dir_path]
+        if sort_cache is not None:
+            images = sort_cache.sorted(dir_path, images, ignore_case=True)
+        else:
+            images.sort(key=natural_sort_key_ci)
+        result[dir_path] = images
+    return result
@@ -0,0 +1,170 @@
+from typing import Dict, Iterable, List, Set
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from libs.dirScanner import ANNOTATION_DIRS, scan_dir
+
+
+def _listing_mtimes(dir_path: str) -> Dict[str, int]:
+    """path -> mtime_ns of the regular files in `dir_path`."""
+    mtimes = {}
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.is_file():
+                    mtimes[os.path.abspath(entry.path)] = entry.stat().st_mtime_ns
+    except OSError:
+        pass
+    return mtimes
+
+
+class DirWatcher(QObject):
+    """
+    Watch image directories and their `roi`/`meta` directories.
+
+    File system notifications are debounced: every burst of changes
+    results in one rescan of only the directories that changed, which is
+    diffed against the last known listing. Listeners receive the
+    difference instead of a full listing.
+
+    Directory notifications do not cover in-place rewrites of existing
+    files, so the files of the current frame are watched individually.
+    `roi`/`meta` directories created later are picked up when their parent
+    changes, and with `recursive`, so are new sub-directories, e.g. a
+    patient added to the study.
+    """
+
+    imagesAdded = pyqtSignal(list)
+    imagesRemoved = pyqtSignal(list)
+    annotationsChanged = pyqtSignal(list)  # added/modified/removed roi & meta files
+
+    def __init__(self, parent=None, debounce_ms: int = 300):
+        super(DirWatcher, self).__init__(parent)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._flush)
+
+        self._images: Dict[str, Set[str]] = {}  # image dir -> known images
+        self._annotations: Dict[str, Dict[str, int]] = {}  # dir -> {path: mtime}
+        self._pending: Set[str] = set()
+        self._pending_files: Set[str] = set()
+        self._recursive = False
+
+    def watch(
+        self,
+        image_dirs: Dict[str, Iterable[str]],
+        annotation_dirs=(),
+        recursive: bool = False,
+    ):
+        """
+        Start watching. `image_dirs` maps each image directory to the images
+        already known in it, so only later changes are reported. With
+        `recursive`, directories created below them are watched too.
+        """
+        self.clear()
+        self._recursive = recursive
+        for d, images in image_dirs.items():
+            self._images[d] = set(images)
+        for d in annotation_dirs:
+            if os.path.isdir(d):
+                self._annotations[d] = _listing_mtimes(d)
+        dirs = list(self._images) + list(self._annotations)
+        if dirs:
+            self._watcher.addPaths(dirs)
+
+    def set_current_files(self, paths: Iterable[str]):
+        """Watch only `paths` for in-place modification."""
+        files = self._watcher.files()
+        if files:
+            self._watcher.removePaths(files)
+        paths = [p for p in map(str, paths) if os.path.isfile(p)]
+        if paths:
+            self._watcher.addPaths(paths)
+
+    def clear(self):
+        self._timer.stop()
+        self._pending.clear()
+        self._pending_files.clear()
+        paths = self._watcher.directories() + self._watcher.files()
+        if paths:
+            self._watcher.removePaths(paths)
+        self._images.clear()
+        self._annotations.clear()
+
+    def _on_directory_changed(self, dir_path: str):
+        self._pending.add(dir_path)
+        self._timer.start()
+
+    def _on_file_changed(self, path: str):
+        self._pending_files.add(path)
+        self._timer.start()
+
+    def _add_annotation_dirs(self, dir_path: str, changed: List[str]):
+        """Watch the annotation directories created in `dir_path`."""
+        for name in ANNOTATION_DIRS:
+            d = os.path.join(dir_path, name)
+            if d not in self._annotations and os.path.isdir(d):
+                self._annotations[d] = _listing_mtimes(d)
+                changed.extend(self._annotations[d])
+                self._watcher.addPath(d)
+
+    def _add_image_dir(self, dir_path: str, added: List[str], changed: List[str]):
+        """Watch a new directory and the ones below it, reporting their files."""
+        images, subdirs = scan_dir(dir_path)
+        self._images[dir_path] = set(images)
+        added.extend(images)
+        self._watcher.addPath(dir_path)
+        self._add_annotation_dirs(dir_path, changed)
+        for d in subdirs:
+            if d not in self._images:
+                self._add_image_dir(d, added, changed)
+
+    def _flush(self):
+        pending, self._pending = self._pending, set()
+        pending_files, self._pending_files = self._pending_files, set()
+        added, removed, changed = [], [], []
+        for d in pending:
+            if d in self._images:
+                images, subdirs = scan_dir(d)
+                images = set(images)
+                known = self._images[d]
+                added.extend(images - known)
+                removed.extend(known - images)
+                self._images[d] = images
+                if not os.path.isdir(d):
+                    del self._images[d]
+                    continue
+                self._add_annotation_dirs(d, changed)
+                if self._recursive:
+                    for sub in subdirs:
+                        if sub not in self._images:
+                            self._add_image_dir(sub, added, changed)
+            if d in self._annotations:
+                mtimes = _listing_mtimes(d)
+                known = self._annotations[d]
+                changed.extend(p for p, t in mtimes.items() if known.get(p) != t)
+                changed.extend(p for p in known if p not in mtimes)
+                self._annotations[d] = mtimes
+        for path in pending_files - set(changed):
+            known = self._annotations.get(os.path.dirname(path))
+            if known is not None and path in known:
+                try:
+                    known[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass
+            changed.append(path)
+            if os.path.isfile(path) and path not in self._watcher.files():
+                # Replaced by rename, which drops the watch
+                self._watcher.addPath(path)
+
+        if removed:
+            self.imagesRemoved.emit(removed)
+        if added:
+            self.imagesAdded.emit(added)
+        if changed:
+            self.annotationsChanged.emit(changed)
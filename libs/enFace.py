@@ -0,0 +1,178 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional, Tuple
+import hashlib
+import os
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from libs.boxStore import BoxStore
+from libs.frameStore import frame_mtime_ns
+from libs.imageLoader import read_gray_array
+from libs.scanConversion import ScanConverter
+
+# A-lines (rows) of the en face map; frames are resampled to this many
+EN_FACE_ALINES = 360
+
+# Reductions of each A-line over depth
+PROJECTIONS = ("max", "mean")
+
+# (label, first A-line, last A-line) of a box in a frame
+BoxSpan = Tuple[str, float, float]
+
+
+def aline_projection(
+    image: np.ndarray, projection: str = "max", n_alines: int = EN_FACE_ALINES
+) -> np.ndarray:
+    """
+    Projection over depth of each A-line of a Cartesian frame, as a
+    (n_alines,) float32 array. The frame is scan converted to polar
+    coordinates and reduced along the samples in one vectorized step.
+    """
+    converter = ScanConverter.for_cartesian(image.shape[1], image.shape[0], n_alines)
+    polar = converter.cart_to_polar(image)
+    if projection == "max":
+        return polar.max(axis=0)
+    return polar.mean(axis=0, dtype=np.float32)
+
+
+def box_spans(
+    boxes: BoxStore, width: int, height: int, n_alines: int = EN_FACE_ALINES
+) -> List[BoxSpan]:
+    """A-lines covered by boxes in pixels of a `width` x `height` frame."""
+    converter = ScanConverter.for_cartesian(width, height, n_alines)
+    spans = []
+    for b in boxes.boxes:
+        a_min, _, a_max, _ = converter.cart_box_to_polar(
+            float(b["xmin"]), float(b["ymin"]), float(b["xmax"]), float(b["ymax"])
+        )
+        spans.append((boxes.labels[b["label"]], a_min, a_max))
+    return spans
+
+
+def read_box_spans(img_path: str, n_alines: int = EN_FACE_ALINES) -> List[BoxSpan]:
+    """A-lines covered by the boxes of the ROI file of a frame."""
+    # Only the box overlay needs arpamutils
+    from arpamutils.roi import CoImageSet, ROI_File
+
+    try:
+        if not CoImageSet.from_path(img_path).roi.exists():
+            return []
+    except ValueError:
+        return []
+    roi_file = ROI_File.from_img_path(img_path)
+    boxes = BoxStore.from_roi_file(roi_file)
+    return box_spans(boxes, roi_file.size.w, roi_file.size.h, n_alines)
+
+
+class EnFaceMap(object):
+    """
+    En face projection of a pullback: one column per frame and one row
+    per A-line, with the A-line spans of the frames' boxes.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        image: np.ndarray,
+        spans: List[List[BoxSpan]],
+        projection: str,
+    ):
+        self.paths = paths
+        self.image = image  # (n_alines, n_frames) float32
+        self.spans = spans
+        self.projection = projection
+
+    @property
+    def n_alines(self) -> int:
+        return self.image.shape[0]
+
+    def __len__(self):
+        return len(self.paths)
+
+
+class EnFaceBuilder(QObject):
+    """
+    Computes en face maps on a background thread. The frames are
+    projected in parallel by a pool of worker threads, and each frame's
+    projection is cached on disk by path and mtime, so only new or
+    changed frames are decoded again. `built` is emitted with the
+    EnFaceMap, delivered to GUI-thread slots queued.
+    """
+
+    built = pyqtSignal(object)  # EnFaceMap
+    failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        parent=None,
+    ):
+        super(EnFaceBuilder, self).__init__(parent)
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".labelARPAM")
+        self.cache_dir = os.path.join(cache_dir, "enface")
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._workers = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _cache_path(self, path: str, projection: str) -> str:
+        mtime = frame_mtime_ns(path) or 0
+        key = f"{os.path.abspath(path)}:{mtime}:{projection}:{EN_FACE_ALINES}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".npy")
+
+    def _frame(
+        self, projection: str, path: str
+    ) -> Tuple[np.ndarray, List[BoxSpan], List[str]]:
+        """Projection and box spans of a frame, and what went wrong reading them."""
+        errors = []
+        cache_path = self._cache_path(path, projection)
+        try:
+            profile = np.load(cache_path)
+        except (OSError, ValueError):
+            try:
+                profile = aline_projection(read_gray_array(path), projection)
+            except (OSError, ValueError) as e:
+                errors.append(f"Reading {path} failed: {e}")
+                profile = np.zeros(EN_FACE_ALINES, np.float32)
+            else:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    np.save(cache_path, profile)
+                except OSError as e:
+                    errors.append(f"Caching the projection of {path} failed: {e}")
+        try:
+            spans = read_box_spans(path)
+        except Exception as e:
+            # An unreadable ROI file leaves the column without boxes
+            errors.append(f"Reading the ROI file of {path} failed: {e}")
+            spans = []
+        return profile, spans, errors
+
+    def _build(self, paths: List[str], projection: str) -> EnFaceMap:
+        frames = list(self._workers.map(partial(self._frame, projection), paths))
+        image = np.empty((EN_FACE_ALINES, len(paths)), np.float32)
+        for i, (profile, _, _) in enumerate(frames):
+            image[:, i] = profile
+        errors = [e for _, _, frame_errors in frames for e in frame_errors]
+        if errors:
+            self.failed.emit(f"{len(errors)} errors in the en face map: {errors[0]}")
+        return EnFaceMap(paths, image, [spans for _, spans, _ in frames], projection)
+
+    def build(self, paths: List[str], projection: str = "max"):
+        future = self._executor.submit(self._build, list(paths), projection)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failed.emit(f"Computing the en face map failed: {future.exception()}")
+            return
+        self.built.emit(future.result())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._workers.shutdown(wait=False, cancel_futures=True)
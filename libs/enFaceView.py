@@ -0,0 +1,95 @@
+from typing import Optional
+
+import numpy as np
+from PyQt5.QtCore import QRectF, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen, QPixmap
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+from libs.enFace import EnFaceMap
+from libs.imageLoader import ndarray_to_qimage
+from libs.utils import generate_color_by_text
+
+
+class EnFaceView(QWidget):
+    """
+    Shows an EnFaceMap stretched over the widget, frames across and
+    A-lines down, with the boxes of each frame drawn over their A-lines
+    and the current frame marked. Clicking a column emits `frameClicked`
+    with its index.
+    """
+
+    frameClicked = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super(EnFaceView, self).__init__(parent)
+        self.en_face: Optional[EnFaceMap] = None
+        self.current: Optional[int] = None
+        self._pixmap = QPixmap()
+        self.setMouseTracking(True)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def sizeHint(self):
+        return QSize(600, 180)
+
+    def set_map(self, en_face: Optional[EnFaceMap]):
+        self.en_face = en_face
+        self._pixmap = QPixmap()
+        if en_face is not None and len(en_face):
+            # Stretch the 1st..99.5th percentile over the gray levels
+            lo, hi = np.percentile(en_face.image, (1.0, 99.5))
+            scaled = (en_face.image - lo) * (255.0 / max(hi - lo, 1e-6))
+            gray = np.clip(scaled, 0, 255).astype(np.uint8)
+            self._pixmap = QPixmap.fromImage(ndarray_to_qimage(gray))
+        self.update()
+
+    def set_current(self, column: Optional[int]):
+        if column != self.current:
+            self.current = column
+            self.update()
+
+    def column_at(self, x: float) -> Optional[int]:
+        if self.en_face is None or not len(self.en_face) or self.width() <= 0:
+            return None
+        column = int(x * len(self.en_face) / self.width())
+        return min(max(column, 0), len(self.en_face) - 1)
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), Qt.black)
+        if self._pixmap.isNull():
+            p.setPen(Qt.gray)
+            p.drawText(self.rect(), Qt.AlignCenter, "No en face map")
+            return
+
+        w, h = self.width(), self.height()
+        p.drawPixmap(self.rect(), self._pixmap)
+        col_w = w / len(self.en_face)
+        row_h = h / self.en_face.n_alines
+        for column, spans in enumerate(self.en_face.spans):
+            for label, a_min, a_max in spans:
+                color = QColor(generate_color_by_text(label))
+                color.setAlpha(140)
+                p.fillRect(
+                    QRectF(
+                        column * col_w,
+                        a_min * row_h,
+                        max(col_w, 1.0),
+                        max((a_max - a_min) * row_h, 1.0),
+                    ),
+                    color,
+                )
+
+        if self.current is not None:
+            p.setPen(QPen(QColor(255, 255, 0), 1))
+            x = (self.current + 0.5) * col_w
+            p.drawLine(int(x), 0, int(x), h)
+
+    def mousePressEvent(self, ev):
+        column = self.column_at(ev.pos().x())
+        if ev.button() == Qt.LeftButton and column is not None:
+            self.frameClicked.emit(column)
+
+    def mouseMoveEvent(self, ev):
+        column = self.column_at(ev.pos().x())
+        if column is not None:
+            self.setToolTip(f"Frame {column + 1}: {self.en_face.paths[column]}")
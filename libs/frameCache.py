@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+import threading
+import zlib
+
+import numpy as np
+from PyQt5.QtGui import QImage
+
+from libs.frameStore import frame_mtime_ns
+from libs.imageLoader import qimage_to_ndarray
+
+try:
+    import lz4.frame as lz4
+except ImportError:
+    lz4 = None
+
+# Budget of the compressed frames held in memory, in bytes
+FRAME_CACHE_BYTES = 2 << 30
+
+
+def compress(data) -> bytes:
+    """LZ4 if available, else zlib at its fastest level."""
+    if lz4 is not None:
+        return lz4.compress(data)
+    return zlib.compress(data, 1)
+
+
+def decompress(data: bytes) -> bytes:
+    if lz4 is not None:
+        return lz4.decompress(data)
+    return zlib.decompress(data)
+
+
+def _gray_pixels(image: QImage) -> Optional[np.ndarray]:
+    """
+    Pixels of an opaque color image whose channels are all equal, as a
+    contiguous (H, W) array; None for other images. Grayscale frames
+    stored as RGB(A) then take a quarter of the space and of the work to
+    decompress.
+    """
+    if image.depth() != 32:
+        return None
+    pixels = qimage_to_ndarray(image)
+    gray = pixels[..., 0]
+    if (pixels[..., 1] != gray).any() or (pixels[..., 2] != gray).any():
+        return None
+    if image.hasAlphaChannel() and (pixels[..., 3] != 255).any():
+        return None
+    return np.ascontiguousarray(gray)
+
+
+class _Entry(NamedTuple):
+    mtime_ns: Optional[int]
+    width: int
+    height: int
+    bytes_per_line: int
+    format: int
+    data: bytes  # compressed pixels
+
+
+def _decompress_entry(entry: _Entry) -> QImage:
+    pixels = decompress(entry.data)
+    image = QImage(
+        pixels, entry.width, entry.height, entry.bytes_per_line, entry.format
+    )
+    image._pixels = pixels  # the image does not own its buffer
+    return image
+
+
+class CompressedFrameCache(object):
+    """
+    Least recently used cache of decoded frames kept compressed in memory.
+
+    It sits between the image files and the decoded PixmapCache: a frame
+    read once is compressed on a worker thread, and reading it again
+    decompresses its pixel buffer instead of decoding the file, which is
+    several times faster. `prefetch` decompresses the frames likely to be
+    shown next on worker threads, so `get` only has to pick them up.
+    Compression and decompression release the GIL. Entries are validated
+    against the file's mtime and evicted by compressed size.
+    """
+
+    def __init__(self, max_bytes: int = FRAME_CACHE_BYTES, max_workers: int = 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # path -> _Entry
+        # path -> token of the compression in flight, dropped to discard it
+        self._pending: Dict[str, object] = {}
+        self._prefetched: Dict[str, Tuple[_Entry, Future]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._decompressor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _entry(self, path: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+        if entry is None or entry.mtime_ns != frame_mtime_ns(path):
+            return None
+        return entry
+
+    def get(self, path: str) -> Optional[QImage]:
+        """
+        The cached frame of `path`, from `prefetch` if it was asked for,
+        else decompressed on the calling thread.
+        """
+        entry = self._entry(path)
+        if entry is None:
+            return None
+        with self._lock:
+            prefetched = self._prefetched.pop(path, None)
+        if prefetched is not None and prefetched[0] is entry:
+            return prefetched[1].result()
+        return _decompress_entry(entry)
+
+    def prefetch(self, paths: Iterable[str]):
+        """
+        Decompress the cached frames of `paths` in the background, ready
+        for `get`. The frames of the previous call not taken are dropped.
+        """
+        wanted = {}
+        for path in paths:
+            entry = self._entry(path)
+            if entry is not None:
+                wanted[path] = entry
+        with self._lock:
+            old, self._prefetched = self._prefetched, {}
+            for path, entry in wanted.items():
+                kept = old.pop(path, None)
+                if kept is None or kept[0] is not entry:
+                    kept = (entry, self._decompressor.submit(_decompress_entry, entry))
+                self._prefetched[path] = kept
+        for _, future in old.values():
+            future.cancel()
+
+    def put(
+        self, path: str, image: QImage, mtime_ns: Optional[int] = None
+    ) -> Optional[Future]:
+        """
+        Compress `image` in the background, unless it is being already.
+        `mtime_ns` is the file's mtime from before it was read, looked up
+        now if not given.
+        """
+        if mtime_ns is None:
+            mtime_ns = frame_mtime_ns(path)
+        token = object()
+        with self._lock:
+            if path in self._pending:
+                return None
+            self._pending[path] = token
+        return self._executor.submit(self._compress, path, image, mtime_ns, token)
+
+    def _compress(self, path: str, image: QImage, mtime_ns: Optional[int], token):
+        try:
+            pixels = _gray_pixels(image)
+            if pixels is not None:
+                fmt, bytes_per_line = QImage.Format_Grayscale8, image.width()
+            else:
+                fmt, bytes_per_line = image.format(), image.bytesPerLine()
+                ptr = image.constBits()
+                ptr.setsize(image.height() * bytes_per_line)
+                pixels = np.frombuffer(ptr, np.uint8)
+            entry = _Entry(
+                mtime_ns,
+                image.width(),
+                image.height(),
+                bytes_per_line,
+                fmt,
+                compress(pixels),
+            )
+        except BaseException:
+            with self._lock:
+                if self._pending.get(path) is token:
+                    del self._pending[path]
+            raise
+        with self._lock:
+            if self._pending.get(path) is not token:
+                return  # invalidated while it was compressed
+            del self._pending[path]
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.nbytes -= len(old.data)
+            self._entries[path] = entry
+            self.nbytes += len(entry.data)
+            while self.nbytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted.data)
+
+    def read(
+        self, path: str, read: Callable[[str], Optional[QImage]]
+    ) -> Optional[QImage]:
+        """The cached frame of `path`, else `read(path)`, which is cached."""
+        image = self.get(path)
+        if image is None:
+            mtime_ns = frame_mtime_ns(path)
+            image = read(path)
+            if image is not None and not image.isNull():
+                self.put(path, image, mtime_ns)
+        return image
+
+    def invalidate(self, path: Optional[str] = None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._pending.clear()
+                prefetched, self._prefetched = self._prefetched, {}
+                self.nbytes = 0
+            else:
+                entry = self._entries.pop(path, None)
+                if entry is not None:
+                    self.nbytes -= len(entry.data)
+                self._pending.pop(path, None)
+                prefetched = {}
+                if path in self._prefetched:
+                    prefetched[path] = self._prefetched.pop(path)
+        for _, future in prefetched.values():
+            future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._decompressor.shutdown(wait=False, cancel_futures=True)
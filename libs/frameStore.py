@@ -0,0 +1,246 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import mmap
+import os
+import struct
+import threading
+
+# Pack of the frames and meta files of a patient directory, inside it
+PACK_NAME = "frames.pack"
+PACK_VERSION = 1
+
+# Sub-directories of a patient directory whose files can be packed too
+PACKED_DIRS = ("meta",)
+
+_MAGIC = b"ARPAMPK1"
+# Offset and length of the JSON index, then the magic again
+_TRAILER = struct.Struct("<QQ8s")
+# Members start on page boundaries, so reading one touches no other member
+_ALIGN = 4096
+
+
+class FrameStore(object):
+    """
+    Read-only view of a pack file.
+
+    A pack holds the files of a patient directory back to back, stored as
+    they are, followed by a JSON index of member name -> (offset, length,
+    mtime_ns) and a fixed-size trailer pointing to the index. The file is
+    memory-mapped, so a member is read without an open() or stat() of its
+    own and only its pages are fetched. Members of `PACKED_DIRS` are named
+    "<dir>/<file name>".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.stamp = (st.st_mtime_ns, st.st_size)
+            if st.st_size < len(_MAGIC) + _TRAILER.size:
+                raise ValueError(f"{path}: not a frame pack")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._members = self._read_index()
+        except (ValueError, KeyError, TypeError):
+            self._map.close()
+            raise ValueError(f"{path}: not a frame pack")
+
+    def _read_index(self) -> Dict[str, Tuple[int, int, int]]:
+        m = self._map
+        end = len(m) - _TRAILER.size
+        offset, length, magic = _TRAILER.unpack_from(m, end)
+        if m[: len(_MAGIC)] != _MAGIC or magic != _MAGIC or offset + length > end:
+            raise ValueError
+        index = json.loads(m[offset : offset + length].decode("utf-8"))
+        if index["version"] != PACK_VERSION:
+            raise ValueError
+        return {name: tuple(entry) for name, entry in index["members"].items()}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def names(self) -> List[str]:
+        return list(self._members)
+
+    def mtime_ns(self, name: str) -> int:
+        """Modification time of the file when it was packed."""
+        return self._members[name][2]
+
+    def read(self, name: str, length: Optional[int] = None) -> bytes:
+        """Contents of a member, or only its first `length` bytes."""
+        offset, size, _ = self._members[name]
+        if length is not None:
+            size = min(size, length)
+        return self._map[offset : offset + size]
+
+    def close(self):
+        self._map.close()
+
+
+def write_pack(
+    patient_dir: str, files: Iterable[str], base: Optional[FrameStore] = None
+) -> str:
+    """
+    Write the pack of a patient directory from `files`, absolute paths of
+    files in it or in its `PACKED_DIRS`. Members of `base` that are not
+    among the files are copied over. The pack is replaced atomically;
+    `base` and the cached pack of the directory are closed first, since a
+    mapped file cannot be replaced on Windows. Returns its path.
+    """
+    patient_dir = os.path.abspath(patient_dir)
+    pack_path = os.path.join(patient_dir, PACK_NAME)
+    sources = {}
+    if base is not None:
+        sources.update((name, None) for name in base.names())
+    for path in files:
+        dir_path, name = member_of(path)
+        if dir_path != patient_dir:
+            raise ValueError(f"{path} is not in {patient_dir}")
+        sources[name] = path
+
+    members = {}
+    tmp_path = pack_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        for name, path in sources.items():
+            if path is None:
+                data, mtime = base.read(name), base.mtime_ns(name)
+            else:
+                with open(path, "rb") as src:
+                    data = src.read()
+                    mtime = os.fstat(src.fileno()).st_mtime_ns
+            f.seek(-f.tell() % _ALIGN, os.SEEK_CUR)
+            members[name] = (f.tell(), len(data), mtime)
+            f.write(data)
+        index = json.dumps({"version": PACK_VERSION, "members": members}).encode()
+        offset = f.tell()
+        f.write(index)
+        f.write(_TRAILER.pack(offset, len(index), _MAGIC))
+    with _lock:
+        cached = _stores.pop(patient_dir, None)
+    for store in (base, cached):
+        if store is not None:
+            store.close()
+    os.replace(tmp_path, pack_path)
+    return pack_path
+
+
+# Open packs by patient directory, None for directories without one
+_stores: Dict[str, Optional[FrameStore]] = {}
+_lock = threading.Lock()
+
+
+def member_of(path: str) -> Tuple[str, str]:
+    """(patient directory, member name) of a file of a patient directory."""
+    dir_path, name = os.path.split(os.path.abspath(path))
+    parent, sub_dir = os.path.split(dir_path)
+    if sub_dir in PACKED_DIRS:
+        return parent, f"{sub_dir}/{name}"
+    return dir_path, name
+
+
+def store_for(dir_path: str, refresh: bool = False) -> Optional[FrameStore]:
+    """
+    The pack of a patient directory, None if it has none or it cannot be
+    read. Lookups are cached; with `refresh`, the pack is opened again if
+    it changed, and an OSError or ValueError is raised if it cannot be.
+    """
+    with _lock:
+        store = _stores.get(dir_path)
+        if dir_path in _stores and not refresh:
+            return store
+        pack_path = os.path.join(dir_path, PACK_NAME)
+        try:
+            st = os.stat(pack_path)
+        except OSError:
+            st = None
+        if store is not None and st is not None:
+            if store.stamp == (st.st_mtime_ns, st.st_size):
+                return store
+        # A replaced store may still be in use by another thread; its map
+        # is released when it is garbage collected
+        _stores[dir_path] = None
+        if st is not None:
+            try:
+                _stores[dir_path] = FrameStore(pack_path)
+            except (OSError, ValueError):
+                if refresh:
+                    raise
+        return _stores[dir_path]
+
+
+def forget_store(dir_path: str):
+    """Drop the cached lookup of a directory, e.g. after its pack was removed."""
+    with _lock:
+        _stores.pop(dir_path, None)
+
+
+def packed_images(dir_path: str, extensions: Tuple[str, ...]) -> List[str]:
+    """
+    Absolute paths of the images in the pack of a directory. Raises an
+    OSError or ValueError if the pack cannot be read.
+    """
+    store = store_for(dir_path, refresh=True)
+    if store is None:
+        return []
+    return [
+        os.path.join(dir_path, name)
+        for name in store.names()
+        if "/" not in name and name.lower().endswith(extensions)
+    ]
+
+
+def _packed_member(path: str) -> Optional[Tuple[FrameStore, str]]:
+    """
+    (pack, member name) of a file, None if it is not packed or the file
+    on disk is newer than its packed copy, e.g. after it was edited.
+    """
+    dir_path, name = member_of(path)
+    store = store_for(dir_path)
+    if store is None or name not in store:
+        return None
+    try:
+        if os.stat(path).st_mtime_ns > store.mtime_ns(name):
+            return None
+    except OSError:
+        pass
+    return store, name
+
+
+def read_packed(path: str, length: Optional[int] = None) -> Optional[bytes]:
+    """
+    Contents of a file from its patient's pack, or its first `length`
+    bytes. None if it is not packed or the file on disk is newer.
+    """
+    member = _packed_member(path)
+    if member is None:
+        return None
+    store, name = member
+    return store.read(name, length)
+
+
+def is_packed(path: str) -> bool:
+    return _packed_member(path) is not None
+
+
+def frame_exists(path: str) -> bool:
+    """True if the file exists on disk or in its patient's pack."""
+    return is_packed(path) or os.path.exists(path)
+
+
+def frame_mtime_ns(path: str) -> Optional[int]:
+    """
+    Modification time of a file or of its packed copy, whichever is read,
+    None if missing.
+    """
+    member = _packed_member(path)
+    if member is not None:
+        store, name = member
+        return store.mtime_ns(name)
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
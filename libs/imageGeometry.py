@@ -0,0 +1,140 @@
+from typing import Dict, List, Optional, Set, Tuple
+import json
+import os
+import struct
+import threading
+
+from PyQt5.QtGui import QImageIOHandler
+
+from libs.frameStore import frame_mtime_ns, read_packed
+from libs.imageLoader import RAW_IMAGE_EXTENSIONS, image_reader
+
+# Cached sizes of the images of a directory, inside it
+GEOMETRY_INDEX_NAME = ".image_geometry.json"
+GEOMETRY_INDEX_VERSION = 1
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_size(header: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the IHDR chunk, which a PNG file starts with."""
+    if len(header) < 24 or header[:8] != _PNG_SIGNATURE or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+def probe_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) of an image read from its header, without decoding
+    the pixels. None if it cannot be read.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in RAW_IMAGE_EXTENSIONS:
+        from libs.rawFrame import RawFrame
+
+        try:
+            height, width = RawFrame.from_path(path).shape[:2]
+        except (OSError, ValueError, KeyError):
+            return None
+        return width, height
+
+    header = read_packed(path, 24)
+    if header is None:
+        try:
+            with open(path, "rb") as f:
+                header = f.read(24)
+        except OSError:
+            return None
+    size = _png_size(header)
+    if size is not None:
+        return size
+
+    reader = image_reader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if not size.isValid():
+        return None
+    if reader.transformation() & QImageIOHandler.TransformationRotate90:
+        return size.height(), size.width()
+    return size.width(), size.height()
+
+
+class ImageGeometry(object):
+    """
+    Image sizes read from file headers, cached by path and mtime.
+
+    The sizes of a directory are kept in a `GEOMETRY_INDEX_NAME` file in
+    it, loaded on first use, so saving ROI files or validating a study
+    does not decode or even open the images again. `save` writes the
+    indexes that gained entries.
+    """
+
+    def __init__(self):
+        self._dirs: Dict[str, Dict[str, list]] = {}  # dir -> {name: [w, h, mtime]}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _entries(self, dir_path: str) -> Dict[str, list]:
+        entries = self._dirs.get(dir_path)
+        if entries is None:
+            entries = {}
+            try:
+                with open(os.path.join(dir_path, GEOMETRY_INDEX_NAME)) as f:
+                    data = json.load(f)
+                if data.get("version") == GEOMETRY_INDEX_VERSION:
+                    entries = data["sizes"]
+            except (OSError, ValueError, KeyError):
+                pass
+            self._dirs[dir_path] = entries
+        return entries
+
+    def size(self, path: str) -> Optional[Tuple[int, int]]:
+        """(width, height) of an image, None if it cannot be read."""
+        dir_path, name = os.path.split(os.path.abspath(path))
+        mtime_ns = frame_mtime_ns(path)
+        if mtime_ns is None:
+            return None
+        with self._lock:
+            entry = self._entries(dir_path).get(name)
+        if entry is not None and entry[2] == mtime_ns:
+            return entry[0], entry[1]
+
+        size = probe_size(path)
+        if size is not None:
+            with self._lock:
+                self._entries(dir_path)[name] = [size[0], size[1], mtime_ns]
+                self._dirty.add(dir_path)
+        return size
+
+    def save(self) -> List[str]:
+        """Write the indexes that gained entries. Returns the errors."""
+        errors = []
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for dir_path in dirty:
+                path = os.path.join(dir_path, GEOMETRY_INDEX_NAME)
+                data = {
+                    "version": GEOMETRY_INDEX_VERSION,
+                    "sizes": self._dirs[dir_path],
+                }
+                try:
+                    with open(path + ".tmp", "w", encoding="utf-8") as f:
+                        json.dump(data, f)
+                    os.replace(path + ".tmp", path)
+                except OSError as e:
+                    errors.append(f"Saving {path} failed: {e}")
+        return errors
+
+
+# Shared by the save path and the tools of this process
+_geometry = ImageGeometry()
+
+
+def image_size(path: str) -> Optional[Tuple[int, int]]:
+    """(width, height) of an image from the shared cache."""
+    return _geometry.size(path)
+
+
+def save_geometry() -> List[str]:
+    """Write the size indexes that gained entries. Returns the errors."""
+    return _geometry.save()
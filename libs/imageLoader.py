@@ -0,0 +1,163 @@
+import mmap
+import os
+
+import numpy as np
+from PyQt5.QtCore import QBuffer, Qt
+from PyQt5.QtGui import QImage, QImageReader
+
+from libs.frameStore import read_packed
+
+# Frames stored as NumPy arrays or raw binary with a JSON sidecar header
+RAW_IMAGE_EXTENSIONS = (".npy", ".raw")
+
+# Longer side of the downsampled frames shown while scrubbing, in pixels
+PREVIEW_SIDE = 512
+
+# Formats that may carry an EXIF orientation, which only QImageReader applies
+_AUTO_TRANSFORM_EXTENSIONS = (".jpg", ".jpeg", ".tif", ".tiff")
+
+_QIMAGE_FORMATS = {
+    # (dtype, channels) -> QImage format
+    (np.dtype(np.uint8), 1): QImage.Format_Grayscale8,
+    (np.dtype(np.uint8), 3): QImage.Format_RGB888,
+    (np.dtype(np.uint8), 4): QImage.Format_RGBA8888,
+}
+if hasattr(QImage, "Format_Grayscale16"):  # Qt >= 5.13
+    _QIMAGE_FORMATS[(np.dtype(np.uint16), 1)] = QImage.Format_Grayscale16
+
+
+def ndarray_to_qimage(array: np.ndarray) -> QImage:
+    """
+    Wrap a 2D (H, W) or 3D (H, W, C) array as a QImage without copying.
+
+    The row stride is passed to Qt, so no padding to 32-bit lines is needed.
+    Non-contiguous or byte-swapped arrays are copied once. The returned
+    image references `array`, which is kept alive on the QImage wrapper.
+    """
+    if array.ndim == 2:
+        channels = 1
+    elif array.ndim == 3:
+        channels = array.shape[2]
+    else:
+        raise ValueError(f"Cannot display an array of shape {array.shape}")
+
+    fmt = _QIMAGE_FORMATS.get((array.dtype.newbyteorder("="), channels))
+    if fmt is None:
+        raise ValueError(f"Unsupported pixel type {array.dtype} x {channels}")
+
+    if not (array.flags.c_contiguous and array.dtype.isnative):
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("="))
+
+    h, w = array.shape[:2]
+    image = QImage(array.data, w, h, array.strides[0], fmt)
+    image._ndarray = array
+    return image
+
+
+def qimage_to_ndarray(image: QImage) -> np.ndarray:
+    """
+    Pixels of `image` as an (H, W) uint8 array for grayscale images or an
+    (H, W, 4) RGBA array otherwise. Grayscale8 and RGBA8888 images are
+    viewed without a copy, valid only while the image is alive; other
+    formats are converted into a new array.
+    """
+    channels = 1 if image.format() == QImage.Format_Grayscale8 else 4
+    converted = channels == 4 and image.format() != QImage.Format_RGBA8888
+    if converted:
+        image = image.convertToFormat(QImage.Format_RGBA8888)
+    h, w, bpl = image.height(), image.width(), image.bytesPerLine()
+    ptr = image.constBits()
+    ptr.setsize(h * bpl)
+    array = np.frombuffer(ptr, dtype=np.uint8).reshape(h, bpl)[:, : w * channels]
+    array = array.reshape(h, w) if channels == 1 else array.reshape(h, w, 4)
+    return array.copy() if converted else array
+
+
+def image_reader(filename: str) -> QImageReader:
+    """Reader of an image file, or of its copy in its patient's pack."""
+    data = read_packed(filename)
+    if data is None:
+        return QImageReader(filename)
+    buffer = QBuffer()
+    buffer.setData(data)
+    fmt = os.path.splitext(filename)[1][1:].lower().encode("ascii")
+    reader = QImageReader(buffer, fmt)
+    reader._buffer = buffer  # the reader does not own its device
+    return reader
+
+
+def read_raw_image(filename: str) -> QImage:
+    """
+    8-bit frames are wrapped as they are; float/uint16 beamformed frames
+    are rendered with the default display window.
+    """
+    from libs.rawFrame import RawFrame
+
+    frame = RawFrame.from_path(filename)
+    if frame.data.dtype == np.uint8:
+        return ndarray_to_qimage(frame.data)
+    return frame.render()
+
+
+def read_image(filename: str) -> QImage:
+    """
+    Decode an image file.
+
+    Encoded images are memory-mapped and decoded by Qt straight from the
+    page cache, with no intermediate Python `bytes` copy. Raw NumPy frames
+    are mapped and wrapped as a QImage view. Frames of a packed patient
+    directory are read from its pack.
+    """
+    suffix = os.path.splitext(filename)[1].lower()
+    if suffix in RAW_IMAGE_EXTENSIONS:
+        return read_raw_image(filename)
+    if suffix in _AUTO_TRANSFORM_EXTENSIONS:
+        reader = image_reader(filename)
+        reader.setAutoTransform(True)
+        return reader.read()
+    data = read_packed(filename)
+    if data is not None:
+        return QImage.fromData(data, suffix[1:].upper() or None)
+
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return QImage()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            fmt = suffix[1:].upper() or None
+            return QImage.fromData(buf, fmt)
+
+
+def read_preview(filename: str, max_side: int = PREVIEW_SIDE) -> QImage:
+    """
+    Decode a frame downsampled so its longer side is at most `max_side`.
+
+    Encoded images are scaled by the decoder, which for JPEG skips most of
+    the work. Raw frames are subsampled through their memory map before
+    rendering, so only the sampled rows are read.
+    """
+    suffix = os.path.splitext(filename)[1].lower()
+    if suffix in RAW_IMAGE_EXTENSIONS:
+        from libs.rawFrame import RawFrame
+
+        frame = RawFrame.from_path(filename)
+        step = max(1, -(-max(frame.shape) // max_side))
+        data = np.ascontiguousarray(frame.data[::step, ::step])
+        if data.dtype == np.uint8:
+            return ndarray_to_qimage(data)
+        return RawFrame(data, filename).render()
+
+    reader = image_reader(filename)
+    reader.setAutoTransform(suffix in _AUTO_TRANSFORM_EXTENSIONS)
+    size = reader.size()
+    if size.isValid() and max(size.width(), size.height()) > max_side:
+        reader.setScaledSize(size.scaled(max_side, max_side, Qt.KeepAspectRatio))
+    return reader.read()
+
+
+def read_gray_array(filename: str) -> np.ndarray:
+    """Frame as an (H, W) float32 array with values in 0..1."""
+    image = read_image(filename)  # must outlive the pixel view
+    pixels = qimage_to_ndarray(image)
+    if pixels.ndim == 3:
+        pixels = pixels[..., :3].mean(axis=2)
+    return pixels.astype(np.float32) / 255.0
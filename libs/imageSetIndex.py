@@ -0,0 +1,105 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from arpamutils.roi import CoImageSet, CoImageType
+
+# Modality that stands for an image set in the file list, in order of preference
+DISPLAY_ORDER = (
+    CoImageType.PA,
+    CoImageType.US,
+    CoImageType.SUM,
+    CoImageType.DEBUG,
+    CoImageType.SUM_POLAR,
+    CoImageType.UNKNOWN,
+)
+
+
+class ImageSet(object):
+    """Files of one co-registered image set by modality, with its ROI and meta."""
+
+    __slots__ = ("key", "paths", "roi", "meta")
+
+    def __init__(
+        self, key: str, roi: Optional[Path] = None, meta: Optional[Path] = None
+    ):
+        self.key = key
+        self.paths: Dict[CoImageType, str] = {}
+        self.roi = roi
+        self.meta = meta
+
+    @property
+    def path(self) -> Optional[str]:
+        """The file that represents the set in the file list."""
+        for coreg_type in DISPLAY_ORDER:
+            if coreg_type in self.paths:
+                return self.paths[coreg_type]
+        return None
+
+    def get(self, coreg_type: CoImageType) -> Optional[str]:
+        return self.paths.get(coreg_type)
+
+
+class ImageSetIndex(object):
+    """
+    Image files grouped into image sets, with each file name parsed once.
+
+    Files that are not part of an image set form a set of their own. Sets
+    are kept in the order their first file was added.
+    """
+
+    def __init__(self):
+        self._sets: Dict[str, ImageSet] = {}
+        self._by_path: Dict[str, ImageSet] = {}
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[str]) -> "ImageSetIndex":
+        index = cls()
+        for path in paths:
+            index.add(path)
+        return index
+
+    def __len__(self):
+        return len(self._sets)
+
+    def __iter__(self) -> Iterator[ImageSet]:
+        return iter(self._sets.values())
+
+    def set_of(self, path: str) -> Optional[ImageSet]:
+        return self._by_path.get(path)
+
+    def add(self, path: str) -> Tuple[ImageSet, Optional[str]]:
+        """
+        Add a file. Returns its set and the path that represented the set
+        before, None if the set is new.
+        """
+        try:
+            img_set = CoImageSet.from_path(path)
+            key, roi, meta = str(img_set.roi), img_set.roi, img_set.meta
+            coreg_type = img_set.init_type
+        except ValueError:
+            key, roi, meta, coreg_type = path, None, None, CoImageType.UNKNOWN
+
+        image_set = self._sets.get(key)
+        old_path = None if image_set is None else image_set.path
+        if image_set is None:
+            image_set = self._sets[key] = ImageSet(key, roi, meta)
+        image_set.paths[coreg_type] = path
+        self._by_path[path] = image_set
+        return image_set, old_path
+
+    def remove(self, path: str) -> Tuple[Optional[ImageSet], Optional[str]]:
+        """
+        Remove a file. Returns its set, None if the file is unknown, and
+        the path that represented the set before. A set without files is
+        dropped and its `path` is None.
+        """
+        image_set = self._by_path.pop(path, None)
+        if image_set is None:
+            return None, None
+        old_path = image_set.path
+        for coreg_type, set_path in list(image_set.paths.items()):
+            if set_path == path:
+                del image_set.paths[coreg_type]
+        if not image_set.paths:
+            del self._sets[image_set.key]
+        return image_set, old_path
@@ -3,13 +3,37 @@
 
 from PyQt5.QtGui import QImage
 
+from pathlib import Path
 from typing import Optional
 from enum import Enum
 import os.path
+import tempfile
 
 from arpamutils.roi import ROI_File, CoImageSet
 from arpamutils.metadata import ImgMeta
 
+from libs.boxStore import BoxStore
+from libs.frameStore import read_packed
+from libs.imageGeometry import image_size
+
+
+def read_img_meta(meta_path: Path) -> Optional[ImgMeta]:
+    """
+    The meta file of an image set, read from its patient's pack if it was
+    packed. None if there is none.
+    """
+    data = read_packed(str(meta_path))
+    if data is None:
+        return ImgMeta.from_path(meta_path) if meta_path.exists() else None
+    # ImgMeta only reads from a path
+    fd, tmp_path = tempfile.mkstemp(suffix=meta_path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return ImgMeta.from_path(Path(tmp_path))
+    finally:
+        os.remove(tmp_path)
+
 
 class LabelFileFormat(Enum):
     ARPAM = 4
@@ -24,7 +48,7 @@ class LabelFile(object):
     suffix = ".json"
 
     def __init__(self, filename=None, arpam=False):
-        self.shapes = []
+        self.boxes = BoxStore()
         self.image_path = None
         self.image_data = None
         self.verified = False
@@ -41,62 +65,37 @@ class LabelFile(object):
 
         ## Load ROI file
         self.arpam_roi_file = ROI_File.from_img_path(self.filename)
-        for bbox in self.arpam_roi_file.bboxes:
-            x_max = round(bbox.xmax * self.arpam_roi_file.size.w)
-            x_min = round(bbox.xmin * self.arpam_roi_file.size.w)
-            y_max = round(bbox.ymax * self.arpam_roi_file.size.h)
-            y_min = round(bbox.ymin * self.arpam_roi_file.size.h)
-
-            points = [
-                (x_min, y_min),
-                (x_max, y_min),
-                (x_max, y_max),
-                (x_min, y_max),
-            ]
-
-            shape = (bbox.name, points, None, None)
-            self.shapes.append(shape)
+        self.boxes = BoxStore.from_roi_file(self.arpam_roi_file)
 
         ## Load meta file
-        meta_path = self.arpam_img_set.meta
         # If meta file not found, silently ignore
-        if meta_path.exists():
-            self.arpam_img_meta = ImgMeta.from_path(self.arpam_roi_file.img_set.meta)
-
-    def save_arpam_format(self, shapes, image_path, image_data, good_PA, good_US):
+        self.arpam_img_meta = read_img_meta(self.arpam_img_set.meta)
+
+    def save_arpam_format(
+        self, shapes, image_path, image_data, good_PA, good_US, extra_boxes=None
+    ):
+        """
+        Write `shapes`, plus the boxes of the `extra_boxes` BoxStore if given,
+        to the ROI file.
+        """
         if isinstance(image_data, QImage):
-            image = image_data
+            w, h = image_data.width(), image_data.height()
         else:
-            image = QImage()
-            image.load(image_path)
-
-        _size = image.size()
-        h, w = _size.height(), _size.width()
-        self.arpam_roi_file.clear_bboxes()
-        for shape in shapes:
-            points = shape["points"]
-            x = [p[0] for p in points]
-            y = [p[1] for p in points]
-            # print(points)
-            # print(
-            # min(x) / w,
-            # max(x) / w,
-            # min(y) / h,
-            # max(y) / h,
-            # )
-            self.arpam_roi_file.add_bbox(
-                label=shape["label"],
-                xmin=min(x) / w,
-                xmax=max(x) / w,
-                ymin=min(y) / h,
-                ymax=max(y) / h,
-            )
+            size = image_size(image_path)
+            if size is None:
+                raise LabelFileError(f"Cannot read the size of {image_path}")
+            w, h = size
+        boxes = BoxStore.from_shapes(shapes)
+        if extra_boxes is not None:
+            boxes.extend(extra_boxes)
+        boxes.write_roi_file(self.arpam_roi_file, w, h)
 
         self.arpam_roi_file.good_PA = good_PA
         self.arpam_roi_file.good_US = good_US
 
         self.arpam_roi_file.save()
-        self._load_arpam_roi_file()
+        # The ROI file now holds exactly these boxes, no need to parse it again
+        self.boxes = boxes
 
     def toggle_verify(self):
         self.verified = not self.verified
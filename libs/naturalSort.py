@@ -0,0 +1,103 @@
+import os
+import re
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+# Compiled once; the capture group keeps the digit runs in the split result
+# at the odd indices.
+_DIGITS_RE = re.compile(r"([0-9]+)")
+
+
+def natural_sort_key(text: str) -> tuple:
+    """
+    Compact tuple key for natural alphanumeric ordering ("f2" < "f11").
+    Strings and ints alternate in the same positions for every key,
+    so keys of different texts always compare cleanly.
+    """
+    parts = _DIGITS_RE.split(text)
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def natural_sort_key_ci(text: str) -> tuple:
+    """Case-insensitive variant of `natural_sort_key`."""
+    return natural_sort_key(text.lower())
+
+
+def natural_sort(
+    list: List, key: Optional[Callable] = None, ignore_case: bool = False
+) -> None:
+    """
+    Sort the list into natural alphanumeric order (in place).
+    """
+    sort_key = natural_sort_key_ci if ignore_case else natural_sort_key
+    if key is not None:
+        list.sort(key=lambda s: sort_key(key(s)))
+    else:
+        list.sort(key=sort_key)
+
+
+def natural_sorted(items: Iterable[str], ignore_case: bool = False) -> List[str]:
+    """Return a new naturally sorted list."""
+    return sorted(items, key=natural_sort_key_ci if ignore_case else natural_sort_key)
+
+
+def natural_insort(list: List, item, key: Callable) -> int:
+    """
+    Insert `item` into the already sorted `list`, keeping it sorted by `key`.
+    Only O(log n) keys are computed. Returns the insertion index.
+    """
+    item_key = key(item)
+    lo, hi = 0, len(list)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if item_key < key(list[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    list.insert(lo, item)
+    return lo
+
+
+def path_sort_key(path: str) -> tuple:
+    """
+    Key matching the order of a grouped directory scan:
+    by directory first, then by file name, both case-insensitive.
+    """
+    dir_name, base_name = os.path.split(path)
+    return natural_sort_key_ci(dir_name), natural_sort_key_ci(base_name)
+
+
+class NaturalSortCache(object):
+    """
+    Remembers the natural sort order of directory listings.
+
+    The cache is keyed by directory and validated against the exact set of
+    paths in the listing, so re-opening an unchanged directory returns the
+    previous order without sorting again.
+    """
+
+    def __init__(self, max_dirs: int = 64):
+        self.max_dirs = max_dirs
+        self._orders = OrderedDict()  # dir_path -> (listing, sorted paths)
+
+    def sorted(self, dir_path: str, paths: Iterable[str], ignore_case=False):
+        paths = list(paths)
+        listing = (frozenset(paths), ignore_case)
+        hit = self._orders.get(dir_path)
+        if hit is not None and hit[0] == listing:
+            self._orders.move_to_end(dir_path)
+            return list(hit[1])
+
+        ordered = natural_sorted(paths, ignore_case=ignore_case)
+        self._orders[dir_path] = (listing, tuple(ordered))
+        self._orders.move_to_end(dir_path)
+        while len(self._orders) > self.max_dirs:
+            self._orders.popitem(last=False)
+        return ordered
+
+    def invalidate(self, dir_path: Optional[str] = None):
+        if dir_path is None:
+            self._orders.clear()
+        else:
+            self._orders.pop(dir_path, None)
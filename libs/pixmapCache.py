@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from PyQt5.QtGui import QImage, QPixmap
+
+from libs.frameStore import frame_mtime_ns
+
+
+class PixmapCache(object):
+    """
+    Least recently used cache of decoded frames, keyed by path and
+    validated against the file's mtime.
+
+    Missing frames are decoded in parallel on worker threads; only the
+    QImage -> QPixmap conversion runs on the calling (GUI) thread, as
+    QPixmap may not be created elsewhere.
+    """
+
+    def __init__(self, max_items: int = 16):
+        self.max_items = max_items
+        self._pixmaps = OrderedDict()  # path -> (mtime_ns, QPixmap)
+
+    def get(self, path: str) -> Optional[QPixmap]:
+        hit = self._pixmaps.get(path)
+        if hit is None or hit[0] != frame_mtime_ns(path):
+            return None
+        self._pixmaps.move_to_end(path)
+        return hit[1]
+
+    def put(self, path: str, pixmap: QPixmap):
+        self._pixmaps[path] = (frame_mtime_ns(path), pixmap)
+        self._pixmaps.move_to_end(path)
+        while len(self._pixmaps) > self.max_items:
+            self._pixmaps.popitem(last=False)
+
+    def load_many(
+        self, paths: Iterable[str], read: Callable[[str], Optional[QImage]]
+    ) -> Dict[str, QPixmap]:
+        """
+        Pixmaps of `paths`, decoding the ones not cached with `read` in
+        parallel. Paths that cannot be read are left out.
+        """
+        result, missing = {}, []
+        for path in paths:
+            pixmap = self.get(path)
+            if pixmap is not None:
+                result[path] = pixmap
+            else:
+                missing.append(path)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                images = list(pool.map(read, missing))
+            for path, image in zip(missing, images):
+                if image is not None and not image.isNull():
+                    result[path] = QPixmap.fromImage(image)
+                    self.put(path, result[path])
+        return result
+
+    def invalidate(self, path: Optional[str] = None):
+        if path is None:
+            self._pixmaps.clear()
+        else:
+            self._pixmaps.pop(path, None)
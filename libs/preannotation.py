@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from libs.frameStore import frame_mtime_ns
+
+# Supported models. A model takes a float32 batch of shape (N, 1, H, W)
+# with values in 0..1 and returns (N, K, 6) boxes: normalized xmin, ymin,
+# xmax, ymax, score and class index. Python plug-ins define a function
+# `predict(batch)`. Class names are read from `<model>.txt` if present.
+MODEL_EXTENSIONS = (".onnx", ".pt", ".torchscript", ".py")
+
+# Per-process model, loaded once by the pool initializer
+_model: Optional[Callable[[np.ndarray], np.ndarray]] = None
+
+
+def _load_model(path: str) -> Callable[[np.ndarray], np.ndarray]:
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".onnx":
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        return lambda batch: session.run(None, {input_name: batch})[0]
+    if suffix == ".py":
+        spec = importlib.util.spec_from_file_location("preannotation_model", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.predict
+
+    import torch
+
+    module = torch.jit.load(path, map_location="cpu").eval()
+
+    def run(batch):
+        with torch.no_grad():
+            return module(torch.from_numpy(batch)).numpy()
+
+    return run
+
+
+def _init_worker(model_path: str):
+    global _model
+    _model = _load_model(model_path)
+
+
+def _load_frame(path: str) -> np.ndarray:
+    """Frame as a (1, H, W) float32 array in 0..1."""
+    from libs.imageLoader import read_gray_array
+
+    return read_gray_array(path)[None]
+
+
+def _infer(paths: List[str]) -> List[np.ndarray]:
+    """Run the worker's model on frames, batching frames of equal size."""
+    frames = [_load_frame(p) for p in paths]
+    results: List[Optional[np.ndarray]] = [None] * len(frames)
+    by_shape: Dict[tuple, List[int]] = {}
+    for i, frame in enumerate(frames):
+        by_shape.setdefault(frame.shape, []).append(i)
+    for indices in by_shape.values():
+        batch = np.stack([frames[i] for i in indices])
+        output = np.asarray(_model(batch), dtype=np.float32)
+        for i, boxes in zip(indices, output):
+            results[i] = boxes.reshape(-1, 6)
+    return results
+
+
+def model_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(partial(f.read, 1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def model_labels(path: str) -> List[str]:
+    """Class names from `<model>.txt`, one per line, if present."""
+    labels_path = os.path.splitext(path)[0] + ".txt"
+    if not os.path.isfile(labels_path):
+        return []
+    with open(labels_path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class Preannotator(QObject):
+    """
+    Runs a CPU model ahead of the annotator in a process pool.
+
+    Requested frames are sent to the workers in batches; proposals are
+    cached in memory and on disk under the hash of the model, so a frame is
+    never inferred twice by the same model. `proposalsReady` is emitted
+    from a pool thread and delivered to GUI-thread slots queued.
+    """
+
+    proposalsReady = pyqtSignal(str, object)  # frame path, (K, 6) ndarray
+    failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        model_path: str,
+        cache_dir: Optional[str] = None,
+        batch_size: int = 8,
+        max_workers: Optional[int] = None,
+        max_cached: int = 512,
+        parent=None,
+    ):
+        super(Preannotator, self).__init__(parent)
+        self.model_path = os.path.abspath(model_path)
+        self.model_hash = model_hash(self.model_path)
+        self.labels = model_labels(self.model_path)
+        self.batch_size = batch_size
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".labelARPAM")
+        self.cache_dir = os.path.join(cache_dir, "proposals", self.model_hash)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.max_cached = max_cached
+        self._proposals = OrderedDict()  # frame path -> (K, 6) ndarray
+        self._pending = set()
+        self._lock = threading.Lock()
+        max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        # Spawned workers do not inherit the GUI process' Qt state
+        self._executor = ProcessPoolExecutor(
+            max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_path,),
+        )
+
+    def label(self, class_index: int) -> str:
+        if 0 <= class_index < len(self.labels):
+            return self.labels[class_index]
+        return f"class{class_index}"
+
+    def _cache_path(self, path: str) -> str:
+        mtime = frame_mtime_ns(path) or 0
+        key = hashlib.sha1(f"{os.path.abspath(path)}:{mtime}".encode("utf-8"))
+        return os.path.join(self.cache_dir, key.hexdigest() + ".npy")
+
+    def _remember(self, path: str, proposals: np.ndarray):
+        with self._lock:
+            self._proposals[path] = proposals
+            self._proposals.move_to_end(path)
+            while len(self._proposals) > self.max_cached:
+                self._proposals.popitem(last=False)
+
+    def proposals(self, path: str) -> Optional[np.ndarray]:
+        """Cached proposals of a frame, or None if not inferred yet."""
+        with self._lock:
+            proposals = self._proposals.get(path)
+        if proposals is None:
+            try:
+                proposals = np.load(self._cache_path(path))
+            except (OSError, ValueError):
+                return None
+            self._remember(path, proposals)
+        return proposals
+
+    def request(self, paths: Iterable[str]):
+        """Queue inference of the frames that have no proposals yet."""
+        with self._lock:
+            missing = []
+            for path in paths:
+                if path not in self._pending and path not in self._proposals:
+                    missing.append(path)
+        missing = [p for p in missing if not os.path.exists(self._cache_path(p))]
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i : i + self.batch_size]
+            try:
+                future = self._executor.submit(_infer, batch)
+            except BrokenProcessPool as e:
+                self.failed.emit(f"Pre-annotation failed: {e}")
+                return
+            with self._lock:
+                self._pending.update(batch)
+            future.add_done_callback(partial(self._batch_done, batch))
+
+    def _batch_done(self, batch: List[str], future):
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                self._pending.difference_update(batch)
+            if not future.cancelled():
+                self.failed.emit(f"Pre-annotation failed: {future.exception()}")
+            return
+        results = future.result()
+        for path, proposals in zip(batch, results):
+            self._remember(path, proposals)
+            try:
+                np.save(self._cache_path(path), proposals)
+            except OSError as e:
+                print(e)
+        with self._lock:
+            self._pending.difference_update(batch)
+        for path, proposals in zip(batch, results):
+            self.proposalsReady.emit(path, proposals)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,203 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import csv
+import json
+import os
+
+import numpy as np
+
+from libs.boxStore import BoxStore, box_iou
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+PREDICTION_EXTENSIONS = (".csv", ".jsonl", ".parquet")
+
+# Fields of a prediction record. Coordinates are normalized to 0..1 like
+# the boxes of ROI files; relative image paths are relative to the file.
+PREDICTION_FIELDS = ("image", "label", "xmin", "ymin", "xmax", "ymax", "score")
+
+# Predictions file of the boxes tracked into the frames of a patient directory
+TRACKED_PREDICTIONS_NAME = "tracked_predictions.jsonl"
+
+
+def _image_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def append_predictions(path: str, records: Iterable[dict]):
+    """Append prediction records to a JSON Lines predictions file."""
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+class PredictionSet(object):
+    """
+    Predicted boxes of one frame, in pixels, with their scores.
+    Boxes below the score threshold are flagged hidden, not removed.
+    """
+
+    def __init__(self, boxes: BoxStore, scores: np.ndarray):
+        self.boxes = boxes
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @classmethod
+    def from_normalized(cls, labels: Iterable[str], boxes: np.ndarray, size):
+        """Set for (K, 5) normalized xmin, ymin, xmax, ymax, score rows."""
+        w, h = size
+        store = BoxStore.from_boxes(
+            (label, x0 * w, y0 * h, x1 * w, y1 * h)
+            for label, (x0, y0, x1, y1) in zip(labels, boxes[:, :4].tolist())
+        )
+        return cls(store, boxes[:, 4].astype(np.float32))
+
+    def copy(self) -> "PredictionSet":
+        return PredictionSet(self.boxes.copy(), self.scores.copy())
+
+    def extend(self, other: "PredictionSet"):
+        self.boxes.extend(other.boxes)
+        self.scores = np.concatenate([self.scores, other.scores])
+
+    def apply_threshold(self, threshold: float):
+        self.boxes.set_hidden(self.scores < threshold)
+
+    def suppress(self, boxes: BoxStore, min_iou: float = 0.7):
+        """Drop predictions that are already boxes of the frame."""
+        if not len(self) or not len(boxes):
+            return
+        iou = box_iou(self.boxes.boxes, boxes.boxes)
+        self.remove(np.flatnonzero(iou.max(axis=1) >= min_iou))
+
+    def remove(self, indices):
+        self.boxes.remove(indices)
+        self.scores = np.delete(self.scores, indices)
+
+    def take(self, indices) -> List[tuple]:
+        """Remove boxes and return them as `load_labels` shape tuples."""
+        shapes = [self.boxes.shape_tuple(i) for i in indices]
+        self.remove(indices)
+        return shapes
+
+
+class PredictionFile(object):
+    """
+    Index of a study-wide predictions file (CSV, JSON Lines or Parquet).
+
+    CSV and JSON Lines files are streamed once to record the byte offset
+    of every record, grouped by image, so opening a frame only reads that
+    frame's lines. Parquet files need `pyarrow` and are read column-wise.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._base = os.path.dirname(self.path)
+        self._offsets: Dict[str, List[int]] = {}
+        self._rows: Dict[str, np.ndarray] = {}
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._csv_fields: Optional[List[str]] = None
+        self.n_records = 0
+
+        suffix = os.path.splitext(path)[1].lower()
+        if suffix == ".csv":
+            self._index_csv()
+        elif suffix == ".jsonl":
+            self._index_jsonl()
+        elif suffix == ".parquet":
+            self._read_parquet()
+        else:
+            raise ValueError(f"Unsupported predictions file: {path}")
+
+    def _key(self, image: str) -> str:
+        return _image_key(os.path.join(self._base, image))
+
+    def _add_offset(self, image: str, offset: int):
+        self._offsets.setdefault(self._key(image), []).append(offset)
+        self.n_records += 1
+
+    def _index_csv(self):
+        with open(self.path, "rb") as f:
+            self._csv_fields = next(csv.reader([f.readline().decode("utf-8")]))
+            missing = set(PREDICTION_FIELDS) - set(self._csv_fields)
+            if missing:
+                raise ValueError(f"{self.path}: missing columns {sorted(missing)}")
+            image_col = self._csv_fields.index("image")
+            offset = f.tell()
+            for line in iter(f.readline, b""):
+                row = next(csv.reader([line.decode("utf-8")]), None)
+                if row:
+                    self._add_offset(row[image_col], offset)
+                offset = f.tell()
+
+    def _index_jsonl(self):
+        with open(self.path, "rb") as f:
+            offset = f.tell()
+            for line in iter(f.readline, b""):
+                if line.strip():
+                    self._add_offset(json.loads(line)["image"], offset)
+                offset = f.tell()
+
+    def _read_parquet(self):
+        if pq is None:
+            raise ValueError("Reading Parquet predictions requires pyarrow")
+        table = pq.read_table(self.path, columns=list(PREDICTION_FIELDS))
+        columns = {name: table.column(name).to_numpy() for name in PREDICTION_FIELDS}
+        images, inverse = np.unique(columns["image"].astype(str), return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(images) + 1))
+        for i, image in enumerate(images.tolist()):
+            self._rows[self._key(image)] = order[bounds[i] : bounds[i + 1]]
+        self._columns = columns
+        self.n_records = len(inverse)
+
+    def __len__(self):
+        return len(self._offsets) + len(self._rows)
+
+    def _records(self, key: str) -> Iterable[dict]:
+        if key in self._rows:
+            for row in self._rows[key].tolist():
+                yield {name: self._columns[name][row] for name in PREDICTION_FIELDS}
+            return
+        offsets = self._offsets.get(key)
+        if not offsets:
+            return
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                line = f.readline().decode("utf-8")
+                if self._csv_fields is not None:
+                    yield dict(zip(self._csv_fields, next(csv.reader([line]))))
+                else:
+                    yield json.loads(line)
+
+    def frame_predictions(
+        self, image_paths: Iterable[str], size: Tuple[int, int]
+    ) -> Optional[PredictionSet]:
+        """
+        Predictions for the first of `image_paths` found in the file,
+        scaled to pixels of a (w, h) image.
+        """
+        for path in image_paths:
+            records = list(self._records(_image_key(path)))
+            if records:
+                break
+        else:
+            return None
+
+        w, h = size
+        boxes = BoxStore.from_boxes(
+            (
+                str(r["label"]),
+                float(r["xmin"]) * w,
+                float(r["ymin"]) * h,
+                float(r["xmax"]) * w,
+                float(r["ymax"]) * h,
+            )
+            for r in records
+        )
+        scores = np.array([float(r["score"]) for r in records], dtype=np.float32)
+        return PredictionSet(boxes, scores)
@@ -0,0 +1,99 @@
+from typing import NamedTuple, Optional
+import json
+import os
+
+import numpy as np
+from PyQt5.QtGui import QImage
+
+from libs.imageLoader import ndarray_to_qimage
+
+# Raw binary frames need a JSON sidecar with the same stem, e.g.
+# frame_PA.raw + frame_PA.json: {"shape": [h, w], "dtype": "float32"}
+RAW_BINARY_EXTENSION = ".raw"
+SIDECAR_EXTENSION = ".json"
+
+
+class DisplayWindow(NamedTuple):
+    """Display range in dB relative to the frame's peak value."""
+
+    low_db: float = -40.0
+    high_db: float = 0.0
+
+
+class RawFrame(object):
+    """
+    A beamformed float/uint16 frame and its 8-bit display rendering.
+
+    The file is memory-mapped once and converted to dB once; changing the
+    display window only re-runs the vectorized clip-and-scale into a new
+    8-bit buffer, without touching the file again.
+    """
+
+    def __init__(self, data: np.ndarray, path: Optional[str] = None):
+        if data.ndim != 2:
+            raise ValueError(f"{path}: expected a 2D frame, got shape {data.shape}")
+        self.path = path
+        self.data = data
+        self._db: Optional[np.ndarray] = None
+        self._scratch: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_path(cls, path: str) -> "RawFrame":
+        stem, suffix = os.path.splitext(path)
+        if suffix.lower() == RAW_BINARY_EXTENSION:
+            with open(stem + SIDECAR_EXTENSION) as f:
+                header = json.load(f)
+            data = np.memmap(
+                path,
+                dtype=np.dtype(header["dtype"]),
+                mode="r",
+                offset=int(header.get("offset", 0)),
+                shape=tuple(header["shape"]),
+                order=header.get("order", "C"),
+            )
+        else:
+            data = np.load(path, mmap_mode="r", allow_pickle=False)
+        return cls(data, path)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def db(self) -> np.ndarray:
+        """Frame in dB relative to its peak, computed on first use."""
+        if self._db is None:
+            db = np.abs(self.data, dtype=np.float32)
+            peak = float(db.max()) if db.size else 0.0
+            np.maximum(db, np.finfo(np.float32).tiny, out=db)
+            np.log10(db, out=db)
+            db *= 20.0
+            if peak > 0:
+                db -= 20.0 * np.log10(peak)
+            self._db = db
+            self._scratch = np.empty_like(db)
+        return self._db
+
+    def render(self, window: DisplayWindow = DisplayWindow()) -> QImage:
+        """Map `window` onto 0..255 and return it as a grayscale QImage."""
+        db = self.db()
+        span = max(window.high_db - window.low_db, 1e-6)
+        scratch = self._scratch
+        np.subtract(db, window.low_db, out=scratch)
+        scratch *= 255.0 / span
+        np.clip(scratch, 0.0, 255.0, out=scratch)
+        display = np.empty(db.shape, dtype=np.uint8)
+        np.copyto(display, scratch, casting="unsafe")
+        return ndarray_to_qimage(display)
+
+
+def is_raw_frame(path: str) -> bool:
+    """True for frames that need windowing rather than a plain decode."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == RAW_BINARY_EXTENSION:
+        return True
+    if suffix == ".npy":
+        try:
+            return np.load(path, mmap_mode="r").dtype != np.uint8
+        except (OSError, ValueError):
+            return False
+    return False
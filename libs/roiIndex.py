@@ -0,0 +1,303 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import threading
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from libs.boxStore import BoxStore
+from libs.dirScanner import scan_dir, ANNOTATION_DIRS
+
+# Summary of the ROI files of a patient directory, next to its `roi` dir
+ROI_INDEX_NAME = ".roi_index.json"
+ROI_INDEX_VERSION = 1
+
+# Serializes the read-update-write of index files across threads
+_lock = threading.Lock()
+# Loaded indexes by path, with the (mtime_ns, size) of the file read
+_indexes: Dict[str, Tuple[Tuple[int, int], "RoiIndex"]] = {}
+
+
+def index_path(roi_path: str) -> str:
+    """Index file of the patient directory holding `roi_path`."""
+    patient_dir = os.path.dirname(os.path.dirname(os.path.abspath(roi_path)))
+    return os.path.join(patient_dir, ROI_INDEX_NAME)
+
+
+def roi_entry(boxes: BoxStore, good_PA: bool, good_US: bool) -> dict:
+    """Index entry of one ROI file: box count per label and quality flags."""
+    counts = np.bincount(boxes.boxes["label"], minlength=len(boxes.labels))
+    labels = {l: int(n) for l, n in zip(boxes.labels, counts.tolist()) if n}
+    return {"labels": labels, "good_PA": bool(good_PA), "good_US": bool(good_US)}
+
+
+class RoiStats(object):
+    """Counts summed over the entries of one or more indexes."""
+
+    def __init__(self):
+        self.n_frames = 0
+        self.n_labelled = 0
+        self.n_boxes = 0
+        self.n_good_PA = 0
+        self.n_good_US = 0
+        self.n_patients = 0
+        self.n_unindexed = 0
+        self.label_counts: Dict[str, int] = {}
+
+    def add(self, entry: dict):
+        self.n_frames += 1
+        n_boxes = sum(entry["labels"].values())
+        self.n_labelled += n_boxes > 0
+        self.n_boxes += n_boxes
+        self.n_good_PA += entry["good_PA"]
+        self.n_good_US += entry["good_US"]
+        for label, n in entry["labels"].items():
+            self.label_counts[label] = self.label_counts.get(label, 0) + n
+
+    def summary(self) -> str:
+        lines = [
+            f"Patients: {self.n_patients}",
+            f"Frames: {self.n_frames}",
+            f"Labelled frames: {self.n_labelled}",
+            f"Boxes: {self.n_boxes}",
+            f"Good PA: {self.n_good_PA}",
+            f"Good US: {self.n_good_US}",
+        ]
+        if self.n_unindexed:
+            lines.append(f"Patients without an index: {self.n_unindexed}")
+        return "\n".join(lines)
+
+
+class RoiIndex(object):
+    """
+    Index entries of the ROI files of one patient directory, by file name.
+
+    It is built once by reading every ROI file, then kept up to date by
+    `record_rois` whenever ROI files are saved, so statistics never need
+    to open the ROI files again.
+    """
+
+    def __init__(self, path: str, entries: Optional[Dict[str, dict]] = None):
+        self.path = path
+        self.entries: Dict[str, dict] = entries or {}
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RoiIndex"]:
+        """The index at `path`, or None if it is missing or unreadable."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != ROI_INDEX_VERSION:
+            return None
+        return cls(path, data["entries"])
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": ROI_INDEX_VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def build(cls, patient_dir: str) -> "RoiIndex":
+        """Index of a patient directory, reading every ROI file in it."""
+        # Reading the indexes does not need arpamutils, only building them
+        from arpamutils.roi import CoImageSet, ROI_File
+
+        images, _ = scan_dir(patient_dir)
+        entries = {}
+        for img_path in sorted(images):
+            try:
+                roi_path = CoImageSet.from_path(img_path).roi
+            except Exception:
+                continue
+            if roi_path.name in entries:
+                continue
+            if roi_path.exists():
+                roi_file = ROI_File.from_img_path(img_path)
+                entries[roi_path.name] = roi_entry(
+                    BoxStore.from_roi_file(roi_file),
+                    roi_file.good_PA,
+                    roi_file.good_US,
+                )
+            else:
+                entries[roi_path.name] = roi_entry(BoxStore(), False, False)
+        return cls(os.path.join(patient_dir, ROI_INDEX_NAME), entries)
+
+    def stats(self, stats: Optional[RoiStats] = None) -> RoiStats:
+        stats = stats or RoiStats()
+        stats.n_patients += 1
+        for entry in self.entries.values():
+            stats.add(entry)
+        return stats
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_index(path: str) -> Optional[RoiIndex]:
+    """
+    The index at `path`, read again only if the file changed since it was
+    last loaded or saved. Call with `_lock` held.
+    """
+    try:
+        stamp = _stamp(path)
+    except OSError:
+        _indexes.pop(path, None)
+        return None
+    cached = _indexes.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    index = RoiIndex.load(path)
+    if index is None:
+        _indexes.pop(path, None)
+    else:
+        _indexes[path] = (stamp, index)
+    return index
+
+
+def _save_index(index: RoiIndex):
+    """Save an index and keep it loaded. Call with `_lock` held."""
+    _indexes.pop(index.path, None)
+    index.save()
+    _indexes[index.path] = (_stamp(index.path), index)
+
+
+def record_rois(entries: Dict[str, dict]):
+    """
+    Update the indexes holding the given ROI files, by ROI path. Patients
+    without an index are left for `rebuild_indexes` to pick up.
+    """
+    by_index: Dict[str, Dict[str, dict]] = {}
+    for roi_path, entry in entries.items():
+        name = os.path.basename(roi_path)
+        by_index.setdefault(index_path(roi_path), {})[name] = entry
+    with _lock:
+        for path, updates in by_index.items():
+            index = _load_index(path)
+            if index is None:
+                continue
+            index.entries.update(updates)
+            try:
+                _save_index(index)
+            except OSError as e:
+                print(e)
+
+
+def study_stats(patient_dirs: Iterable[str]) -> RoiStats:
+    """Statistics of the patient directories, from their indexes only."""
+    stats = RoiStats()
+    for patient_dir in patient_dirs:
+        with _lock:
+            index = _load_index(os.path.join(patient_dir, ROI_INDEX_NAME))
+            if index is not None:
+                index.stats(stats)
+        if index is None:
+            stats.n_unindexed += 1
+    return stats
+
+
+def rebuild_indexes(
+    patient_dirs: Iterable[str], max_workers: Optional[int] = None
+) -> RoiStats:
+    """Rebuild the indexes of the patient directories in parallel."""
+
+    def rebuild(patient_dir):
+        index = RoiIndex.build(patient_dir)
+        with _lock:
+            _save_index(index)
+        return index
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        indexes = list(pool.map(rebuild, patient_dirs))
+    stats = RoiStats()
+    for index in indexes:
+        index.stats(stats)
+    return stats
+
+
+def find_patient_dirs(root: str) -> List[str]:
+    """Directories below `root` that have a `roi` directory."""
+    patient_dirs = []
+    for dir_path, dir_names, _ in os.walk(root):
+        if "roi" in dir_names:
+            patient_dirs.append(os.path.abspath(dir_path))
+        dir_names[:] = [d for d in dir_names if d not in ANNOTATION_DIRS]
+    return sorted(patient_dirs)
+
+
+class RoiIndexer(QObject):
+    """
+    Keeps the indexes of the open study up to date on one background
+    thread. Saves are recorded, statistics counted and indexes rebuilt in
+    the order they were asked for, so a rebuild never drops a save made
+    while it ran.
+    """
+
+    rebuilt = pyqtSignal(object)  # RoiStats
+    counted = pyqtSignal(object)  # RoiStats
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super(RoiIndexer, self).__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        # Rebuilds and counts, dropped on shutdown unlike the recorded saves
+        self._cancellable = set()
+        self._count_dirs: List[str] = []
+        self._count_future = None
+
+    def record(self, entries: Dict[str, dict]):
+        """`record_rois` in the background."""
+        future = self._executor.submit(record_rois, dict(entries))
+        future.add_done_callback(partial(self._done, None, "Updating the ROI index"))
+
+    def count(self, patient_dirs: List[str]):
+        """
+        Emit `counted` with the statistics of the patients. A request made
+        while another is still queued replaces it.
+        """
+        self._count_dirs = list(patient_dirs)
+        future = self._count_future
+        if future is None or future.running() or future.done():
+            self._count_future = self._submit(
+                self.counted, "Counting the ROI statistics", self._count
+            )
+
+    def _count(self) -> RoiStats:
+        return study_stats(self._count_dirs)
+
+    def rebuild(self, patient_dirs: List[str]):
+        self._submit(
+            self.rebuilt,
+            "Rebuilding the ROI index",
+            rebuild_indexes,
+            list(patient_dirs),
+        )
+
+    def _submit(self, signal, action: str, fn, *args):
+        future = self._executor.submit(fn, *args)
+        self._cancellable.add(future)
+        future.add_done_callback(partial(self._done, signal, action))
+        return future
+
+    def _done(self, signal, action: str, future):
+        self._cancellable.discard(future)
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failed.emit(f"{action} failed: {future.exception()}")
+            return
+        if signal is not None:
+            signal.emit(future.result())
+
+    def shutdown(self):
+        """Finish the recorded saves, drop the queued rebuilds and counts."""
+        for future in list(self._cancellable):
+            future.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,235 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from libs.boxStore import BoxStore
+from libs.dirScanner import scan_dir
+from libs.frameStore import frame_exists
+from libs.imageGeometry import image_size, save_geometry
+from libs.roiIndex import record_rois, roi_entry
+
+REPORT_VERSION = 1
+
+# Issue codes of the report
+OUT_OF_RANGE = "out_of_range"  # box coordinates outside 0..1
+INVERTED = "inverted"  # xmin > xmax or ymin > ymax
+SIZE_MISMATCH = "size_mismatch"  # ROI_File.size differs from the image size
+UNREADABLE_ROI = "unreadable_roi"
+ORPHAN_ROI = "orphan_roi"  # ROI file without an image
+MISSING_META = "missing_meta"  # image set without a meta file
+FIX_FAILED = "fix_failed"  # some ROI files of the patient could not be rewritten
+
+# Issues that --fix repairs; the others need a person to look at them
+FIXABLE = (OUT_OF_RANGE, INVERTED, SIZE_MISMATCH)
+
+
+def box_issues(coords: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Masks of the invalid boxes of an (N, 4) array of normalized xmin,
+    ymin, xmax, ymax, by issue code.
+    """
+    return {
+        OUT_OF_RANGE: ((coords < 0) | (coords > 1)).any(axis=1),
+        INVERTED: (coords[:, 0] > coords[:, 2]) | (coords[:, 1] > coords[:, 3]),
+    }
+
+
+def repair_boxes(coords: np.ndarray) -> np.ndarray:
+    """Boxes with their corners ordered and clipped to 0..1."""
+    lo = np.minimum(coords[:, :2], coords[:, 2:])
+    hi = np.maximum(coords[:, :2], coords[:, 2:])
+    return np.clip(np.hstack([lo, hi]), 0, 1)
+
+
+def _issue(code: str, path, detail: str = "", boxes=None) -> dict:
+    issue = {"code": code, "file": str(path)}
+    if detail:
+        issue["detail"] = detail
+    if boxes is not None:
+        issue["boxes"] = boxes
+    return issue
+
+
+def _write_atomically(patient_dir: str, roi_files: list, replaced: List[str]):
+    """
+    Save ROI files into a staging directory, then move them all over the
+    originals, so no ROI file is ever left half written. The targets are
+    appended to `replaced` as they are moved, so a caller that gets an
+    OSError knows which were rewritten all the same.
+    """
+    from arpamutils.roi import CoImageSet
+
+    staging = tempfile.mkdtemp(prefix=".roi_fix", dir=patient_dir)
+    try:
+        moves = []
+        for img_path, roi_file in roi_files:
+            img_set = roi_file.img_set
+            name = os.path.basename(img_path)
+            roi_file.img_set = CoImageSet.from_path(os.path.join(staging, name))
+            try:
+                roi_file.save()
+                moves.append((str(roi_file.img_set.roi), str(img_set.roi)))
+            finally:
+                roi_file.img_set = img_set
+        missing = [src for src, _ in moves if not os.path.isfile(src)]
+        if missing:
+            raise OSError(f"ROI files were not staged: {missing}")
+        for src, target in moves:
+            os.replace(src, target)
+            replaced.append(target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def validate_patient(patient_dir: str, fix: bool = False) -> dict:
+    """
+    Check the ROI files, images and meta files of a patient directory.
+    With `fix`, the ROI files with fixable issues are rewritten in one
+    batch. Returns the patient's part of the report.
+    """
+    # Only validation needs arpamutils here
+    from arpamutils.roi import ROI_File
+    from libs.imageSetIndex import ImageSetIndex
+
+    images, _ = scan_dir(patient_dir)
+    image_sets = [
+        s for s in ImageSetIndex.from_paths(sorted(images)) if s.roi is not None
+    ]
+    issues = []
+    loaded = []  # (image path, ROI_File)
+    for image_set in image_sets:
+        if not frame_exists(str(image_set.meta)):
+            issues.append(_issue(MISSING_META, image_set.path))
+        if not image_set.roi.exists():
+            continue
+        try:
+            loaded.append((image_set.path, ROI_File.from_img_path(image_set.path)))
+        except Exception as e:
+            issues.append(_issue(UNREADABLE_ROI, image_set.roi, str(e)))
+
+    # Check all boxes of the patient at once
+    counts = np.array([len(r.bboxes) for _, r in loaded], dtype=np.intp)
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    coords = np.array(
+        [(b.xmin, b.ymin, b.xmax, b.ymax) for _, r in loaded for b in r.bboxes],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    owner = np.repeat(np.arange(len(loaded)), counts)
+    to_fix = set()
+    for code, mask in box_issues(coords).items():
+        bad = np.flatnonzero(mask)
+        for i in np.unique(owner[bad]).tolist():
+            boxes = bad[owner[bad] == i] - starts[i]
+            issues.append(_issue(code, loaded[i][1].img_set.roi, boxes=boxes.tolist()))
+            to_fix.add(i)
+
+    sizes = {}
+    for i, (img_path, roi_file) in enumerate(loaded):
+        size = image_size(img_path)
+        if size is not None and (roi_file.size.w, roi_file.size.h) != size:
+            detail = (
+                f"{roi_file.size.w}x{roi_file.size.h} in the ROI file, "
+                f"{size[0]}x{size[1]} image"
+            )
+            issues.append(_issue(SIZE_MISMATCH, roi_file.img_set.roi, detail))
+            sizes[i] = size
+            to_fix.add(i)
+    # The sizes are only cached, not writing them is no issue of the study
+    save_geometry()
+
+    known = {str(s.roi) for s in image_sets}
+    roi_dir = os.path.join(patient_dir, "roi")
+    try:
+        with os.scandir(roi_dir) as it:
+            for entry in it:
+                path = os.path.abspath(entry.path)
+                if entry.is_file() and not entry.name.startswith("."):
+                    if path not in known:
+                        issues.append(_issue(ORPHAN_ROI, path))
+    except FileNotFoundError:
+        pass
+
+    fixed = []
+    if fix and to_fix:
+        repaired = repair_boxes(coords)
+        rewrites = []
+        for i in sorted(to_fix):
+            img_path, roi_file = loaded[i]
+            names = [b.name for b in roi_file.bboxes]
+            roi_file.clear_bboxes()
+            for name, (xmin, ymin, xmax, ymax) in zip(
+                names, repaired[starts[i] : starts[i + 1]].tolist()
+            ):
+                roi_file.add_bbox(
+                    label=name, xmin=xmin, xmax=xmax, ymin=ymin, ymax=ymax
+                )
+            if i in sizes:
+                roi_file.size = type(roi_file.size)(*sizes[i])
+            rewrites.append((img_path, roi_file))
+        try:
+            _write_atomically(patient_dir, rewrites, fixed)
+        except OSError as e:
+            issues.append(_issue(FIX_FAILED, patient_dir, str(e)))
+        by_roi = {str(r.img_set.roi): r for _, r in rewrites}
+        record_rois(
+            {
+                roi_path: roi_entry(
+                    BoxStore.from_roi_file(by_roi[roi_path]),
+                    by_roi[roi_path].good_PA,
+                    by_roi[roi_path].good_US,
+                )
+                for roi_path in fixed
+            }
+        )
+
+    return {
+        "patient": patient_dir,
+        "roi_files": len(loaded),
+        "boxes": len(coords),
+        "issues": issues,
+        "fixed": fixed,
+    }
+
+
+def validate_study(
+    patient_dirs: Iterable[str], fix: bool = False, max_workers: Optional[int] = None
+) -> dict:
+    """
+    Validate the patient directories in a pool of processes. Returns the
+    report: totals, counts by issue code and the patients' issues.
+    """
+    patient_dirs = list(patient_dirs)
+    with ProcessPoolExecutor(max_workers) as pool:
+        patients = list(pool.map(partial(validate_patient, fix=fix), patient_dirs))
+
+    counts: Dict[str, int] = {}
+    for patient in patients:
+        for issue in patient["issues"]:
+            counts[issue["code"]] = counts.get(issue["code"], 0) + 1
+    return {
+        "version": REPORT_VERSION,
+        "patients": len(patients),
+        "roi_files": sum(p["roi_files"] for p in patients),
+        "boxes": sum(p["boxes"] for p in patients),
+        "counts": counts,
+        "fixed": sum(len(p["fixed"]) for p in patients),
+        "results": [p for p in patients if p["issues"]],
+    }
+
+
+def report_summary(report: dict) -> str:
+    lines = [
+        f"Patients: {report['patients']}",
+        f"ROI files: {report['roi_files']}",
+        f"Boxes: {report['boxes']}",
+    ]
+    for code, n in sorted(report["counts"].items()):
+        lines.append(f"{code}: {n}")
+    if report["fixed"]:
+        lines.append(f"Rewritten ROI files: {report['fixed']}")
+    return "\n".join(lines)
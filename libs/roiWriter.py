@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from arpamutils.roi import ROI_File
+
+from libs.boxStore import BoxStore
+from libs.roiIndex import record_rois, roi_entry
+
+# (image path, boxes in pixels) of one ROI file to write
+RoiJob = Tuple[str, BoxStore]
+
+
+def write_rois(
+    jobs: List[RoiJob],
+    size: Tuple[int, int],
+    record: Callable[[Dict[str, dict]], None] = record_rois,
+) -> List[RoiJob]:
+    """
+    Replace the boxes of the ROI files of `jobs` with the given boxes,
+    normalized by the (w, h) frame size, and pass their index entries to
+    `record`. Returns the jobs.
+    """
+    w, h = size
+    entries = {}
+    for img_path, boxes in jobs:
+        roi_file = ROI_File.from_img_path(img_path)
+        boxes.write_roi_file(roi_file, w, h)
+        roi_file.save()
+        entries[str(roi_file.img_set.roi)] = roi_entry(
+            boxes, roi_file.good_PA, roi_file.good_US
+        )
+    record(entries)
+    return jobs
+
+
+class RoiWriter(QObject):
+    """
+    Writes batches of ROI files on one background thread, in the order
+    they were submitted. `written` is emitted with the jobs of each batch,
+    `failed` with the message and the jobs of a batch that could not be
+    written, from the writer thread and delivered to GUI-thread slots
+    queued.
+    """
+
+    written = pyqtSignal(list)  # RoiJob
+    failed = pyqtSignal(str, list)  # message, RoiJob
+
+    def __init__(
+        self, record: Callable[[Dict[str, dict]], None] = record_rois, parent=None
+    ):
+        super(RoiWriter, self).__init__(parent)
+        self._record = record
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, jobs: List[RoiJob], size: Tuple[int, int]):
+        jobs = list(jobs)
+        future = self._executor.submit(write_rois, jobs, size, self._record)
+        future.add_done_callback(partial(self._done, jobs))
+
+    def _done(self, jobs: List[RoiJob], future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failed.emit(f"Writing ROI files failed: {future.exception()}", jobs)
+            return
+        self.written.emit(future.result())
+
+    def flush(self):
+        """Wait for the queued writes."""
+        self._executor.submit(lambda: None).result()
+
+    def shutdown(self):
+        """Finish the queued writes."""
+        self._executor.shutdown(wait=True)
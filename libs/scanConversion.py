@@ -0,0 +1,165 @@
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+# Polar frames hold one A-line per column: shape (n_samples, n_alines),
+# with depth increasing down the rows and the angle across the columns.
+DEFAULT_N_ALINES = 1000
+
+# Points sampled along each box edge when mapping boxes between views
+_EDGE_SAMPLES = 32
+
+
+def _bilinear_lut(fi: np.ndarray, fj: np.ndarray, shape, wrap_cols: bool):
+    """
+    Flat gather indices and weights for bilinear sampling of an array of
+    `shape` at fractional (row, col) positions `fi`, `fj`.
+    Returns (indices (4, N) int64, weights (4, N) float32, valid (N,) bool).
+    """
+    h, w = shape
+    valid = (fi >= 0) & (fi <= h - 1)
+    if wrap_cols:
+        fj = np.mod(fj, w)
+    else:
+        valid &= (fj >= 0) & (fj <= w - 1)
+    fi = np.clip(fi, 0, h - 1)
+    fj = np.clip(fj, 0, w - 1)
+
+    i0 = np.floor(fi).astype(np.int64)
+    j0 = np.floor(fj).astype(np.int64)
+    i1 = np.minimum(i0 + 1, h - 1)
+    j1 = (j0 + 1) % w if wrap_cols else np.minimum(j0 + 1, w - 1)
+    di = (fi - i0).astype(np.float32)
+    dj = (fj - j0).astype(np.float32)
+
+    indices = np.stack([i0 * w + j0, i0 * w + j1, i1 * w + j0, i1 * w + j1])
+    weights = np.stack(
+        [(1 - di) * (1 - dj), (1 - di) * dj, di * (1 - dj), di * dj]
+    ).astype(np.float32)
+    return indices, weights, valid
+
+
+@lru_cache(maxsize=8)
+def _polar_to_cart_lut(n_samples: int, n_alines: int, cart_size: int):
+    c = (cart_size - 1) / 2.0
+    y, x = np.mgrid[0:cart_size, 0:cart_size].astype(np.float64)
+    dx, dy = x - c, y - c
+    fi = np.hypot(dx, dy) * (n_samples / (cart_size / 2.0))
+    fj = np.mod(np.arctan2(dy, dx), 2 * np.pi) * (n_alines / (2 * np.pi))
+    return _bilinear_lut(fi.ravel(), fj.ravel(), (n_samples, n_alines), True)
+
+
+@lru_cache(maxsize=8)
+def _cart_to_polar_lut(n_samples: int, n_alines: int, cart_size: int):
+    c = (cart_size - 1) / 2.0
+    i, j = np.mgrid[0:n_samples, 0:n_alines].astype(np.float64)
+    r = i * ((cart_size / 2.0) / n_samples)
+    theta = j * (2 * np.pi / n_alines)
+    fi = c + r * np.sin(theta)
+    fj = c + r * np.cos(theta)
+    return _bilinear_lut(fi.ravel(), fj.ravel(), (cart_size, cart_size), False)
+
+
+def _apply_lut(src: np.ndarray, lut, out_shape) -> np.ndarray:
+    indices, weights, valid = lut
+    flat = src.reshape(src.shape[0] * src.shape[1], -1).astype(np.float32)
+    out = flat[indices[0]] * weights[0][:, None]
+    for k in range(1, 4):
+        out += flat[indices[k]] * weights[k][:, None]
+    out[~valid] = 0
+    if src.dtype == np.uint8:
+        out = np.clip(out + 0.5, 0, 255).astype(np.uint8)
+    else:
+        out = out.astype(src.dtype)
+    return out.reshape(tuple(out_shape) + src.shape[2:])
+
+
+class ScanConverter(object):
+    """
+    CPU scan conversion between a polar frame and its Cartesian view.
+
+    The bilinear lookup tables are computed once per frame geometry and
+    cached, so converting a frame is four vectorized gathers.
+    """
+
+    def __init__(self, n_samples: int, n_alines: int, cart_size: int):
+        self.n_samples = n_samples
+        self.n_alines = n_alines
+        self.cart_size = cart_size
+
+    @classmethod
+    def for_cartesian(cls, width: int, height: int, n_alines=DEFAULT_N_ALINES):
+        size = min(width, height)
+        return cls(size // 2, n_alines, size)
+
+    @classmethod
+    def for_polar(cls, n_samples: int, n_alines: int):
+        return cls(n_samples, n_alines, 2 * n_samples)
+
+    @property
+    def polar_shape(self) -> Tuple[int, int]:
+        return self.n_samples, self.n_alines
+
+    def polar_to_cart(self, polar: np.ndarray) -> np.ndarray:
+        lut = _polar_to_cart_lut(self.n_samples, self.n_alines, self.cart_size)
+        return _apply_lut(polar, lut, (self.cart_size, self.cart_size))
+
+    def cart_to_polar(self, cart: np.ndarray) -> np.ndarray:
+        size = self.cart_size
+        lut = _cart_to_polar_lut(self.n_samples, self.n_alines, size)
+        return _apply_lut(cart[:size, :size], lut, self.polar_shape)
+
+    def cart_points_to_polar(self, x, y):
+        """Cartesian pixel coordinates -> (aline, sample) polar coordinates."""
+        c = (self.cart_size - 1) / 2.0
+        dx, dy = np.asarray(x, np.float64) - c, np.asarray(y, np.float64) - c
+        sample = np.hypot(dx, dy) * (self.n_samples / (self.cart_size / 2.0))
+        aline = np.mod(np.arctan2(dy, dx), 2 * np.pi) * (self.n_alines / (2 * np.pi))
+        return aline, sample
+
+    def polar_points_to_cart(self, aline, sample):
+        c = (self.cart_size - 1) / 2.0
+        r = np.asarray(sample, np.float64) * ((self.cart_size / 2.0) / self.n_samples)
+        theta = np.asarray(aline, np.float64) * (2 * np.pi / self.n_alines)
+        return c + r * np.cos(theta), c + r * np.sin(theta)
+
+    def cart_box_to_polar(self, xmin, ymin, xmax, ymax):
+        """
+        Smallest polar box (in polar pixels) containing a Cartesian box.
+        Boxes that contain the center or straddle angle zero span all A-lines.
+        """
+        t = np.linspace(0.0, 1.0, _EDGE_SAMPLES)
+        xs = np.concatenate([xmin + (xmax - xmin) * t, np.full_like(t, xmax)])
+        ys = np.concatenate([np.full_like(t, ymin), ymin + (ymax - ymin) * t])
+        xs = np.concatenate([xs, xmax - (xmax - xmin) * t, np.full_like(t, xmin)])
+        ys = np.concatenate([ys, np.full_like(t, ymax), ymax - (ymax - ymin) * t])
+        # The point of the box closest to the center gives the minimum depth
+        c = (self.cart_size - 1) / 2.0
+        xs = np.append(xs, min(max(c, xmin), xmax))
+        ys = np.append(ys, min(max(c, ymin), ymax))
+        aline, sample = self.cart_points_to_polar(xs, ys)
+
+        if xmin <= c <= xmax and ymin <= c <= ymax:
+            return 0.0, 0.0, float(self.n_alines), float(sample.max())
+
+        # The box does not contain the center, so its angles span less than
+        # half a turn; a span over half a turn means it crosses angle zero.
+        a_min, a_max = float(aline.min()), float(aline.max())
+        if a_max - a_min > self.n_alines / 2.0:
+            a_min, a_max = 0.0, float(self.n_alines)
+        return a_min, float(sample.min()), a_max, float(sample.max())
+
+    def polar_box_to_cart(self, amin, smin, amax, smax):
+        """Bounding Cartesian box of the annular sector of a polar box."""
+        t = np.linspace(0.0, 1.0, _EDGE_SAMPLES)
+        arc = amin + (amax - amin) * t
+        # The arcs reach their extremes at the axis directions
+        axes = [a for a in np.arange(5) * (self.n_alines / 4.0) if amin <= a <= amax]
+        alines = np.concatenate([arc, arc, axes, [amin, amax]])
+        samples = np.concatenate(
+            [np.full_like(t, smin), np.full_like(t, smax), [smax] * len(axes)]
+            + [[smin, smin]]
+        )
+        xs, ys = self.polar_points_to_cart(alines, samples)
+        return float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
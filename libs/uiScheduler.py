@@ -0,0 +1,92 @@
+from typing import Callable, Dict, Hashable, Optional
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QGuiApplication
+from PyQt5.QtWidgets import QApplication, QLabel, QStatusBar, QWidget
+
+DEFAULT_REFRESH_RATE = 60.0
+
+
+def frame_interval_ms() -> int:
+    """Duration of one frame of the primary display, in milliseconds."""
+    screen = QGuiApplication.primaryScreen()
+    rate = screen.refreshRate() if screen is not None else 0
+    return max(1, int(1000 / (rate if rate > 0 else DEFAULT_REFRESH_RATE)))
+
+
+class UiUpdateScheduler(QObject):
+    """
+    Coalesces status bar, tooltip and cursor updates and applies them at
+    most once per display frame.
+
+    Each update has a key, e.g. the widget and property it sets; only the
+    latest update of a key is applied. Mouse events can come in far more
+    often than the screen refreshes, and each applied text change makes
+    Qt relayout the widget.
+    """
+
+    def __init__(self, parent=None, interval_ms: Optional[int] = None):
+        super(UiUpdateScheduler, self).__init__(parent)
+        self._pending: Dict[Hashable, Callable[[], None]] = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms or frame_interval_ms())
+        self._timer.timeout.connect(self.flush)
+
+    def schedule(self, key: Hashable, update: Callable[[], None]):
+        """Apply `update` with the next flush, replacing the pending one of `key`."""
+        self._pending.pop(key, None)
+        self._pending[key] = update
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def cancel(self, key: Hashable):
+        self._pending.pop(key, None)
+
+    def flush(self):
+        """Apply the pending updates now, in the order they were last scheduled."""
+        self._timer.stop()
+        pending, self._pending = self._pending, {}
+        for update in pending.values():
+            update()
+
+    def set_text(self, label: QLabel, text: str):
+        def update():
+            if label.text() != text:
+                label.setText(text)
+
+        self.schedule((label, "text"), update)
+
+    def show_message(self, status_bar: QStatusBar, message: str, delay: int = 0):
+        self.schedule(
+            (status_bar, "message"), lambda: status_bar.showMessage(message, delay)
+        )
+
+    def set_tool_tip(self, widget: QWidget, text: str):
+        """Set the tooltip and status tip of `widget`."""
+
+        def update():
+            if widget.toolTip() != text:
+                widget.setToolTip(text)
+                widget.setStatusTip(text)
+
+        self.schedule((widget, "toolTip"), update)
+
+    def override_cursor(self, cursor):
+        """Set the application override cursor, pushing one if there is none."""
+
+        def update():
+            current = QApplication.overrideCursor()
+            if current is None:
+                QApplication.setOverrideCursor(cursor)
+            elif current.shape() != cursor:
+                QApplication.changeOverrideCursor(cursor)
+
+        self.schedule("cursor", update)
+
+    def restore_cursor(self):
+        """Pop the override cursor now, after applying a pending cursor change."""
+        update = self._pending.pop("cursor", None)
+        if update is not None:
+            update()
+        QApplication.restoreOverrideCursor()
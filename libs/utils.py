@@ -1,12 +1,13 @@
 from math import sqrt
 import hashlib
-import re
 import sys
 
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
 
+from libs.naturalSort import natural_sort, natural_sort_key, NaturalSortCache
+
 QT5 = True
 
 
@@ -94,19 +95,6 @@ def have_qstring():
     return not (sys.version_info.major >= 3 or QT_VERSION_STR.startswith("5."))
 
 
-def natural_sort(list, key=lambda s: s):
-    """
-    Sort the list into natural alphanumeric order.
-    """
-
-    def get_alphanum_key_func(key):
-        convert = lambda text: int(text) if text.isdigit() else text
-        return lambda s: [convert(c) for c in re.split("([0-9]+)", key(s))]
-
-    sort_key = get_alphanum_key_func(key)
-    list.sort(key=sort_key)
-
-
 # QT4 has a trimmed method, in QT5 this is called strip
 if QT5:
 
@@ -9,8 +9,8 @@ import os
 
 here = os.path.abspath(os.path.dirname(__file__))
 NAME = "labelImg"
-REQUIRES_PYTHON = ">=3.0.0"
-REQUIRED_DEP = ["pyqt5"]
+REQUIRES_PYTHON = ">=3.9.0"
+REQUIRED_DEP = ["pyqt5", "numpy"]
 about = {}
 
 with open(os.path.join(here, "libs", "__init__.py")) as f:
@@ -102,11 +102,9 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Natural Language :: English",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.3",
-        "Programming Language :: Python :: 3.4",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
     ],
     package_data={"data/predefined_classes.txt": ["data/predefined_classes.txt"]},
     options={"py2app": OPTIONS},
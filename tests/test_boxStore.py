@@ -0,0 +1,75 @@
+import unittest
+from collections import namedtuple
+
+from libs.boxStore import BoxStore, FLAG_HIDDEN, interpolate_boxes
+
+BBox = namedtuple("BBox", "name xmin ymin xmax ymax")
+Size = namedtuple("Size", "w h")
+
+
+class FakeROIFile(object):
+    def __init__(self, bboxes, size):
+        self.bboxes = bboxes
+        self.size = size
+
+    def clear_bboxes(self):
+        self.bboxes = []
+
+    def add_bbox(self, label, xmin, xmax, ymin, ymax):
+        self.bboxes.append(BBox(label, xmin, ymin, xmax, ymax))
+
+
+class TestBoxStore(unittest.TestCase):
+    def test_roiFile_roundTrip(self):
+        roi = FakeROIFile(
+            [BBox("a", 0.1, 0.2, 0.3, 0.4), BBox("b", 0.11, 0.5, 1.0, 0.75)],
+            Size(200, 100),
+        )
+        store = BoxStore.from_roi_file(roi)
+        self.assertEqual(store.labels, ["a", "b"])
+        self.assertEqual(store.shape_tuple(0)[1][0], (20.0, 20.0))
+        self.assertEqual(store.shape_tuple(1)[1][2], (200.0, 75.0))
+
+        bboxes = list(roi.bboxes)
+        store.write_roi_file(roi, 200, 100)
+        self.assertEqual(roi.bboxes, bboxes)
+
+    def test_hit_picksSmallestVisibleBox(self):
+        store = BoxStore.from_boxes([("a", 0, 0, 100, 100), ("b", 10, 10, 20, 20)])
+        self.assertEqual(store.hit(15, 15), 1)
+        store.boxes["flags"][1] |= FLAG_HIDDEN
+        self.assertEqual(store.hit(15, 15), 0)
+        self.assertIsNone(store.hit(150, 15))
+
+    def test_setHidden_byLabel(self):
+        store = BoxStore.from_boxes([("a", 0, 0, 1, 1), ("b", 0, 0, 2, 2)])
+        store.set_hidden(store.label_mask({"b"}))
+        self.assertEqual(store.visible().tolist(), [True, False])
+        store.set_hidden(store.label_mask(set()))
+        self.assertEqual(store.visible().tolist(), [True, True])
+
+    def test_extend_remapsLabels(self):
+        store = BoxStore.from_boxes([("b", 0, 0, 1, 1)])
+        other = BoxStore.from_boxes([("a", 0, 0, 2, 2), ("b", 0, 0, 3, 3)])
+        store.extend(other)
+        self.assertEqual([store.label_of(i) for i in range(3)], ["b", "a", "b"])
+
+    def test_clip_reportsChange(self):
+        store = BoxStore.from_boxes([("a", -5, 0, 10, 10)])
+        self.assertTrue(store.clip(8, 8))
+        self.assertEqual(store.shape_tuple(0)[1][2], (8.0, 8.0))
+        self.assertFalse(store.clip(8, 8))
+
+    def test_interpolate_pairsBoxesByLabel(self):
+        a = BoxStore.from_boxes([("a", 0, 0, 10, 10), ("b", 0, 0, 4, 4)])
+        b = BoxStore.from_boxes([("c", 0, 0, 1, 1), ("a", 30, 0, 40, 10)])
+        frames = interpolate_boxes(a, b, 2)
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(len(frames[0]), 1)
+        self.assertEqual(frames[0].shape_tuple(0)[0], "a")
+        self.assertEqual(frames[0].shape_tuple(0)[1][0], (10.0, 0.0))
+        self.assertEqual(frames[1].shape_tuple(0)[1][2], (30.0, 10.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
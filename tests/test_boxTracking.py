@@ -0,0 +1,31 @@
+import unittest
+
+import numpy as np
+
+from libs.boxTracking import ncc_map, track_box
+
+
+def _frame(cx, cy, size=(120, 160)):
+    y, x = np.mgrid[: size[0], : size[1]]
+    return np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / 50.0).astype(np.float32)
+
+
+class TestBoxTracking(unittest.TestCase):
+    def test_nccMap_peaksAtTemplatePosition(self):
+        rng = np.random.default_rng(0)
+        image = rng.random((40, 50)).astype(np.float32)
+        ncc = ncc_map(image, image[10:20, 15:30])
+        self.assertEqual(np.unravel_index(np.argmax(ncc), ncc.shape), (10, 15))
+        self.assertAlmostEqual(float(ncc.max()), 1.0, places=4)
+
+    def test_trackBox_followsMovingBlob(self):
+        frames = [_frame(40 + 4 * i, 50 + 2 * i) for i in range(5)]
+        results = track_box(frames, (30, 40, 50, 60))
+        self.assertEqual(len(results), 4)
+        box, score = results[-1]
+        self.assertEqual(box, (46.0, 48.0, 66.0, 68.0))
+        self.assertGreater(score, 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QPixmap
+
+from labelImg import get_main_app
+from libs.shape import Shape
+
+
+class TestCanvasSplitView(TestCase):
+    def setUp(self):
+        self.app, self.win = get_main_app()
+        self.canvas = self.win.canvas
+
+    def tearDown(self):
+        self.win.close()
+        self.app.quit()
+
+    def test_splitPanes_mapToSameImageCoordinates(self):
+        pixmap = QPixmap(40, 30)
+        self.canvas.load_pixmap(pixmap)
+        self.canvas.set_split_panes([("PA", pixmap), ("US", pixmap), ("SUM", pixmap)])
+        size = self.canvas.content_size()
+        self.assertEqual((size.width(), size.height()), (3 * 40 + 2 * 8, 30))
+
+        self.canvas.scale = 1.0
+        offset = self.canvas.offset_to_center()
+        first = self.canvas.transform_pos(QPointF(5, 7) + offset)
+        third = self.canvas.transform_pos(QPointF(5 + 2 * 48, 7) + offset)
+        self.assertEqual(first, third)
+
+    def test_loadPixmap_leavesSplitView(self):
+        pixmap = QPixmap(40, 30)
+        self.canvas.load_pixmap(pixmap)
+        self.canvas.set_split_panes([("PA", pixmap), ("US", pixmap)])
+        self.canvas.load_pixmap(pixmap)
+        self.assertEqual(self.canvas.split_panes, [])
+        self.assertEqual(self.canvas.content_size(), pixmap.size())
+
+
+class TestCanvasUiUpdates(TestCase):
+    def setUp(self):
+        self.app, self.win = get_main_app()
+        self.canvas = self.win.canvas
+
+    def tearDown(self):
+        self.win.close()
+        self.app.quit()
+
+    def test_showCoordinates_appliesLatestOnFlush(self):
+        label = self.win.label_coordinates
+        self.canvas.ui_updates.flush()
+        for x in range(100):
+            self.canvas.show_coordinates("X: %d; Y: 0" % x)
+        self.assertNotEqual(label.text(), "X: 99; Y: 0")
+        self.canvas.ui_updates.flush()
+        self.assertEqual(label.text(), "X: 99; Y: 0")
+
+
+class TestCanvasVisibility(TestCase):
+    def setUp(self):
+        self.app, self.win = get_main_app()
+        self.canvas = self.win.canvas
+
+    def tearDown(self):
+        self.win.close()
+        self.app.quit()
+
+    def test_shapeShownOnItsOwn_staysVisibleInHiddenClass(self):
+        a, b, c = Shape(label="A"), Shape(label="B"), Shape(label="C")
+        self.canvas.load_shapes([a, b, c])
+        self.canvas.set_hidden_labels({"B", "C"})
+        self.canvas.set_shape_visible(b, True)
+        self.assertTrue(self.canvas.isVisible(b))
+
+        self.canvas.set_hidden_labels({"B"})
+        self.assertTrue(self.canvas.isVisible(b))
+        self.assertTrue(self.canvas.isVisible(c))
+
+        self.canvas.set_shape_visible(a, False)
+        self.canvas.set_hidden_labels({"A", "B"})
+        self.canvas.set_hidden_labels({"B"})
+        self.assertTrue(self.canvas.isVisible(a))
+        self.assertTrue(self.canvas.isVisible(b))
@@ -0,0 +1,26 @@
+import unittest
+
+from libs.cine import CineBuffer, CineFrame
+
+
+def _read(path):
+    if path == "bad":
+        raise OSError("cannot read")
+    return CineFrame(path, None)
+
+
+class TestCineBuffer(unittest.TestCase):
+    def test_fill_decodesWindowAhead(self):
+        buffer = CineBuffer(["a", "b", "bad", "d", "e"], _read, capacity=4)
+        buffer.fill(0)
+        buffer._executor.shutdown(wait=True)
+        self.assertEqual(buffer.latest(0, 1), (1, CineFrame("b", None)))
+        self.assertEqual(buffer.latest(0, 2), (2, None))
+        self.assertEqual(buffer.pop_error(2), "Reading bad failed: cannot read")
+        self.assertIsNone(buffer.pop_error(1))
+        self.assertEqual(buffer.latest(0, 3)[0], 3)
+        self.assertIsNone(buffer.latest(4, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
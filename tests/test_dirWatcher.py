@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from libs.dirWatcher import DirWatcher
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb"):
+        pass
+
+
+class TestDirWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.abspath(self.tmp.name)
+        self.watcher = DirWatcher()
+        self.added, self.changed = [], []
+        self.watcher.imagesAdded.connect(self.added.extend)
+        self.watcher.annotationsChanged.connect(self.changed.extend)
+
+    def tearDown(self):
+        self.watcher.clear()
+        self.tmp.cleanup()
+
+    def flush(self, *dirs):
+        for d in dirs:
+            self.watcher._on_directory_changed(d)
+        self.watcher._flush()
+
+    def test_recursive_reportsPatientDirectoriesCreatedLater(self):
+        self.watcher.watch({self.root: []}, recursive=True)
+        image = os.path.join(self.root, "patient1", "f0_PA.png")
+        _touch(image)
+        self.flush(self.root)
+        self.assertEqual(self.added, [image])
+
+        later = os.path.join(self.root, "patient1", "f1_PA.png")
+        _touch(later)
+        self.flush(os.path.dirname(later))
+        self.assertEqual(self.added, [image, later])
+
+    def test_notRecursive_ignoresSubdirectories(self):
+        self.watcher.watch({self.root: []})
+        _touch(os.path.join(self.root, "patient1", "f0_PA.png"))
+        self.flush(self.root)
+        self.assertEqual(self.added, [])
+
+    def test_watchesAnnotationDirectoriesCreatedLater(self):
+        self.watcher.watch({self.root: []})
+        roi = os.path.join(self.root, "roi", "f0.json")
+        _touch(roi)
+        self.flush(self.root)
+        self.assertEqual(self.changed, [roi])
+        self.assertIn(os.path.dirname(roi), self.watcher._watcher.directories())
+
+        os.remove(roi)
+        self.flush(os.path.dirname(roi))
+        self.assertEqual(self.changed, [roi, roi])
+
+
+if __name__ == "__main__":
+    unittest.main()
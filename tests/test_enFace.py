@@ -0,0 +1,29 @@
+import unittest
+
+import numpy as np
+
+from libs.boxStore import BoxStore
+from libs.enFace import aline_projection, box_spans
+
+
+class TestEnFace(unittest.TestCase):
+    def test_alineProjection_findsBrightAline(self):
+        image = np.zeros((101, 101), np.float32)
+        image[50, 70:90] = 1.0  # right of the center, at angle zero
+        profile = aline_projection(image, "max", n_alines=36)
+        self.assertEqual(profile.shape, (36,))
+        self.assertIn(int(np.argmax(profile)), (0, 35))
+        self.assertLess(float(aline_projection(image, "mean", 36).max()), 1.0)
+
+    def test_boxSpans_coverBoxAngles(self):
+        # A box below the center spans the A-lines around a quarter turn
+        boxes = BoxStore.from_boxes([("lesion", 40, 70, 60, 90)])
+        ((label, a_min, a_max),) = box_spans(boxes, 101, 101, n_alines=360)
+        self.assertEqual(label, "lesion")
+        self.assertLess(a_min, 90)
+        self.assertGreater(a_max, 90)
+        self.assertLess(a_max - a_min, 90)
+
+
+if __name__ == "__main__":
+    unittest.main()
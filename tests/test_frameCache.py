@@ -0,0 +1,77 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+from PyQt5.QtGui import QImage
+
+from libs.frameCache import CompressedFrameCache
+from libs.imageLoader import ndarray_to_qimage, qimage_to_ndarray, read_image
+
+
+class TestCompressedFrameCache(unittest.TestCase):
+    def test_read_decodesOnceAndRestoresPixels(self):
+        array = np.arange(30 * 20, dtype=np.uint32).reshape(30, 20).astype(np.uint8)
+        reads = []
+
+        def read(path):
+            reads.append(path)
+            return read_image(path)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "f0_PA.png")
+            ndarray_to_qimage(array).save(path)
+            cache = CompressedFrameCache()
+            cache.read(path, read)
+            cache._executor.shutdown(wait=True)
+            image = cache.read(path, read)
+            self.assertEqual(reads, [path])
+            np.testing.assert_array_equal(qimage_to_ndarray(image), array)
+
+            os.utime(path, ns=(0, 0))
+            self.assertIsNone(cache.get(path))
+
+    def test_put_storesGrayColorFramesAsGrayscale(self):
+        gray = np.arange(12, dtype=np.uint8).reshape(3, 4) * 20
+        rgba = np.dstack([gray, gray, gray, np.full_like(gray, 255)])
+        cache = CompressedFrameCache()
+        cache.put("a", ndarray_to_qimage(rgba)).result()
+        image = cache.get("a")
+        self.assertEqual(image.format(), QImage.Format_Grayscale8)
+        np.testing.assert_array_equal(qimage_to_ndarray(image), gray)
+
+    def test_put_evictsLeastRecentlyUsedOverBudget(self):
+        rng = np.random.default_rng(0)
+        cache = CompressedFrameCache(max_bytes=2500)
+        for name in ("a", "b", "c"):
+            image = ndarray_to_qimage(rng.integers(0, 255, (32, 32), np.uint8))
+            cache.put(name, image).result()
+        self.assertEqual(list(cache._entries), ["b", "c"])
+        self.assertLessEqual(cache.nbytes, 2500)
+        cache.invalidate()
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+
+    def test_invalidate_discardsCompressionInFlight(self):
+        cache = CompressedFrameCache()
+        started = threading.Event()
+        cache._executor.submit(started.wait)
+        future = cache.put("a", ndarray_to_qimage(np.zeros((4, 4), np.uint8)))
+        cache.invalidate("a")
+        started.set()
+        future.result()
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+
+    def test_prefetch_decompressesForGet(self):
+        gray = np.arange(12, dtype=np.uint8).reshape(3, 4)
+        cache = CompressedFrameCache()
+        cache.put("a", ndarray_to_qimage(gray)).result()
+        cache.prefetch(["a", "missing"])
+        self.assertEqual(list(cache._prefetched), ["a"])
+        image = cache.get("a")
+        self.assertEqual(cache._prefetched, {})
+        np.testing.assert_array_equal(qimage_to_ndarray(image), gray)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from libs.dirScanner import scan_dir
+from libs.frameStore import (
+    PACK_NAME,
+    FrameStore,
+    frame_exists,
+    frame_mtime_ns,
+    read_packed,
+    store_for,
+    write_pack,
+)
+from libs.imageLoader import ndarray_to_qimage, read_image, read_preview
+
+
+class TestFrameStore(unittest.TestCase):
+    def test_writePack_servesFramesAndMetaAfterRemoval(self):
+        with tempfile.TemporaryDirectory() as patient_dir:
+            os.makedirs(os.path.join(patient_dir, "meta"))
+            files = []
+            for i in range(3):
+                path = os.path.join(patient_dir, f"f{i}_PA.png")
+                ndarray_to_qimage(np.full((8, 6 + i), 50 * i, np.uint8)).save(path)
+                files.append(path)
+            meta_path = os.path.join(patient_dir, "meta", "f0.json")
+            with open(meta_path, "w") as f:
+                f.write('{"mean_ratio": 2.0}')
+            files.append(meta_path)
+
+            write_pack(patient_dir, files)
+            for path in files:
+                os.remove(path)
+
+            images, _ = scan_dir(patient_dir)
+            self.assertEqual(sorted(images), sorted(files[:3]))
+            image = read_image(files[2])
+            self.assertEqual((image.width(), image.height()), (8, 8))
+            self.assertEqual(image.pixelColor(1, 1).red(), 100)
+            self.assertEqual(read_preview(files[1], 4).height(), 4)
+            self.assertEqual(read_packed(meta_path), b'{"mean_ratio": 2.0}')
+            self.assertTrue(frame_exists(files[0]))
+            self.assertFalse(frame_exists(os.path.join(patient_dir, "f9_PA.png")))
+
+    def test_writePack_keepsMembersOfBase(self):
+        with tempfile.TemporaryDirectory() as patient_dir:
+            paths = [os.path.join(patient_dir, n) for n in ("a.png", "b.png")]
+            for path, data in zip(paths, (b"old", b"new")):
+                with open(path, "wb") as f:
+                    f.write(data)
+            write_pack(patient_dir, paths[:1])
+            os.remove(paths[0])
+            write_pack(patient_dir, paths[1:], store_for(patient_dir, refresh=True))
+
+            store = FrameStore(os.path.join(patient_dir, PACK_NAME))
+            self.assertEqual(sorted(store.names()), ["a.png", "b.png"])
+            self.assertEqual(store.read("a.png"), b"old")
+            self.assertEqual(store.read("b.png"), b"new")
+            store.close()
+
+    def test_readPacked_prefersNewerFileOnDisk(self):
+        with tempfile.TemporaryDirectory() as patient_dir:
+            path = os.path.join(patient_dir, "a.png")
+            with open(path, "wb") as f:
+                f.write(b"old")
+            write_pack(patient_dir, [path])
+            self.assertEqual(read_packed(path), b"old")
+
+            with open(path, "wb") as f:
+                f.write(b"edited")
+            mtime_ns = os.stat(path).st_mtime_ns + 10**9
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+            self.assertIsNone(read_packed(path))
+            self.assertEqual(frame_mtime_ns(path), mtime_ns)
+
+    def test_frameStore_rejectsOtherFiles(self):
+        with tempfile.TemporaryDirectory() as patient_dir:
+            path = os.path.join(patient_dir, PACK_NAME)
+            with open(path, "wb") as f:
+                f.write(b"\0" * 64)
+            with self.assertRaises(ValueError):
+                FrameStore(path)
+
+            errors = []
+            self.assertEqual(scan_dir(patient_dir, errors=errors), ([], []))
+            self.assertEqual(errors, [f"{path}: not a frame pack"])
+
+
+if __name__ == "__main__":
+    unittest.main()
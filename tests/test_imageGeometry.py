@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from libs.imageGeometry import GEOMETRY_INDEX_NAME, ImageGeometry, probe_size
+from libs.imageLoader import ndarray_to_qimage
+
+
+class TestImageGeometry(unittest.TestCase):
+    def test_probeSize_readsHeadersOnly(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            png_path = os.path.join(tmp, "f0_PA.png")
+            ndarray_to_qimage(np.zeros((5, 7), np.uint8)).save(png_path)
+            with open(png_path, "r+b") as f:
+                f.seek(33)  # corrupt the pixel data after IHDR
+                f.write(b"\0" * 16)
+            self.assertEqual(probe_size(png_path), (7, 5))
+
+            bmp_path = os.path.join(tmp, "f0_US.bmp")
+            ndarray_to_qimage(np.zeros((3, 9, 3), np.uint8)).save(bmp_path)
+            self.assertEqual(probe_size(bmp_path), (9, 3))
+
+            npy_path = os.path.join(tmp, "f1_PA.npy")
+            np.save(npy_path, np.zeros((4, 6), np.float32))
+            self.assertEqual(probe_size(npy_path), (6, 4))
+            self.assertIsNone(probe_size(os.path.join(tmp, "missing.png")))
+
+    def test_size_cachedInDirectoryIndexByMtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "f0_PA.png")
+            ndarray_to_qimage(np.zeros((5, 7), np.uint8)).save(path)
+            geometry = ImageGeometry()
+            self.assertEqual(geometry.size(path), (7, 5))
+            geometry.save()
+            with open(os.path.join(tmp, GEOMETRY_INDEX_NAME)) as f:
+                self.assertEqual(json.load(f)["sizes"]["f0_PA.png"][:2], [7, 5])
+
+            ndarray_to_qimage(np.zeros((2, 3), np.uint8)).save(path)
+            os.utime(path, ns=(1, 1))
+            self.assertEqual(ImageGeometry().size(path), (3, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
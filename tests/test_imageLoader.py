@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from libs.imageLoader import ndarray_to_qimage, read_image, read_preview
+from libs.rawFrame import RawFrame, DisplayWindow, is_raw_frame
+
+
+class TestImageLoader(unittest.TestCase):
+    def test_ndarrayToQImage_sharesBufferAndStride(self):
+        array = np.arange(5 * 7 * 3, dtype=np.uint8).reshape(5, 7, 3)
+        image = ndarray_to_qimage(array)
+        self.assertEqual((image.width(), image.height()), (7, 5))
+        self.assertEqual(image.bytesPerLine(), 21)
+        self.assertEqual(image.pixel(2, 1) & 0xFFFFFF, 0x1B1C1D)
+
+    def test_ndarrayToQImage_copiesStridedView(self):
+        array = np.arange(4 * 6, dtype=np.uint8).reshape(4, 6)[:, ::2]
+        image = ndarray_to_qimage(array)
+        self.assertEqual((image.width(), image.height()), (3, 4))
+        self.assertEqual(image.pixelColor(1, 2).red(), array[2, 1])
+
+    def test_readImage_npyAndPng(self):
+        array = np.full((3, 4), 200, dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp:
+            npy_path = os.path.join(tmp, "frame.npy")
+            np.save(npy_path, array)
+            image = read_image(npy_path)
+            self.assertEqual(image.pixelColor(3, 2).red(), 200)
+
+            png_path = os.path.join(tmp, "frame.png")
+            self.assertTrue(image.save(png_path))
+            self.assertEqual(read_image(png_path).size(), image.size())
+
+    def test_readPreview_downsamplesNpyAndPng(self):
+        array = np.full((300, 200), 100, dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp:
+            npy_path = os.path.join(tmp, "frame.npy")
+            np.save(npy_path, array)
+            preview = read_preview(npy_path, max_side=100)
+            self.assertEqual((preview.width(), preview.height()), (67, 100))
+
+            png_path = os.path.join(tmp, "frame.png")
+            self.assertTrue(read_image(npy_path).save(png_path))
+            preview = read_preview(png_path, max_side=100)
+            self.assertEqual(max(preview.width(), preview.height()), 100)
+
+    def test_rawFrame_windowsInDbWithoutRereading(self):
+        data = np.array([[1.0, 0.1], [0.01, 0.001]], dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            raw_path = os.path.join(tmp, "frame.raw")
+            data.tofile(raw_path)
+            with open(os.path.join(tmp, "frame.json"), "w") as f:
+                f.write('{"shape": [2, 2], "dtype": "float32"}')
+            self.assertTrue(is_raw_frame(raw_path))
+            frame = RawFrame.from_path(raw_path)
+
+            image = frame.render(DisplayWindow(-40.0, 0.0))
+            values = [image.pixelColor(x, y).red() for y in range(2) for x in range(2)]
+            self.assertEqual(values, [255, 127, 0, 0])
+
+            frame.data = None  # the file is not needed to change the window
+            image = frame.render(DisplayWindow(-60.0, -20.0))
+            values = [image.pixelColor(x, y).red() for y in range(2) for x in range(2)]
+            self.assertEqual(values, [255, 255, 127, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from arpamutils.roi import CoImageType
+
+from libs.imageSetIndex import ImageSetIndex
+
+
+class FakeCoImageSet(object):
+    """Parses "<dir>/<fid>_<type>.png", independent of the real naming."""
+
+    def __init__(self, path):
+        path = Path(path)
+        fid, _, coreg_type = path.stem.rpartition("_")
+        if not fid or coreg_type not in CoImageType.__members__:
+            raise ValueError(path)
+        self.init_type = CoImageType[coreg_type]
+        self.roi = path.parent / "roi" / (fid + ".json")
+        self.meta = path.parent / "meta" / (fid + ".json")
+
+    @classmethod
+    def from_path(cls, path):
+        return cls(path)
+
+
+@mock.patch("libs.imageSetIndex.CoImageSet", FakeCoImageSet)
+class TestImageSetIndex(unittest.TestCase):
+    def test_add_groupsModalitiesWithPaAsRepresentative(self):
+        index = ImageSetIndex()
+        us, pa = os.path.join("p", "f0_US.png"), os.path.join("p", "f0_PA.png")
+        image_set, old_path = index.add(us)
+        self.assertIsNone(old_path)
+        self.assertEqual(image_set.path, us)
+        image_set, old_path = index.add(pa)
+        self.assertEqual(old_path, us)
+        self.assertEqual(image_set.path, pa)
+        self.assertEqual(len(index), 1)
+        self.assertIs(index.set_of(us), image_set)
+        self.assertEqual(image_set.roi, Path("p", "roi", "f0.json"))
+
+        index.add("notes.png")
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.set_of("notes.png").roi)
+
+    def test_remove_switchesRepresentativeAndDropsEmptySets(self):
+        paths = [os.path.join("p", f"f0_{t}.png") for t in ("PA", "US", "SUM")]
+        index = ImageSetIndex.from_paths(paths)
+
+        image_set, old_path = index.remove(paths[0])
+        self.assertEqual(old_path, paths[0])
+        self.assertEqual(image_set.path, paths[1])
+        self.assertIsNone(index.set_of(paths[0]))
+
+        index.remove(paths[2])
+        self.assertEqual(image_set.path, paths[1])
+        image_set, old_path = index.remove(paths[1])
+        self.assertEqual(old_path, paths[1])
+        self.assertIsNone(image_set.path)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.remove(paths[1]), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
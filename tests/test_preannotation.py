@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from libs import preannotation
+from libs.imageLoader import ndarray_to_qimage
+
+MODEL = """
+import numpy as np
+
+def predict(batch):
+    out = np.zeros((batch.shape[0], 1, 6), np.float32)
+    out[:, 0, :4] = [0.25, 0.25, 0.75, 0.75]
+    out[:, 0, 4] = batch.mean(axis=(1, 2, 3))
+    return out
+"""
+
+
+class TestPreannotation(unittest.TestCase):
+    def test_infer_batchesFramesByShape(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, "model.py")
+            with open(model_path, "w") as f:
+                f.write(MODEL)
+            with open(os.path.join(tmp, "model.txt"), "w") as f:
+                f.write("lesion\n")
+
+            paths = []
+            for i, shape in enumerate([(8, 8), (8, 8), (4, 6)]):
+                path = os.path.join(tmp, f"f{i}.png")
+                ndarray_to_qimage(np.full(shape, 51 * i, np.uint8)).save(path)
+                paths.append(path)
+
+            preannotation._init_worker(model_path)
+            results = preannotation._infer(paths)
+            self.assertEqual([r.shape for r in results], [(1, 6)] * 3)
+            self.assertAlmostEqual(float(results[2][0, 4]), 0.4, places=5)
+            self.assertEqual(preannotation.model_labels(model_path), ["lesion"])
+            self.assertEqual(len(preannotation.model_hash(model_path)), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
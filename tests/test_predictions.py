@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+
+from libs.boxStore import BoxStore
+from libs.predictions import PredictionFile, append_predictions
+
+
+class TestPredictions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_csv_indexesByImageAndScales(self):
+        path = os.path.join(self.dir, "pred.csv")
+        with open(path, "w") as f:
+            f.write("image,label,xmin,ymin,xmax,ymax,score\n")
+            f.write("a_SUM.png,lesion,0.1,0.2,0.3,0.4,0.9\n")
+            f.write("b_SUM.png,lesion,0.0,0.0,0.5,0.5,0.2\n")
+            f.write("a_SUM.png,wall,0.5,0.5,1.0,1.0,0.4\n")
+        predictions = PredictionFile(path)
+        self.assertEqual((predictions.n_records, len(predictions)), (3, 2))
+
+        image = os.path.join(self.dir, "a_SUM.png")
+        frame = predictions.frame_predictions(["missing.png", image], (100, 50))
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(frame.boxes.shape_tuple(0)[1][0], (10.0, 10.0))
+
+        frame.apply_threshold(0.5)
+        self.assertEqual(frame.boxes.visible().tolist(), [True, False])
+        frame.apply_threshold(0.3)
+        self.assertEqual(frame.boxes.visible().tolist(), [True, True])
+
+    def test_jsonl_suppressesExistingBoxes(self):
+        path = os.path.join(self.dir, "pred.jsonl")
+        with open(path, "w") as f:
+            for xmin in (0.0, 0.5):
+                record = dict(
+                    image="a.png",
+                    label="l",
+                    xmin=xmin,
+                    ymin=0,
+                    xmax=xmin + 0.5,
+                    ymax=1,
+                    score=1,
+                )
+                f.write(json.dumps(record) + "\n")
+        frame = PredictionFile(path).frame_predictions(
+            [os.path.join(self.dir, "a.png")], (10, 10)
+        )
+        frame.suppress(BoxStore.from_boxes([("l", 0, 0, 5, 10)]))
+        self.assertEqual(len(frame), 1)
+        self.assertEqual(frame.take([0])[0][1][0], (5.0, 0.0))
+        self.assertEqual(len(frame), 0)
+
+    def test_appendPredictions_readBackAfterEachAppend(self):
+        path = os.path.join(self.dir, "tracked.jsonl")
+        image = os.path.join(self.dir, "a_SUM.png")
+        record = dict(
+            image="a_SUM.png", label="l", xmin=0.1, ymin=0, xmax=0.5, ymax=1, score=0.8
+        )
+        append_predictions(path, [record])
+        append_predictions(path, [dict(record, image="b_SUM.png"), record])
+        predictions = PredictionFile(path)
+        self.assertEqual((predictions.n_records, len(predictions)), (3, 2))
+        frame = predictions.frame_predictions([image], (10, 10))
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(frame.boxes.shape_tuple(0)[1][0], (1.0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
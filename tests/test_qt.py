@@ -1,6 +1,12 @@
+import os
+import tempfile
 from unittest import TestCase
 
+import numpy as np
+
 from labelImg import get_main_app
+from libs.cine import CineFrame
+from libs.imageLoader import ndarray_to_qimage
 
 
 class TestMainWindow(TestCase):
@@ -17,3 +23,42 @@ class TestMainWindow(TestCase):
 
     def test_noop(self):
         pass
+
+
+class TestNavigation(TestCase):
+    """Moving through the image sets of a directory of six PA frames."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(6):
+            path = os.path.join(self._tmp.name, f"f{i}_PA.png")
+            ndarray_to_qimage(np.full((16, 16), 40 * i, np.uint8)).save(path)
+            self.paths.append(os.path.abspath(path))
+        self.app, self.win = get_main_app()
+        self.win.import_dir_images(self._tmp.name)
+
+    def tearDown(self):
+        self.win.close()
+        self.app.quit()
+        self._tmp.cleanup()
+
+    def test_heldKey_previewsOneSetAfterAnother(self):
+        self.assertEqual(self.win.cur_img_idx, 0)
+        for i in range(1, 5):
+            self.win._key_repeat = True
+            self.win.open_next_image()
+            self.assertEqual(self.win.cur_img_idx, i)
+            self.assertEqual(self.win._preview_path, self.paths[i])
+        self.win._key_repeat = True
+        self.win.open_prev_image()
+        self.assertEqual(self.win.cur_img_idx, 3)
+
+    def test_nextDuringCine_continuesFromFrameShown(self):
+        self.win.play_cine()
+        image = ndarray_to_qimage(np.zeros((16, 16), np.uint8))
+        self.win.show_cine_frame(3, CineFrame(image, None))
+        self.win.open_next_image()
+        self.assertFalse(self.win.cine_player.is_playing())
+        self.assertEqual(self.win.cur_img_idx, 4)
+        self.assertEqual(self.win.file_path, self.paths[4])
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from libs.boxStore import BoxStore
+from libs.roiIndex import (
+    ROI_INDEX_NAME,
+    RoiIndex,
+    record_rois,
+    roi_entry,
+    study_stats,
+)
+
+
+class TestRoiIndex(unittest.TestCase):
+    def test_roiEntry_countsBoxesPerLabel(self):
+        boxes = BoxStore.from_boxes([("a", 0, 0, 1, 1), ("b", 0, 0, 1, 1)] * 2)
+        boxes.remove([1, 3])
+        entry = roi_entry(boxes, True, False)
+        self.assertEqual(entry, {"labels": {"a": 2}, "good_PA": True, "good_US": False})
+
+    def test_recordRois_updatesExistingIndexOnly(self):
+        with tempfile.TemporaryDirectory() as study:
+            indexed, unindexed = (os.path.join(study, p) for p in ("p0", "p1"))
+            for patient_dir in (indexed, unindexed):
+                os.makedirs(os.path.join(patient_dir, "roi"))
+            empty = roi_entry(BoxStore(), False, False)
+            RoiIndex(os.path.join(indexed, ROI_INDEX_NAME), {"f0.json": empty}).save()
+
+            entry = roi_entry(BoxStore.from_boxes([("a", 0, 0, 1, 1)]), False, True)
+            record_rois(
+                {
+                    os.path.join(indexed, "roi", "f1.json"): entry,
+                    os.path.join(unindexed, "roi", "f0.json"): entry,
+                }
+            )
+            stats = study_stats([indexed, unindexed])
+            self.assertEqual(stats.n_patients, 1)
+            self.assertEqual(stats.n_unindexed, 1)
+            self.assertEqual(stats.n_frames, 2)
+            self.assertEqual(stats.n_labelled, 1)
+            self.assertEqual(stats.n_good_US, 1)
+            self.assertEqual(stats.label_counts, {"a": 1})
+
+
+    def test_studyStats_reloadsIndexChangedOnDisk(self):
+        with tempfile.TemporaryDirectory() as patient_dir:
+            path = os.path.join(patient_dir, ROI_INDEX_NAME)
+            empty = roi_entry(BoxStore(), False, False)
+            RoiIndex(path, {"f0.json": empty}).save()
+            self.assertEqual(study_stats([patient_dir]).n_frames, 1)
+
+            RoiIndex(path, {"f0.json": empty, "f1.json": empty}).save()
+            mtime_ns = os.stat(path).st_mtime_ns + 10**9
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+            self.assertEqual(study_stats([patient_dir]).n_frames, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
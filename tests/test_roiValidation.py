@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from arpamutils.roi import ROI_File
+
+from libs.imageLoader import ndarray_to_qimage
+from libs.roiValidation import (
+    FIX_FAILED,
+    INVERTED,
+    MISSING_META,
+    ORPHAN_ROI,
+    OUT_OF_RANGE,
+    SIZE_MISMATCH,
+    box_issues,
+    repair_boxes,
+    validate_patient,
+)
+
+
+def make_frame(patient_dir, fid, box, size=(64, 32), meta=True):
+    """A 64x32 PA frame with an ROI file holding `box` and saved for `size`."""
+    img_path = os.path.join(patient_dir, f"{fid}_PA.png")
+    ndarray_to_qimage(np.zeros((32, 64), np.uint8)).save(img_path)
+    if meta:
+        os.makedirs(os.path.join(patient_dir, "meta"), exist_ok=True)
+        with open(os.path.join(patient_dir, "meta", f"{fid}.json"), "w") as f:
+            f.write("{}")
+    roi_file = ROI_File.from_img_path(img_path)
+    roi_file.clear_bboxes()
+    xmin, ymin, xmax, ymax = box
+    roi_file.add_bbox(label="lesion", xmin=xmin, xmax=xmax, ymin=ymin, ymax=ymax)
+    roi_file.size = type(roi_file.size)(*size)
+    roi_file.save()
+    return str(roi_file.img_set.roi)
+
+
+def codes(patient):
+    return sorted((i["code"], os.path.basename(i["file"])) for i in patient["issues"])
+
+
+class TestRoiValidation(unittest.TestCase):
+    def test_boxIssues_flagsOutOfRangeAndInvertedBoxes(self):
+        coords = np.array(
+            [
+                [0.1, 0.1, 0.5, 0.5],
+                [-0.1, 0.2, 0.5, 1.2],
+                [0.6, 0.1, 0.4, 0.5],
+                [0.6, 0.7, 1.1, 0.3],
+            ]
+        )
+        issues = box_issues(coords)
+        np.testing.assert_array_equal(issues[OUT_OF_RANGE], [0, 1, 0, 1])
+        np.testing.assert_array_equal(issues[INVERTED], [0, 0, 1, 1])
+
+    def test_repairBoxes_ordersCornersAndClips(self):
+        coords = np.array([[0.6, 0.7, 1.1, 0.3], [0.1, 0.1, 0.5, 0.5]])
+        repaired = repair_boxes(coords)
+        np.testing.assert_allclose(repaired, [[0.6, 0.3, 1.0, 0.7], coords[1]])
+        self.assertFalse(any(m.any() for m in box_issues(repaired).values()))
+
+    def test_boxIssues_emptyStudy(self):
+        issues = box_issues(np.zeros((0, 4)))
+        self.assertEqual([len(m) for m in issues.values()], [0, 0])
+
+
+class TestValidatePatient(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.patient_dir = os.path.realpath(self._tmp.name)
+        make_frame(self.patient_dir, "f0", (0.1, 0.1, 0.5, 0.5))
+        self.inverted = make_frame(self.patient_dir, "f1", (0.6, 0.1, 0.4, 0.5))
+        self.resized = make_frame(
+            self.patient_dir, "f2", (0.1, 0.1, 0.5, 0.5), (32, 32), meta=False
+        )
+        with open(os.path.join(self.patient_dir, "roi", "ghost.json"), "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_validatePatient_reportsIssuesWithoutFixing(self):
+        patient = validate_patient(self.patient_dir)
+        self.assertEqual(
+            codes(patient),
+            [
+                (INVERTED, "f1.json"),
+                (MISSING_META, "f2_PA.png"),
+                (ORPHAN_ROI, "ghost.json"),
+                (SIZE_MISMATCH, "f2.json"),
+            ],
+        )
+        self.assertEqual((patient["roi_files"], patient["boxes"]), (3, 3))
+        self.assertEqual(patient["fixed"], [])
+
+    def test_validatePatient_fixRewritesThroughStaging(self):
+        patient = validate_patient(self.patient_dir, fix=True)
+        self.assertEqual(sorted(patient["fixed"]), [self.inverted, self.resized])
+        self.assertEqual(
+            [n for n in os.listdir(self.patient_dir) if n.startswith(".roi_fix")], []
+        )
+        patient = validate_patient(self.patient_dir)
+        self.assertEqual(
+            codes(patient), [(MISSING_META, "f2_PA.png"), (ORPHAN_ROI, "ghost.json")]
+        )
+
+    def test_validatePatient_reportsOnlyReplacedFilesOnFailure(self):
+        replace = os.replace
+
+        def fail_on_resized(src, dst):
+            if dst == self.resized:
+                raise OSError("disk full")
+            replace(src, dst)
+
+        with mock.patch("libs.roiValidation.os.replace", fail_on_resized):
+            patient = validate_patient(self.patient_dir, fix=True)
+        self.assertEqual(patient["fixed"], [self.inverted])
+        self.assertIn((FIX_FAILED, os.path.basename(self.patient_dir)), codes(patient))
+        self.assertEqual(
+            [n for n in os.listdir(self.patient_dir) if n.startswith(".roi_fix")], []
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+
+from libs.scanConversion import ScanConverter
+
+
+class TestScanConversion(unittest.TestCase):
+    def test_roundTrip_preservesRadialProfile(self):
+        conv = ScanConverter.for_polar(64, 256)
+        polar = np.tile(np.arange(64, dtype=np.uint8)[:, None] * 4, (1, 256))
+        cart = conv.polar_to_cart(polar)
+        self.assertEqual(cart.shape, (128, 128))
+        back = conv.cart_to_polar(cart)
+        self.assertEqual(back.shape, polar.shape)
+        diff = np.abs(back[:60].astype(int) - polar[:60].astype(int))
+        self.assertLessEqual(diff.max(), 4)
+
+    def test_boxMapping_containsOriginalBox(self):
+        conv = ScanConverter.for_cartesian(200, 200, n_alines=360)
+        box = (130.0, 40.0, 160.0, 70.0)
+        polar_box = conv.cart_box_to_polar(*box)
+        self.assertLess(polar_box[2] - polar_box[0], 180)
+        xmin, ymin, xmax, ymax = conv.polar_box_to_cart(*polar_box)
+        self.assertLessEqual(xmin, box[0] + 1e-6)
+        self.assertLessEqual(ymin, box[1] + 1e-6)
+        self.assertGreaterEqual(xmax, box[2] - 1e-6)
+        self.assertGreaterEqual(ymax, box[3] - 1e-6)
+
+    def test_boxAroundCenter_spansAllAlines(self):
+        conv = ScanConverter.for_cartesian(100, 100, n_alines=500)
+        amin, smin, amax, _ = conv.cart_box_to_polar(40, 40, 60, 60)
+        self.assertEqual((amin, smin, amax), (0.0, 0.0, 500.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
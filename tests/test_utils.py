@@ -6,6 +6,8 @@ from libs.utils import (
     format_shortcut,
     generate_color_by_text,
     natural_sort,
+    natural_sort_key,
+    NaturalSortCache,
 )
 
 
@@ -23,6 +25,23 @@ class TestUtils(unittest.TestCase):
         for idx, val in enumerate(l1):
             self.assertTrue(val == expected_l1[idx])
 
+    def test_naturalSortKey_mixedPrefixes(self):
+        l1 = ["f10b", "10", "f2", "F3", "f10a", "2"]
+        self.assertEqual(
+            sorted(l1, key=natural_sort_key), ["2", "10", "F3", "f2", "f10a", "f10b"]
+        )
+        natural_sort(l1, ignore_case=True)
+        self.assertEqual(l1, ["2", "10", "f2", "F3", "f10a", "f10b"])
+
+    def test_naturalSortCache_reusesOrderForSameListing(self):
+        cache = NaturalSortCache()
+        first = cache.sorted("d", ["a10", "a9"])
+        self.assertEqual(first, ["a9", "a10"])
+        hit = cache._orders["d"]
+        self.assertEqual(cache.sorted("d", ["a9", "a10"]), first)
+        self.assertIs(cache._orders["d"], hit)
+        self.assertEqual(cache.sorted("d", ["a9", "a10", "a1"]), ["a1", "a9", "a10"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -9,18 +9,22 @@ Time: 2021.02.06
 """
 
 import os
+import sys
 import argparse
 import codecs
 
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from libs.naturalSort import natural_sorted
+
 
 def txt2csv(location, training_dir, path_prefix):
     # Return list
     temp_res = []
 
     # Run through all the files
-    for file in os.listdir(location):
+    for file in natural_sorted(os.listdir(location)):
         # Check the file name ends with txt
         #  and not class.txt
         if (not file.endswith(".txt")) | (file == "classes.txt"):
@@ -74,7 +78,7 @@ def xml2csv(location, training_dir, path_prefix):
     temp_res = []
 
     # Run through all the files
-    for file in os.listdir(location):
+    for file in natural_sorted(os.listdir(location)):
         # Check the file name ends with xml
         if not file.endswith(".xml"):
             continue
@@ -179,7 +183,7 @@ if __name__ == "__main__":
     # Array for final csv file
     res = []
     # Get all the file in dir
-    for training_type_dir in os.listdir(args["location"]):
+    for training_type_dir in natural_sorted(os.listdir(args["location"])):
         # Get the dirname
         dir_name = f"{args['location']}/{training_type_dir}"
 
@@ -188,7 +192,7 @@ if __name__ == "__main__":
             continue
             # Process the files
 
-        for class_type_dir in os.listdir(dir_name):
+        for class_type_dir in natural_sorted(os.listdir(dir_name)):
 
             # Check whether is dir
             if not os.path.isdir(dir_name):
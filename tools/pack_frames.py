@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Pack the frames and meta files of every patient directory below a study
+directory into one `frames.pack` file per patient, which labelARPAM reads
+frames from by random access. ROI files are not packed. Packing again
+adds new and changed files to the existing packs.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from libs.dirScanner import scan_dir, supported_image_extensions
+from libs.frameStore import PACK_NAME, PACKED_DIRS, is_packed, store_for, write_pack
+from libs.imageLoader import RAW_IMAGE_EXTENSIONS
+from libs.roiIndex import find_patient_dirs
+
+
+def loose_files(patient_dir):
+    """Encoded frames and meta files of a patient directory that are on disk."""
+    extensions = tuple(
+        e for e in supported_image_extensions() if e not in RAW_IMAGE_EXTENSIONS
+    )
+    files = [p for p in scan_dir(patient_dir, extensions)[0] if os.path.isfile(p)]
+    for sub_dir in PACKED_DIRS:
+        try:
+            with os.scandir(os.path.join(patient_dir, sub_dir)) as it:
+                files.extend(os.path.abspath(e.path) for e in it if e.is_file())
+        except FileNotFoundError:
+            pass
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("study_dir", help="Study or patient directory")
+    parser.add_argument(
+        "--remove",
+        action="store_true",
+        help="Delete the packed frames and meta files afterwards",
+    )
+    args = parser.parse_args(argv)
+
+    for patient_dir in find_patient_dirs(args.study_dir):
+        files = loose_files(patient_dir)
+        if not files:
+            continue
+        try:
+            base = store_for(patient_dir, refresh=True)
+        except (OSError, ValueError) as e:
+            print(f"{patient_dir}: skipped, {e}")
+            continue
+        write_pack(patient_dir, files, base)
+        store = store_for(patient_dir, refresh=True)
+        print(f"{os.path.join(patient_dir, PACK_NAME)}: {len(store)} files")
+        if args.remove:
+            for path in files:
+                if is_packed(path):
+                    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
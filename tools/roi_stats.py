@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Print the ROI statistics of a study directory from the per-patient ROI
+indexes kept up to date by labelARPAM. Use --rebuild to (re)build the
+indexes by reading every ROI file.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from libs.roiIndex import find_patient_dirs, rebuild_indexes, study_stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("study_dir", help="Study or patient directory")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Rebuild the indexes from the ROI files"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Threads used to rebuild"
+    )
+    args = parser.parse_args(argv)
+
+    patient_dirs = find_patient_dirs(args.study_dir)
+    if args.rebuild:
+        stats = rebuild_indexes(patient_dirs, args.workers)
+    else:
+        stats = study_stats(patient_dirs)
+
+    print(stats.summary())
+    if stats.label_counts:
+        print()
+        width = max(len(label) for label in stats.label_counts)
+        for label, count in sorted(stats.label_counts.items(), key=lambda c: -c[1]):
+            print(f"{label:<{width}}  {count}")
+    if stats.n_unindexed and not args.rebuild:
+        print("\nRun with --rebuild to index the remaining patients.")
+
+
+if __name__ == "__main__":
+    main()
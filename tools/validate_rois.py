@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Check the ROI files of every patient directory below a study directory:
+boxes outside the image or with swapped corners, ROI sizes that differ
+from the image size, ROI files without an image and image sets without a
+meta file. Patients are checked in parallel processes and the issues are
+written to a JSON report. Use --fix to repair the boxes and sizes.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from libs.roiIndex import find_patient_dirs
+from libs.roiValidation import FIXABLE, report_summary, validate_study
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("study_dir", help="Study or patient directory")
+    parser.add_argument(
+        "-o", "--output", default="roi_report.json", help="Path of the JSON report"
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="Rewrite the ROI files with " + ", ".join(FIXABLE) + " issues",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Processes used to check"
+    )
+    args = parser.parse_args(argv)
+
+    report = validate_study(find_patient_dirs(args.study_dir), args.fix, args.workers)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(report_summary(report))
+    print(f"\nReport written to {args.output}")
+    remaining = [c for c in report["counts"] if not args.fix or c not in FIXABLE]
+    return 1 if remaining else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())